@@ -0,0 +1,152 @@
+"""
+Module: cold_start.py
+
+This module measures the cold start of a worker: importing the application, running
+its startup and serving the first request.
+
+Each run starts a new interpreter, as a new worker would, which reports the duration
+of each phase. The first request goes to a public route reading the database, so it
+also pays for the first connection of the pool.
+
+Usage:
+    python -m personavix.benchmarks.cold_start --runs 10
+    python -m personavix.benchmarks.cold_start --path /metrics --output cold_start.json
+
+Functions:
+    measure_child: Measure the phases of a cold start in this interpreter.
+    run_benchmark: Measure cold starts in new interpreters.
+    main: Command line entry point.
+"""
+
+# pylint: disable=import-error, import-outside-toplevel
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("interpreter_s", "import_s", "startup_s", "first_response_s", "total_s")
+DEFAULT_PATH = "/unique-access-links/cold-start-probe"
+
+
+async def _first_response(path: str) -> tuple[float, float, int]:
+    """
+    Run the startup of the application and send it its first request.
+
+    Args:
+        path: The path requested.
+
+    Returns:
+        tuple[float, float, int]: The startup and first response durations, and the
+        status of the response.
+    """
+    import httpx
+    from personavix.main import app
+
+    started_at = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup = time.perf_counter() - started_at
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold") as client:
+            started_at = time.perf_counter()
+            response = await client.get(path)
+            first_response = time.perf_counter() - started_at
+    return startup, first_response, response.status_code
+
+
+def measure_child(path: str) -> dict:
+    """
+    Measure the phases of a cold start in this interpreter.
+
+    Args:
+        path: The path of the first request.
+
+    Returns:
+        dict: The duration of each phase in seconds and the status of the response.
+    """
+    started_at = time.perf_counter()
+    import personavix.main  # pylint: disable=unused-import
+
+    import_time = time.perf_counter() - started_at
+    startup, first_response, status = asyncio.run(_first_response(path))
+    return {
+        "import_s": import_time,
+        "startup_s": startup,
+        "first_response_s": first_response,
+        "status": status,
+    }
+
+
+def run_benchmark(runs: int, path: str) -> list[dict]:
+    """
+    Measure cold starts in new interpreters.
+
+    Args:
+        runs: The number of cold starts.
+        path: The path of the first request.
+
+    Returns:
+        list[dict]: The measures of each run, with the total wall time from the
+        launch of the interpreter and the time spent before the import.
+    """
+    measures = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "personavix.benchmarks.cold_start", "--child", path],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        total = time.perf_counter() - started_at
+        measure = json.loads(output.strip().splitlines()[-1])
+        measure["total_s"] = total
+        measure["interpreter_s"] = total - (
+            measure["import_s"] + measure["startup_s"] + measure["first_response_s"]
+        )
+        measures.append(measure)
+    return measures
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Measure the cold start of a worker.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    parser.add_argument("--child", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_child(args.child)))
+        return
+
+    # Imported here, the interpreters measured must not load anything before the app.
+    from personavix.benchmarks.load_suite import percentile
+
+    measures = run_benchmark(args.runs, args.path)
+    summary = {}
+    print(f"{'phase':<20}{'p50 ms':>10}{'p95 ms':>10}")
+    for phase in PHASES:
+        values = sorted(measure[phase] * 1000 for measure in measures)
+        summary[phase] = {
+            "p50_ms": round(statistics.median(values), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+        }
+        print(f"{phase:<20}{summary[phase]['p50_ms']:>10}{summary[phase]['p95_ms']:>10}")
+    print(f"First response status: {measures[-1]['status']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"summary": summary, "runs": measures}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
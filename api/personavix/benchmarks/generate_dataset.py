@@ -0,0 +1,517 @@
+"""
+Module: generate_dataset.py
+
+This module generates a deterministic synthetic dataset for benchmarks.
+
+The rows are bulk-loaded through core insert() batches, each one in its own short
+transaction. The same seed always produces the same rows, so results measured on
+different machines or commits can be compared.
+
+Usage:
+    python -m personavix.benchmarks.generate_dataset --seed 42
+    python -m personavix.benchmarks.generate_dataset --users 1000 --answers 10000 --links 5000
+
+Functions:
+    generate_questionary: Build the rows of the standard question set.
+    generate_users: Build the rows of the users table.
+    generate_answers_and_links: Build the rows of the answers and unique access links tables.
+    load_dataset: Generate and insert the whole dataset.
+    main: Command line entry point.
+"""
+
+# pylint: disable=import-error
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from personavix.src.database.database import engine
+from personavix.src.dependencies.hash_password import hash_password
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.disc_characteristics import CaracteristicasDisc
+from personavix.src.models.domain.questions import Perguntas
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.models.schemas.enums import FatoresDiscEnum
+from personavix.src.projections.answer_rollups import rebuild_answer_rollups
+from personavix.src.projections.current_profiles import rebuild_current_profiles
+
+QUESTIONS_COUNT = 40
+REFERENCE_DATE = datetime(2025, 1, 1)
+HISTORY_DAYS = 730
+
+# Relative frequency of the predominant factor in the population.
+PREDOMINANT_FACTOR_WEIGHTS = (0.15, 0.30, 0.35, 0.20)
+
+REASONS = (
+    "Processo Seletivo",
+    "Autoconhecimento",
+    "Desenvolvimento de carreira",
+    "Facilitar a adaptação",
+)
+REASON_WEIGHTS = (0.55, 0.20, 0.15, 0.10)
+
+SECTORS = (
+    "Tecnologia",
+    "Recursos Humanos",
+    "Comercial",
+    "Financeiro",
+    "Marketing",
+    "Operações",
+    "Atendimento",
+    "Jurídico",
+    "Logística",
+    "Administrativo",
+)
+SECTOR_WEIGHTS = (0.22, 0.06, 0.18, 0.08, 0.08, 0.14, 0.12, 0.03, 0.05, 0.04)
+
+# Permission levels: 1 user, 2 manager, 3 admin.
+PERMISSIONS = (1, 2, 3)
+PERMISSION_WEIGHTS = (0.97, 0.025, 0.005)
+
+FIRST_NAMES = (
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique",
+    "Isabela", "Joao", "Larissa", "Lucas", "Mariana", "Mateus", "Natalia", "Pedro",
+    "Rafaela", "Rodrigo", "Sofia", "Thiago", "Vitoria", "Gustavo", "Julia", "Caio",
+)
+LAST_NAMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+    "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes",
+    "Soares", "Fernandes", "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Moreira",
+)
+
+CHARACTERISTICS = {
+    FatoresDiscEnum.DOMINANCIA: (
+        "Decidido", "Competitivo", "Direto", "Ousado", "Determinado",
+        "Exigente", "Independente", "Assertivo", "Objetivo", "Desafiador",
+    ),
+    FatoresDiscEnum.INFLUENCIA: (
+        "Comunicativo", "Entusiasmado", "Persuasivo", "Otimista", "Sociável",
+        "Inspirador", "Espontâneo", "Carismático", "Expressivo", "Animado",
+    ),
+    FatoresDiscEnum.ESTABILIDADE: (
+        "Paciente", "Calmo", "Leal", "Cooperativo", "Constante",
+        "Atencioso", "Tranquilo", "Prestativo", "Confiável", "Sereno",
+    ),
+    FatoresDiscEnum.CONFORMIDADE: (
+        "Cuidadoso", "Preciso", "Analítico", "Organizado", "Detalhista",
+        "Sistemático", "Criterioso", "Disciplinado", "Lógico", "Metódico",
+    ),
+}
+
+
+def _batched(rows: Iterable[dict], batch_size: int) -> Iterator[list[dict]]:
+    """
+    Split an iterable of rows into lists of at most batch_size rows.
+
+    Args:
+        rows: The rows to split.
+        batch_size: The maximum size of each batch.
+
+    Returns:
+        Iterator[list[dict]]: The batches of rows.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _business_datetime(rng: random.Random, start: datetime, end: datetime) -> datetime:
+    """
+    Draw a timestamp between start and end, biased towards weekdays and office hours.
+
+    Args:
+        rng: The random generator.
+        start: The lower bound of the interval.
+        end: The upper bound of the interval.
+
+    Returns:
+        datetime: The generated timestamp, never outside the interval.
+    """
+    days = max((end - start).days, 0)
+    day = start.replace(hour=0, minute=0, second=0) + timedelta(days=rng.randint(0, days))
+    if day.weekday() >= 5 and rng.random() < 0.8:
+        day -= timedelta(days=day.weekday() - 4)
+
+    moment = day + timedelta(
+        hours=min(max(rng.gauss(13, 3), 7), 21), seconds=rng.randint(0, 59)
+    )
+    return min(max(moment.replace(microsecond=0), start), end)
+
+
+def _disc_scores(rng: random.Random) -> tuple[float, float, float, float]:
+    """
+    Draw the four DISC scores of an answer.
+
+    The questionary picks one factor per question and scores each factor as the
+    percentage of questions where it was chosen, so the scores are multiples of
+    100 / QUESTIONS_COUNT that add up to 100.
+
+    Args:
+        rng: The random generator.
+
+    Returns:
+        tuple[float, float, float, float]: The dominance, influence, stability and
+        conformity scores.
+    """
+    predominant = rng.choices(range(4), weights=PREDOMINANT_FACTOR_WEIGHTS)[0]
+    alphas = [4.0 if factor == predominant else 1.5 for factor in range(4)]
+    weights = [rng.gammavariate(alpha, 1.0) for alpha in alphas]
+
+    counts = [0, 0, 0, 0]
+    for factor in rng.choices(range(4), weights=weights, k=QUESTIONS_COUNT):
+        counts[factor] += 1
+
+    return tuple(round(count * 100 / QUESTIONS_COUNT, 2) for count in counts)
+
+
+def generate_questionary() -> tuple[list[dict], list[dict]]:
+    """
+    Build the rows of the standard question set.
+
+    Each question offers one characteristic of each DISC factor.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The question rows and the characteristic rows.
+    """
+    questions = []
+    characteristics = []
+    for index in range(QUESTIONS_COUNT):
+        id_question = index + 1
+        questions.append(
+            {
+                "id_pergunta": id_question,
+                "pergunta": f"Qual característica mais combina com você? ({id_question})",
+            }
+        )
+        for factor, options in CHARACTERISTICS.items():
+            characteristics.append(
+                {
+                    "id_pergunta": id_question,
+                    "caracteristica": options[index % len(options)],
+                    "fator": factor,
+                }
+            )
+
+    return questions, characteristics
+
+
+def generate_users(
+    rng: random.Random, first_id: int, count: int, password_hash: str
+) -> Iterator[dict]:
+    """
+    Build the rows of the users table.
+
+    Managers and admins get access and the shared benchmark password, while the
+    remaining users mimic candidates created through unique access links.
+
+    Args:
+        rng: The random generator.
+        first_id: The id of the first generated user.
+        count: The number of users to generate.
+        password_hash: The hashed password given to managers and admins.
+
+    Returns:
+        Iterator[dict]: The user rows.
+    """
+    start = REFERENCE_DATE - timedelta(days=HISTORY_DAYS)
+    for id_user in range(first_id, first_id + count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        permission = rng.choices(PERMISSIONS, weights=PERMISSION_WEIGHTS)[0]
+        created_at = _business_datetime(rng, start, REFERENCE_DATE)
+
+        yield {
+            "id_usuario": id_user,
+            "nome": f"{first_name} {last_name}",
+            "email": f"{first_name}.{last_name}.{id_user}@example.com".lower(),
+            "telefone": f"+55 27 9{id_user:08d}",
+            "flag_acesso": int(permission > 1 or rng.random() < 0.3),
+            "permissao": permission,
+            "setor": rng.choices(SECTORS, weights=SECTOR_WEIGHTS)[0],
+            "senha_hash": password_hash if permission > 1 else None,
+            "criado_em": created_at,
+            "atualizado_em": created_at,
+        }
+
+
+def _link_row(
+    rng: random.Random, id_session: int, id_user: int, password_hash: str
+) -> dict:
+    """
+    Build the columns shared by answered and pending unique access links.
+
+    Args:
+        rng: The random generator.
+        id_session: The id of the link.
+        id_user: The id of the user the link was sent to.
+        password_hash: The hashed password of the link.
+
+    Returns:
+        dict: The partial link row.
+    """
+    return {
+        "id_sessao": id_session,
+        "id_usuario": id_user,
+        # Derived from the id too, so datasets loaded with the same seed on top of
+        # each other do not repeat their links.
+        "link": str(uuid.uuid5(uuid.UUID(int=rng.getrandbits(128)), str(id_session))),
+        "senha_hash": password_hash,
+    }
+
+
+def generate_answers_and_links(
+    rng: random.Random, args: argparse.Namespace, users_created_at: list[datetime]
+) -> Iterator[tuple[str, dict]]:
+    """
+    Build the rows of the answers and unique access links tables.
+
+    Exactly args.links * args.answered_ratio answers are picked (selection sampling)
+    to have been submitted through a unique access link, so those links are emitted
+    right after their answer. The remaining links are pending.
+
+    Args:
+        rng: The random generator.
+        args: The parsed command line arguments, with the first ids already resolved.
+        users_created_at: The creation date of each generated user, by position.
+
+    Returns:
+        Iterator[tuple[str, dict]]: Pairs of table name and row.
+    """
+    answered_links = min(round(args.links * args.answered_ratio), args.answers)
+    id_session = args.first_link_id
+
+    for position in range(args.answers):
+        user_index = rng.randrange(len(users_created_at))
+        id_user = args.first_user_id + user_index
+        answered_at = _business_datetime(rng, users_created_at[user_index], REFERENCE_DATE)
+        dominance, influence, stability, conformity = _disc_scores(rng)
+        id_answer = args.first_answer_id + position
+
+        yield "respostas", {
+            "id_resposta": id_answer,
+            "id_usuario": id_user,
+            "dominancia": dominance,
+            "influencia": influence,
+            "estabilidade": stability,
+            "conformidade": conformity,
+            "motivo": rng.choices(REASONS, weights=REASON_WEIGHTS)[0],
+            "respondido_em": answered_at,
+        }
+
+        remaining_answers = args.answers - position
+        if answered_links and rng.random() < answered_links / remaining_answers:
+            answered_links -= 1
+            yield "links_acesso_unico", _link_row(
+                rng, id_session, id_user, args.password_hash
+            ) | {
+                "respondido": 1,
+                "id_resposta": id_answer,
+                "criado_em": max(
+                    answered_at - timedelta(seconds=rng.randint(600, 14 * 24 * 3600)),
+                    users_created_at[user_index],
+                ),
+                "respondido_em": answered_at,
+            }
+            id_session += 1
+
+    while id_session < args.first_link_id + args.links:
+        user_index = rng.randrange(len(users_created_at))
+        yield "links_acesso_unico", _link_row(
+            rng, id_session, args.first_user_id + user_index, args.password_hash
+        ) | {
+            "respondido": 0,
+            "id_resposta": None,
+            "criado_em": _business_datetime(
+                rng, users_created_at[user_index], REFERENCE_DATE
+            ),
+            "respondido_em": None,
+        }
+        id_session += 1
+
+
+def _insert_batches(bind: Engine, table, rows: Iterable[dict], batch_size: int) -> int:
+    """
+    Insert rows with one multi-row insert() per batch, each in its own transaction.
+
+    Args:
+        bind: The engine used to open the transactions.
+        table: The table receiving the rows.
+        rows: The rows to insert.
+        batch_size: The number of rows per insert.
+
+    Returns:
+        int: The number of inserted rows.
+    """
+    inserted = 0
+    for batch in _batched(rows, batch_size):
+        with bind.begin() as connection:
+            connection.execute(insert(table), batch)
+        inserted += len(batch)
+    return inserted
+
+
+def _next_id(connection: Connection, column) -> int:
+    """
+    Get the first free id of a table, so the dataset can be added to existing rows.
+
+    Args:
+        connection: The database connection.
+        column: The primary key column of the table.
+
+    Returns:
+        int: The first free id.
+    """
+    return (connection.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def load_dataset(bind: Engine, args: argparse.Namespace) -> dict[str, int]:
+    """
+    Generate and insert the whole dataset.
+
+    Args:
+        bind: The engine used to insert the rows.
+        args: The parsed command line arguments.
+
+    Returns:
+        dict[str, int]: The number of inserted rows by table.
+    """
+    rng = random.Random(args.seed)
+    inserted = {}
+
+    with bind.connect() as connection:
+        has_questionary = bool(
+            connection.execute(
+                select(func.count(Perguntas.id_pergunta))  # pylint: disable=not-callable
+            ).scalar()
+        )
+        args.first_user_id = _next_id(connection, Usuarios.id_usuario)
+        args.first_answer_id = _next_id(connection, Respostas.id_resposta)
+        args.first_link_id = _next_id(connection, LinksAcessoUnico.id_sessao)
+
+    if not has_questionary:
+        questions, characteristics = generate_questionary()
+        inserted["perguntas"] = _insert_batches(
+            bind, Perguntas.__table__, questions, args.batch_size
+        )
+        inserted["caracteristicas_disc"] = _insert_batches(
+            bind, CaracteristicasDisc.__table__, characteristics, args.batch_size
+        )
+
+    users_created_at = []
+
+    def _tracked_users() -> Iterator[dict]:
+        for row in generate_users(
+            rng, args.first_user_id, args.users, args.password_hash
+        ):
+            users_created_at.append(row["criado_em"])
+            yield row
+
+    inserted["usuarios"] = _insert_batches(
+        bind, Usuarios.__table__, _tracked_users(), args.batch_size
+    )
+    inserted.update(_load_answers_and_links(bind, args, rng, users_created_at))
+    inserted["perfil_atual"] = rebuild_current_profiles(bind, args.batch_size)
+    inserted["respostas_diarias"] = rebuild_answer_rollups(bind)
+
+    return inserted
+
+
+def _load_answers_and_links(
+    bind: Engine,
+    args: argparse.Namespace,
+    rng: random.Random,
+    users_created_at: list[datetime],
+) -> dict[str, int]:
+    """
+    Insert the answers and unique access links streamed by generate_answers_and_links.
+
+    Every answer batch is flushed before the link batch that may reference it.
+
+    Args:
+        bind: The engine used to insert the rows.
+        args: The parsed command line arguments, with the first ids already resolved.
+        rng: The random generator.
+        users_created_at: The creation date of each generated user, by position.
+
+    Returns:
+        dict[str, int]: The number of inserted rows by table.
+    """
+    tables = {
+        "respostas": Respostas.__table__,
+        "links_acesso_unico": LinksAcessoUnico.__table__,
+    }
+    pending = {name: [] for name in tables}
+    inserted = {name: 0 for name in tables}
+
+    for table_name, row in generate_answers_and_links(rng, args, users_created_at):
+        pending[table_name].append(row)
+        if len(pending[table_name]) >= args.batch_size:
+            for name, table in tables.items():
+                inserted[name] += _insert_batches(
+                    bind, table, pending[name], args.batch_size
+                )
+                pending[name] = []
+
+    for name, table in tables.items():
+        inserted[name] += _insert_batches(bind, table, pending[name], args.batch_size)
+
+    return inserted
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description="Bulk-load a deterministic synthetic dataset for benchmarks."
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--answers", type=int, default=1_000_000)
+    parser.add_argument("--links", type=int, default=500_000)
+    parser.add_argument(
+        "--answered-ratio",
+        type=float,
+        default=0.6,
+        help="Fraction of the links that were already answered.",
+    )
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument(
+        "--password",
+        default="benchmark",
+        help="Password of the generated managers, admins and links.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.users < 1 and (args.answers or args.links):
+        parser.error("answers and links need at least one user.")
+
+    # A single hash is shared by every row, bcrypt would dominate the load otherwise.
+    args.password_hash = hash_password(args.password)
+
+    # Statement echo would print every batch.
+    engine.echo = False
+
+    started_at = time.perf_counter()
+    inserted = load_dataset(engine, args)
+    elapsed = time.perf_counter() - started_at
+
+    for table_name, count in inserted.items():
+        print(f"{table_name}: {count} rows")
+    print(f"Loaded in {elapsed:.1f}s with seed {args.seed}.")
+
+
+if __name__ == "__main__":
+    main()
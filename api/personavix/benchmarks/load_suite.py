@@ -0,0 +1,502 @@
+"""
+Module: load_suite.py
+
+This module drives the candidate and manager flows against the API and measures them.
+
+The suite runs the real ASGI app in-process by default, or a running server when
+--base-url is given. Candidates and managers are read from the database, so it is
+meant to run on top of the dataset built by generate_dataset, with the same password.
+
+Flows:
+    candidate: link lookup, link login, questionary and answer submission.
+    manager: login, answers listing and users listing.
+
+Each step reports requests, errors, throughput, p50/p95/p99 latencies and the number
+of database queries per request. Results are saved as JSON and can be compared with
+the results of another commit.
+
+Usage:
+    python -m personavix.benchmarks.load_suite --iterations 200 --concurrency 20
+    python -m personavix.benchmarks.load_suite --base-url http://localhost:5174
+    python -m personavix.benchmarks.load_suite --compare results/previous.json
+
+Functions:
+    load_actors: Read pending links of users with access, and an admin.
+    open_client: Open a client against a running server or the in-process app.
+    percentile: Compute a nearest-rank percentile.
+    summarize: Summarize the measures of each step of a flow.
+    run_suite: Run the selected flows and build the results.
+    compare_results: Print the p95 and throughput deltas between two results.
+    main: Command line entry point.
+"""
+
+# pylint: disable=import-error
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+import httpx
+from sqlalchemy import and_, event, select
+from personavix.src.database.database import SessionLocal, engine
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.settings import settings
+
+QUERIES_HEADER = "x-db-queries"
+
+_request_queries: contextvars.ContextVar = contextvars.ContextVar(
+    "request_queries", default=None
+)
+
+
+def _count_query(*_args, **_kwargs) -> None:
+    """Count a statement for the request being served, if any."""
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class QueryCountingApp:  # pylint: disable=too-few-public-methods
+    """
+    ASGI wrapper that reports the statements executed by each request in a header.
+
+    Sync endpoints and dependencies run in the threadpool with a copy of the request
+    context, so they all increment the same counter. In DEBUG mode the app already
+    sends the header, which is kept as it is.
+
+    Attributes:
+        app: The wrapped ASGI app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = [0]
+        token = _request_queries.set(counter)
+
+        async def send_with_queries(message):
+            headers = list(message.get("headers", []))
+            if message["type"] == "http.response.start" and not any(
+                name.lower() == QUERIES_HEADER.encode() for name, _ in headers
+            ):
+                message["headers"] = headers + [
+                    (QUERIES_HEADER.encode(), str(counter[0]).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_queries)
+        finally:
+            _request_queries.reset(token)
+
+
+class Recorder:  # pylint: disable=too-few-public-methods
+    """
+    Collects the measures of each step of a flow.
+
+    Attributes:
+        steps: The measures by step name, as (latency in seconds, status, queries).
+    """
+
+    def __init__(self):
+        self.steps: dict[str, list[tuple[float, int, int]]] = {}
+
+    async def request(
+        self, client: httpx.AsyncClient, step: str, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        """
+        Send a request and record its latency, status and query count.
+
+        Args:
+            client: The HTTP client.
+            step: The name of the step being measured.
+            method: The HTTP method.
+            url: The requested URL.
+            **kwargs: Extra arguments for httpx.
+
+        Returns:
+            httpx.Response: The response.
+        """
+        started_at = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        latency = time.perf_counter() - started_at
+
+        queries = response.headers.get(QUERIES_HEADER)
+        self.steps.setdefault(step, []).append(
+            (latency, response.status_code, int(queries) if queries else None)
+        )
+        return response
+
+
+def percentile(values: list[float], rank: float) -> float:
+    """
+    Compute a nearest-rank percentile.
+
+    Args:
+        values: The sorted values.
+        rank: The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0 for an empty list.
+    """
+    if not values:
+        return 0.0
+    return values[max(math.ceil(rank / 100 * len(values)) - 1, 0)]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    """
+    Summarize the measures of each step of a flow.
+
+    Args:
+        recorder: The recorder of the flow.
+        elapsed: The wall time of the flow, in seconds.
+
+    Returns:
+        dict: The summary of the flow.
+    """
+    steps = {}
+    for step, measures in recorder.steps.items():
+        latencies = sorted(latency * 1000 for latency, _, _ in measures)
+        queries = [count for _, _, count in measures if count is not None]
+        steps[step] = {
+            "requests": len(measures),
+            "errors": sum(1 for _, status, _ in measures if status >= 400),
+            "rps": round(len(measures) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "db_queries_per_request": (
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+        }
+
+    total_requests = sum(step["requests"] for step in steps.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total_requests,
+        "rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "steps": steps,
+    }
+
+
+def load_actors(iterations: int) -> tuple[list[dict], dict]:
+    """
+    Read pending links of users with access, and an admin, from the database.
+
+    Args:
+        iterations: The number of candidate flows that will run.
+
+    Returns:
+        tuple[list[dict], dict]: The candidates and the admin.
+    """
+    with SessionLocal() as db:
+        candidates = db.execute(
+            select(LinksAcessoUnico.link, LinksAcessoUnico.id_usuario)
+            .join(Usuarios, Usuarios.id_usuario == LinksAcessoUnico.id_usuario)
+            .where(
+                and_(
+                    LinksAcessoUnico.respondido == 0,
+                    Usuarios.flag_acesso == 1,
+                    Usuarios.email.is_not(None),
+                )
+            )
+            .order_by(LinksAcessoUnico.id_sessao)
+            .limit(iterations)
+        ).all()
+        admin = db.execute(
+            select(Usuarios.email).where(
+                and_(
+                    Usuarios.permissao == 3,
+                    Usuarios.flag_acesso == 1,
+                    Usuarios.senha_hash.is_not(None),
+                )
+            )
+        ).first()
+
+    return [candidate._asdict() for candidate in candidates], (
+        admin._asdict() if admin else None
+    )
+
+
+async def _candidate_flow(
+    client: httpx.AsyncClient, recorder: Recorder, candidate: dict, password: str
+) -> None:
+    """
+    Run the candidate flow once: link lookup, link login, questionary and answer.
+
+    Args:
+        client: The HTTP client.
+        recorder: The recorder of the flow.
+        candidate: The link and user of the candidate.
+        password: The password of the link.
+    """
+    response = await recorder.request(
+        client, "link_lookup", "GET", f"/unique-access-links/{candidate['link']}"
+    )
+    if response.status_code != 200:
+        return
+    id_session = response.json()["id_sessao"]
+
+    response = await recorder.request(
+        client,
+        "link_login",
+        "POST",
+        f"/unique-access-links/login/{id_session}",
+        json={"senha": password},
+    )
+    if response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await recorder.request(client, "questionary", "GET", "/questionary/", headers=headers)
+    await recorder.request(
+        client,
+        "answer_submission",
+        "POST",
+        f"/answers/{candidate['id_usuario']}",
+        headers=headers,
+        json={
+            "id_sessao": id_session,
+            "dominancia": 25.0,
+            "influencia": 30.0,
+            "estabilidade": 27.5,
+            "conformidade": 17.5,
+            "motivo": "Processo Seletivo",
+        },
+    )
+
+
+async def _manager_flow(
+    client: httpx.AsyncClient, recorder: Recorder, admin: dict, password: str
+) -> None:
+    """
+    Run the manager flow once: login, answers listing and users listing.
+
+    Args:
+        client: The HTTP client.
+        recorder: The recorder of the flow.
+        admin: The email of the admin.
+        password: The password of the admin.
+    """
+    response = await recorder.request(
+        client,
+        "login",
+        "POST",
+        "/users/login",
+        json={"email": admin["email"], "senha": password},
+    )
+    if response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await recorder.request(client, "answers_listing", "GET", "/answers/", headers=headers)
+    await recorder.request(client, "users_listing", "GET", "/users/", headers=headers)
+
+
+async def _run_flow(flow, client: httpx.AsyncClient, jobs: list, args) -> dict:
+    """
+    Run a flow once per job, with at most args.concurrency flows in flight.
+
+    Args:
+        flow: The coroutine function running the flow once.
+        client: The HTTP client.
+        jobs: The actor of each run.
+        args: The parsed command line arguments.
+
+    Returns:
+        dict: The summary of the flow.
+    """
+    recorder = Recorder()
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker():
+        while not queue.empty():
+            await flow(client, recorder, queue.get_nowait(), args.password)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return summarize(recorder, time.perf_counter() - started_at)
+
+
+@asynccontextmanager
+async def open_client(base_url: str):
+    """
+    Open a client against a running server, or against the app served in-process.
+
+    Args:
+        base_url: The URL of the running server, or None to serve the app in-process.
+
+    Yields:
+        httpx.AsyncClient: The HTTP client.
+    """
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            yield client
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from personavix.main import app
+
+    # Every virtual user shares the address of the in-process client, a per-IP rate
+    # limit would measure the limiter instead of the API.
+    settings.RATE_LIMIT_ENABLED = False
+    event.listen(engine, "before_cursor_execute", _count_query)
+    transport = httpx.ASGITransport(app=QueryCountingApp(app))
+    try:
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                yield client
+    finally:
+        event.remove(engine, "before_cursor_execute", _count_query)
+
+
+async def run_suite(args: argparse.Namespace) -> dict:
+    """
+    Run the selected flows and build the results.
+
+    Args:
+        args: The parsed command line arguments.
+
+    Returns:
+        dict: The results, with the summary of each flow.
+    """
+    candidates, admin = load_actors(args.iterations)
+    flows = {}
+
+    async with open_client(args.base_url) as client:
+        if "candidate" in args.flows:
+            if len(candidates) < args.iterations:
+                print(f"Only {len(candidates)} pending links are available.")
+            flows["candidate"] = await _run_flow(_candidate_flow, client, candidates, args)
+        if "manager" in args.flows:
+            if not admin:
+                raise SystemExit("No admin with access and password was found.")
+            flows["manager"] = await _run_flow(
+                _manager_flow, client, [admin] * args.manager_iterations, args
+            )
+
+    return {
+        "commit": _current_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+        "iterations": args.iterations,
+        "manager_iterations": args.manager_iterations,
+        "concurrency": args.concurrency,
+        "flows": flows,
+    }
+
+
+def _current_commit() -> str:
+    """
+    Get the current git commit, to identify the results.
+
+    Returns:
+        str: The short hash of the commit, or None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(previous: dict, current: dict) -> None:
+    """
+    Print the p95 and throughput deltas between two results.
+
+    Args:
+        previous: The results used as reference.
+        current: The new results.
+    """
+    print(f"Comparing {previous.get('commit')} -> {current.get('commit')}")
+    for flow, summary in current["flows"].items():
+        previous_steps = previous.get("flows", {}).get(flow, {}).get("steps", {})
+        for step, measures in summary["steps"].items():
+            reference = previous_steps.get(step)
+            if not reference:
+                continue
+            print(
+                f"{flow}.{step}: p95 {reference['p95_ms']} -> {measures['p95_ms']} ms, "
+                f"rps {reference['rps']} -> {measures['rps']}"
+            )
+
+
+def _print_results(results: dict) -> None:
+    """
+    Print the results as a table.
+
+    Args:
+        results: The results of the suite.
+    """
+    for flow, summary in results["flows"].items():
+        print(f"\n{flow}: {summary['requests']} requests, {summary['rps']} req/s")
+        print(f"{'step':<20}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50':>9}{'p95':>9}"
+              f"{'p99':>9}{'queries':>9}")
+        for step, measures in summary["steps"].items():
+            print(
+                f"{step:<20}{measures['requests']:>7}{measures['errors']:>6}"
+                f"{measures['rps']:>9}{measures['p50_ms']:>9}{measures['p95_ms']:>9}"
+                f"{measures['p99_ms']:>9}{str(measures['db_queries_per_request']):>9}"
+            )
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure the candidate and manager flows of the API."
+    )
+    parser.add_argument("--base-url", help="Run against a server instead of in-process.")
+    parser.add_argument(
+        "--flows", nargs="+", choices=("candidate", "manager"),
+        default=["candidate", "manager"],
+    )
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--manager-iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--output", type=Path, help="Defaults to results/load-<commit>.json")
+    parser.add_argument("--compare", type=Path, help="Results of a previous run.")
+    args = parser.parse_args(argv)
+
+    # Statement echo would dominate the measures.
+    engine.echo = False
+
+    results = asyncio.run(run_suite(args))
+    _print_results(results)
+
+    output = args.output or Path("results") / f"load-{results['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare_results(json.loads(args.compare.read_text(encoding="utf-8")), results)
+
+
+if __name__ == "__main__":
+    main()
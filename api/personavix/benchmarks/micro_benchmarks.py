@@ -0,0 +1,342 @@
+"""
+Module: micro_benchmarks.py
+
+This module benchmarks the per-request primitives of the API and checks regressions.
+
+Each case is calibrated to run for about --min-time seconds per round, and the median
+time per call over all rounds is compared against the stored baseline. A case slower
+than its baseline by more than the threshold is reported as a regression and the
+command exits with status 1, so it can run as a CI gate.
+
+Baselines are machine dependent: save them with --save-baseline on the machine that
+runs the comparison.
+
+Usage:
+    python -m personavix.benchmarks.micro_benchmarks
+    python -m personavix.benchmarks.micro_benchmarks -k hash --threshold 1.5
+    python -m personavix.benchmarks.micro_benchmarks --save-baseline
+
+Functions:
+    build_cases: Build the benchmark cases.
+    measure: Measure the median time per call of a case.
+    check_regressions: Compare the measures against the baselines.
+    main: Command line entry point.
+"""
+
+# pylint: disable=import-error
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+from personavix.src.dependencies.create_access_token import create_access_token
+from personavix.src.dependencies.decode_and_verify_token import decode_token
+from personavix.src.dependencies.hash_password import hash_password, verify_password
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.dependencies.verify_if_is_email import verify_if_is_email
+from personavix.src.models.schemas.answers import AnswersWithUser
+from personavix.src.models.schemas.unique_access_links import UniqueAccessLinkWithUser
+from personavix.src.search.user_index import UserSearchIndex
+
+BASELINES_PATH = Path(__file__).parent / "baselines" / "micro_benchmarks.json"
+DEFAULT_THRESHOLD = 1.25
+BCRYPT_ROUNDS = (4, 8, 10, 12)
+SERIALIZATION_ROWS = 1_000
+SEARCH_USERS = 100_000
+
+
+def _user_row(id_user: int) -> SimpleNamespace:
+    """
+    Build an object shaped like a Usuarios row.
+
+    Args:
+        id_user: The id of the user.
+
+    Returns:
+        SimpleNamespace: The user row.
+    """
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    return SimpleNamespace(
+        id_usuario=id_user,
+        nome="Usuario Benchmark",
+        email=f"usuario.{id_user}@example.com",
+        telefone=f"+55 27 9{id_user:08d}",
+        flag_acesso=1,
+        permissao=1,
+        setor="Tecnologia",
+        criado_em=now,
+        atualizado_em=now,
+    )
+
+
+def _answers_rows(count: int) -> list[SimpleNamespace]:
+    """
+    Build objects shaped like Respostas rows with their user loaded.
+
+    Args:
+        count: The number of rows.
+
+    Returns:
+        list[SimpleNamespace]: The answer rows.
+    """
+    return [
+        SimpleNamespace(
+            id_resposta=index + 1,
+            id_usuario=index + 1,
+            dominancia=25.0,
+            influencia=30.0,
+            estabilidade=27.5,
+            conformidade=17.5,
+            motivo="Processo Seletivo",
+            respondido_em=datetime(2025, 1, 1, 12, 0, 0),
+            usuarios_=_user_row(index + 1),
+        )
+        for index in range(count)
+    ]
+
+
+def _links_rows(count: int) -> list[SimpleNamespace]:
+    """
+    Build objects shaped like LinksAcessoUnico rows with their user loaded.
+
+    Args:
+        count: The number of rows.
+
+    Returns:
+        list[SimpleNamespace]: The link rows.
+    """
+    return [
+        SimpleNamespace(
+            id_sessao=index + 1,
+            id_usuario=index + 1,
+            link=f"00000000-0000-4000-8000-{index:012d}",
+            respondido=1,
+            id_resposta=index + 1,
+            criado_em=datetime(2025, 1, 1, 12, 0, 0),
+            respondido_em=datetime(2025, 1, 2, 12, 0, 0),
+            usuarios_=_user_row(index + 1),
+        )
+        for index in range(count)
+    ]
+
+
+def _user_index(count: int) -> UserSearchIndex:
+    """
+    Build a search index of users shaped like Usuarios rows.
+
+    Args:
+        count: The number of users.
+
+    Returns:
+        UserSearchIndex: The loaded index.
+    """
+    index = UserSearchIndex()
+    index.load(
+        (user.id_usuario, user.nome, user.email, user.telefone, user.setor)
+        for user in map(_user_row, range(1, count + 1))
+    )
+    return index
+
+
+def _serialize(model, rows: list) -> Callable[[], bytes]:
+    """
+    Build a case serializing rows the way FastAPI serializes a response_model list.
+
+    Args:
+        model: The Pydantic response model.
+        rows: The ORM-like rows.
+
+    Returns:
+        Callable[[], bytes]: The case.
+    """
+    return lambda: serialize_response(list[model], rows)
+
+
+def build_cases() -> dict[str, Callable[[], object]]:
+    """
+    Build the benchmark cases.
+
+    Returns:
+        dict[str, Callable[[], object]]: The cases by name.
+    """
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    user = SimpleNamespace(
+        id_usuario=1, email="usuario.1@example.com", permissao=3, flag_acesso=1
+    )
+    token = create_access_token(user, False, timedelta(hours=24), 0)
+
+    cases = {
+        "create_access_token": lambda: create_access_token(
+            user, False, timedelta(hours=24), 0
+        ),
+        "decode_token": lambda: decode_token(token),
+        "verify_if_is_email[valid]": lambda: verify_if_is_email("usuario.1@example.com"),
+        "verify_if_is_email[phone]": lambda: verify_if_is_email("+55 27 912345678"),
+        f"serialize_answers_with_user[{SERIALIZATION_ROWS}]": _serialize(
+            AnswersWithUser, _answers_rows(SERIALIZATION_ROWS)
+        ),
+        f"serialize_unique_access_link_with_user[{SERIALIZATION_ROWS}]": _serialize(
+            UniqueAccessLinkWithUser, _links_rows(SERIALIZATION_ROWS)
+        ),
+    }
+
+    index = _user_index(SEARCH_USERS)
+    cases[f"user_search[prefix,{SEARCH_USERS}]"] = lambda: index.search("usuario", 20)
+    cases[f"user_search[phone,{SEARCH_USERS}]"] = lambda: index.search("(27) 9000", 20)
+    cases[f"user_search[miss,{SEARCH_USERS}]"] = lambda: index.search("xyzzy", 20)
+
+    for rounds in BCRYPT_ROUNDS:
+        hashed = hash_password("benchmark", rounds)
+        cases[f"hash_password[rounds={rounds}]"] = (
+            lambda rounds=rounds: hash_password("benchmark", rounds)
+        )
+        cases[f"verify_password[rounds={rounds}]"] = (
+            lambda hashed=hashed: verify_password("benchmark", hashed)
+        )
+
+    return cases
+
+
+def measure(case: Callable[[], object], rounds: int, min_time: float) -> dict:
+    """
+    Measure the median time per call of a case.
+
+    The number of calls per round is calibrated so each round lasts at least min_time.
+
+    Args:
+        case: The case to measure.
+        rounds: The number of measured rounds.
+        min_time: The minimum duration of a round, in seconds.
+
+    Returns:
+        dict: The median, minimum and maximum seconds per call and the calls per round.
+    """
+    loops = 1
+    while True:
+        started_at = time.perf_counter()
+        for _ in range(loops):
+            case()
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9)))
+
+    timings = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started_at = time.perf_counter()
+        for _ in range(loops):
+            case()
+        timings.append((time.perf_counter() - started_at) / loops)
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "loops": loops,
+    }
+
+
+def check_regressions(
+    results: dict[str, dict], baselines: dict[str, dict], threshold: float
+) -> list[str]:
+    """
+    Compare the measures against the baselines.
+
+    A case may store its own "threshold" in the baselines file to override the default.
+
+    Args:
+        results: The measures by case name.
+        baselines: The stored baselines by case name.
+        threshold: The maximum accepted ratio between a measure and its baseline.
+
+    Returns:
+        list[str]: The names of the regressed cases.
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        result["ratio"] = result["median_s"] / baseline["median_s"]
+        if result["ratio"] > baseline.get("threshold", threshold):
+            regressions.append(name)
+    return regressions
+
+
+def _format_time(seconds: float) -> str:
+    """
+    Format a duration with a readable unit.
+
+    Args:
+        seconds: The duration in seconds.
+
+    Returns:
+        str: The formatted duration.
+    """
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark auth, hashing and serialization primitives."
+    )
+    parser.add_argument("-k", dest="keyword", help="Only run cases containing this text.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the measures as the new baselines instead of comparing.",
+    )
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if args.baselines.exists():
+        baselines = json.loads(args.baselines.read_text(encoding="utf-8"))
+
+    results = {}
+    for name, case in build_cases().items():
+        if args.keyword and args.keyword not in name:
+            continue
+        results[name] = measure(case, args.rounds, args.min_time)
+
+    if args.save_baseline:
+        for name, result in results.items():
+            baselines[name] = {
+                **baselines.get(name, {}),
+                "median_s": result["median_s"],
+            }
+        args.baselines.parent.mkdir(parents=True, exist_ok=True)
+        args.baselines.write_text(
+            json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+
+    regressions = check_regressions(results, baselines, args.threshold)
+    for name, result in results.items():
+        ratio = f"{result['ratio']:.2f}x" if "ratio" in result else "no baseline"
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<50}{_format_time(result['median_s']):>12}  {ratio}{flag}")
+
+    if regressions and not args.save_baseline:
+        print(f"\n{len(regressions)} case(s) regressed beyond the threshold.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
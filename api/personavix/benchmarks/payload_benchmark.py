@@ -0,0 +1,162 @@
+"""
+Module: payload_benchmark.py
+
+This module compares the bytes on the wire and the latency of large list responses
+with and without sparse fieldsets and compression.
+
+Each case requests an endpoint with a fields= selection and an Accept-Encoding, and
+reports the median and p95 latency, the bytes received and the decoded bytes. It is
+meant to run on top of a dataset built by generate_dataset with at least --rows
+answers, for instance:
+
+    python -m personavix.benchmarks.generate_dataset --answers 10000 --users 5000
+
+Usage:
+    python -m personavix.benchmarks.payload_benchmark --repeat 20
+    python -m personavix.benchmarks.payload_benchmark --base-url http://localhost:5174
+
+Functions:
+    build_cases: Build the benchmark cases.
+    run_benchmark: Measure every case.
+    main: Command line entry point.
+"""
+
+# pylint: disable=import-error
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from sqlalchemy import func, select
+from personavix.benchmarks.load_suite import load_actors, open_client, percentile
+from personavix.src.database.database import SessionLocal
+from personavix.src.middleware.compression import brotli
+from personavix.src.models.domain.answers import Respostas
+
+ANSWER_FIELDS = (
+    "id_resposta,dominancia,influencia,estabilidade,conformidade,usuarios_.nome"
+)
+USER_FIELDS = "id_usuario,nome,setor"
+
+
+def build_cases() -> list[dict]:
+    """
+    Build the benchmark cases.
+
+    Returns:
+        list[dict]: The name, path, fields and Accept-Encoding of each case.
+    """
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    cases = []
+    for path, fields in (("/answers/", ANSWER_FIELDS), ("/users/", USER_FIELDS)):
+        for selection in (None, fields):
+            for encoding in encodings:
+                name = f"{path}{'?fields' if selection else ''} [{encoding}]"
+                cases.append(
+                    {"name": name, "path": path, "fields": selection, "encoding": encoding}
+                )
+    return cases
+
+
+async def _measure(client, headers: dict, case: dict, repeat: int) -> dict:
+    """
+    Measure one case.
+
+    Args:
+        client: The HTTP client.
+        headers: The authorization headers.
+        case: The case.
+        repeat: The number of measured requests.
+
+    Returns:
+        dict: The latencies in milliseconds and the sizes in bytes.
+    """
+    params = {"fields": case["fields"]} if case["fields"] else None
+    request_headers = {**headers, "Accept-Encoding": case["encoding"]}
+    latencies = []
+    for _ in range(repeat + 1):
+        started_at = time.perf_counter()
+        response = await client.get(case["path"], params=params, headers=request_headers)
+        body = response.content
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        response.raise_for_status()
+
+    latencies = sorted(latencies[1:])  # The first request warms up the caches.
+    return {
+        "rows": len(json.loads(body)),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "wire_bytes": response.num_bytes_downloaded,
+        "decoded_bytes": len(body),
+        "content_encoding": response.headers.get("content-encoding", "identity"),
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    """
+    Measure every case.
+
+    Args:
+        args: The parsed command line arguments.
+
+    Returns:
+        dict: The measures by case name.
+    """
+    _, admin = load_actors(0)
+    if not admin:
+        raise SystemExit("No admin with access and password was found.")
+
+    results = {}
+    async with open_client(args.base_url) as client:
+        response = await client.post(
+            "/users/login", json={"email": admin["email"], "senha": args.password}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for case in build_cases():
+            results[case["name"]] = await _measure(client, headers, case, args.repeat)
+    return results
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare list responses with sparse fieldsets and compression."
+    )
+    parser.add_argument("--base-url", help="Run against a server instead of in-process.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db:
+        answers_count = db.execute(
+            select(func.count()).select_from(Respostas)  # pylint: disable=not-callable
+        ).scalar()
+    if answers_count < args.rows:
+        print(f"Only {answers_count} answers are loaded, {args.rows} were expected.")
+
+    results = asyncio.run(run_benchmark(args))
+
+    print(f"{'case':<32}{'rows':>7}{'p50 ms':>10}{'p95 ms':>10}{'wire':>12}{'decoded':>12}")
+    for name, measures in results.items():
+        print(
+            f"{name:<32}{measures['rows']:>7}{measures['p50_ms']:>10}"
+            f"{measures['p95_ms']:>10}{measures['wire_bytes']:>12}"
+            f"{measures['decoded_bytes']:>12}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
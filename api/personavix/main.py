@@ -1,21 +1,54 @@
 """
-Central module that runs the migrations and aggregate all the routes
+Central module that builds the application and aggregates all the routes.
+
+Importing this module does no I/O: create_app only assembles the application, and
+the database schema is prepared, and the background workers started, by the lifespan
+of the application.
+
+Functions:
+    lifespan: Prepare the database and run the background workers of the API.
+    create_app: Build the application.
 """
 
 # pylint: disable=import-error
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
+from starlette.concurrency import run_in_threadpool
 from personavix.src.routes import (
     answers,
+    dashboard,
+    health,
     questionary,
     unique_access_links,
     users,
 )
-from personavix.src.database.database import engine, Base
-
+from personavix.src.cache.shared_cache import (
+    start_cache_invalidation,
+    stop_cache_invalidation,
+)
+from personavix.src.database.database import engine
+from personavix.src.database.schema import prepare_schema_with_retries
+from personavix.src.dependencies.multi_get import MISSING_IDS_HEADER
+from personavix.src.dependencies.token_versions import (
+    start_token_version_refresher,
+    stop_token_version_refresher,
+)
+from personavix.src.events.link_status import link_status_broker
+from personavix.src.ingestion.answers_queue import (
+    start_answers_flusher,
+    stop_answers_flusher,
+)
+from personavix.src.middleware.compression import CompressionMiddleware
+from personavix.src.middleware.query_budget import QueryBudgetMiddleware
+from personavix.src.middleware.read_your_writes import ReadYourWritesMiddleware
+from personavix.src.maintenance.link_expiry import start_link_sweeper, stop_link_sweeper
+from personavix.src.maintenance.warmup import mark_not_ready, mark_ready, run_warmup
+from personavix.src.reports.renderer import shutdown_report_renderer
+from personavix.src.settings import settings
 
-Base.metadata.create_all(bind=engine)
 
 description = """
 ## Welcome to PersonaVix API
@@ -32,6 +65,14 @@ tags_metadata = [
         "description": "operations related to answers of the disc test. This includes "
         "creating and obtaining answers.",
     },
+    {
+        "name": "Dashboard",
+        "description": "Aggregated stats and latest answers of the admin landing page.",
+    },
+    {
+        "name": "Health",
+        "description": "Liveness and readiness probes of the worker.",
+    },
     {
         "name": "Questionary",
         "description": "Operations related to disc questionary. This includes "
@@ -49,38 +90,101 @@ tags_metadata = [
     },
 ]
 
-app = FastAPI(
-    openapi_tags=tags_metadata,
-    title="PeronaVix API",
-    description=description,
-    version="1.0.0",
-    contact={
-        "name": "PersonaVix",
-        "url": "https://personavix.com.br/",
-    },
-)
-
 origins = [
     "http://localhost:5173",  # Temporary solution for CORS error
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(answers.router)
-app.include_router(questionary.router)
-app.include_router(unique_access_links.router)
-app.include_router(users.router)
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Prepare the database and run the background workers of the API.
+
+    The warm-up runs in the background once the schema is ready: the worker already
+    answers its probes, but only reports ready when the warm-up has finished.
+
+    Args:
+        _app: The application.
+    """
+    await run_in_threadpool(
+        prepare_schema_with_retries,
+        engine,
+        settings.SCHEMA_STARTUP_MODE,
+        settings.DB_STARTUP_RETRIES,
+        settings.DB_STARTUP_RETRY_DELAY,
+    )
+    start_cache_invalidation()
+    await run_in_threadpool(start_token_version_refresher)
+    warmup = None
+    if settings.WARMUP_ENABLED:
+        warmup = asyncio.create_task(run_in_threadpool(run_warmup))
+    else:
+        mark_ready()
+    if settings.ANSWERS_INGESTION_MODE == "queue":
+        start_answers_flusher()
+    if settings.LINK_SWEEP_INTERVAL > 0:
+        start_link_sweeper()
+
+    yield
+
+    if warmup is not None:
+        await warmup
+    mark_not_ready()
+    link_status_broker.close()
+    stop_cache_invalidation()
+    stop_token_version_refresher()
+    stop_answers_flusher()
+    stop_link_sweeper()
+    shutdown_report_renderer()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application.
+
+    Returns:
+        FastAPI: The application, with its middlewares, routes and metrics.
+    """
+    application = FastAPI(
+        openapi_tags=tags_metadata,
+        title="PeronaVix API",
+        description=description,
+        version="1.0.0",
+        contact={
+            "name": "PersonaVix",
+            "url": "https://personavix.com.br/",
+        },
+        lifespan=lifespan,
+    )
+
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[MISSING_IDS_HEADER],
+    )
+    application.add_middleware(QueryBudgetMiddleware)
+    application.add_middleware(
+        ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_WINDOW
+    )
+    application.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
 
+    application.include_router(answers.router)
+    application.include_router(dashboard.router)
+    application.include_router(health.router)
+    application.include_router(questionary.router)
+    application.include_router(unique_access_links.router)
+    application.include_router(users.router)
 
-instrumentator = Instrumentator().instrument(app)
+    Instrumentator().instrument(application).expose(application)
+    return application
 
 
-@app.on_event("startup")
-async def _startup():
-    instrumentator.expose(app)
+app = create_app()
@@ -0,0 +1,73 @@
+"""
+Module: answers.py
+
+This module contains the cache of individual answers.
+
+An answer never changes once it is written, so its serialized payload and strong
+ETag are cached by id without invalidation, bounded per worker by ANSWER_CACHE_MAX_BYTES
+bytes of payloads and ANSWER_CACHE_SIZE entries, and shared by the workers when the
+caches have a shared tier.
+
+Functions:
+    get_cached_answer: Get the cached payload and ETag of an answer.
+    cache_answer: Cache the payload of an answer and compute its ETag.
+    etag_matches: Check an If-None-Match header against an ETag.
+"""
+
+import hashlib
+from personavix.src.cache.shared_cache import SharedCache
+from personavix.src.settings import settings
+
+answer_cache = SharedCache(
+    "answers",
+    settings.ANSWER_CACHE_SIZE,
+    settings.ANSWER_CACHE_TTL,
+    maxbytes=settings.ANSWER_CACHE_MAX_BYTES,
+)
+
+
+def get_cached_answer(id_answer: int) -> tuple[str, bytes]:
+    """
+    Get the cached payload and ETag of an answer.
+
+    Args:
+        id_answer: The id of the answer.
+
+    Returns:
+        tuple[str, bytes]: The ETag and the serialized answer, or None when the
+        answer is not cached.
+    """
+    return answer_cache.get(id_answer)
+
+
+def cache_answer(id_answer: int, payload: bytes) -> tuple[str, bytes]:
+    """
+    Cache the payload of an answer and compute its ETag.
+
+    Args:
+        id_answer: The id of the answer.
+        payload: The serialized answer.
+
+    Returns:
+        tuple[str, bytes]: The ETag and the serialized answer.
+    """
+    entry = (f'"{hashlib.sha256(payload).hexdigest()[:32]}"', payload)
+    answer_cache.set(id_answer, entry)
+    return entry
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Args:
+        if_none_match: The value of the If-None-Match header.
+        etag: The current ETag of the resource.
+
+    Returns:
+        bool: True if the client already has the current representation.
+    """
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
@@ -0,0 +1,100 @@
+"""
+Module: dashboard.py
+
+This module contains the cache of the dashboard of the admin landing page.
+
+The dashboard is computed with three queries: one aggregate over the unique access
+links, one count of the users grouped by permission, and the latest answers read
+backwards along the primary key. The serialized dashboard is cached for
+DASHBOARD_CACHE_TTL seconds, so it may lag the database by that much, and every admin
+opening the page meanwhile is served without a query.
+
+Functions:
+    get_dashboard_payload: Get the serialized dashboard, computing it when needed.
+    compute_dashboard: Compute the dashboard from the database.
+"""
+
+# pylint: disable=import-error, not-callable
+from datetime import datetime
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, joinedload
+from personavix.src.cache.shared_cache import SharedCache
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.models.schemas import dashboard
+from personavix.src.settings import settings
+
+DASHBOARD_KEY = "dashboard"
+
+dashboard_cache = SharedCache("dashboard", 1, settings.DASHBOARD_CACHE_TTL)
+
+
+def compute_dashboard(db: Session) -> dict:
+    """
+    Compute the dashboard from the database.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        dict: The dashboard, in the form of the Dashboard schema.
+    """
+    unanswered = LinksAcessoUnico.respondido == 0
+    total, answered, expired = db.query(
+        func.count(LinksAcessoUnico.id_sessao),
+        func.sum(case((LinksAcessoUnico.respondido == 1, 1), else_=0)),
+        func.sum(
+            case((unanswered & LinksAcessoUnico.expirado_em.isnot(None), 1), else_=0)
+        ),
+    ).one()
+    answered, expired = answered or 0, expired or 0
+
+    users_by_permission = (
+        db.query(Usuarios.permissao, func.count(Usuarios.id_usuario))
+        .group_by(Usuarios.permissao)
+        .order_by(Usuarios.permissao)
+        .all()
+    )
+
+    # Ids grow with time, the primary key gives the latest answers without a sort.
+    latest_answers = (
+        db.query(Respostas)
+        .options(joinedload(Respostas.usuarios_))
+        .order_by(Respostas.id_resposta.desc())
+        .limit(settings.DASHBOARD_LATEST_ANSWERS)
+        .all()
+    )
+
+    return {
+        "links": {
+            "total": total,
+            "respondidos": answered,
+            "pendentes": total - answered - expired,
+            "expirados": expired,
+        },
+        "usuarios": [
+            {"permissao": permission, "total": count}
+            for permission, count in users_by_permission
+        ],
+        "ultimas_respostas": latest_answers,
+        "gerado_em": datetime.now(),
+    }
+
+
+def get_dashboard_payload(db: Session) -> bytes:
+    """
+    Get the serialized dashboard, computing it when needed.
+
+    Args:
+        db: The database session, only used when the dashboard is not cached.
+
+    Returns:
+        bytes: The dashboard as JSON.
+    """
+    payload = dashboard_cache.get(DASHBOARD_KEY)
+    if payload is None:
+        payload = serialize_response(dashboard.Dashboard, compute_dashboard(db))
+        dashboard_cache.set(DASHBOARD_KEY, payload)
+    return payload
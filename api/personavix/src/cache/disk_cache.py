@@ -0,0 +1,138 @@
+"""
+Module: disk_cache.py
+
+This module contains a size-bounded cache of files on the local disk.
+
+Classes:
+    DiskCache: LRU cache of byte strings stored as files in a directory.
+"""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+
+class DiskCache:
+    """
+    LRU cache of byte strings stored as files in a directory.
+
+    The modification time of a file is its last use, so the cache survives restarts
+    and is shared by the processes using the same directory. When the files exceed
+    max_bytes, the least recently used ones are removed.
+
+    Attributes:
+        directory: The directory of the files.
+        max_bytes: The maximum total size of the files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(path.stat().st_size for path in self._files())
+
+    def _files(self) -> list[Path]:
+        """
+        List the cached files, ignoring files still being written.
+
+        Returns:
+            list[Path]: The paths of the cached files.
+        """
+        return [
+            path
+            for path in self.directory.iterdir()
+            if path.is_file() and not path.name.startswith(".")
+        ]
+
+    def _path(self, key: str) -> Path:
+        """
+        Get the path of a key.
+
+        Args:
+            key: The key, a valid file name.
+
+        Returns:
+            Path: The path of the file.
+        """
+        return self.directory / key
+
+    def get(self, key: str) -> bytes:
+        """
+        Read a cached value and mark it as recently used.
+
+        Args:
+            key: The key, a valid file name.
+
+        Returns:
+            bytes: The cached value, or None when the key is not cached.
+        """
+        path = self._path(key)
+        try:
+            value = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Store a value, removing the least recently used files if the cache is full.
+
+        The value is written to a temporary file and renamed, so readers never see a
+        partial file.
+
+        Args:
+            key: The key, a valid file name.
+            value: The value to store.
+        """
+        if len(value) > self.max_bytes:
+            return
+
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix=".")
+        with os.fdopen(descriptor, "wb") as temporary_file:
+            temporary_file.write(value)
+
+        path = self._path(key)
+        with self._lock:
+            try:
+                self._size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(temporary_path, path)
+            self._size += len(value)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used files until the cache fits in max_bytes."""
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+
+    def delete(self, key: str) -> None:
+        """
+        Remove a cached value, if present.
+
+        Args:
+            key: The key, a valid file name.
+        """
+        with self._lock:
+            try:
+                size = self._path(key).stat().st_size
+                self._path(key).unlink()
+            except FileNotFoundError:
+                return
+            self._size -= size
@@ -0,0 +1,56 @@
+"""
+Module: questionary.py
+
+This module contains the cache of the questionary.
+
+The questions and DISC characteristics are only changed by migrations, so the
+serialized questionary is cached as a whole for QUESTIONARY_CACHE_TTL seconds and
+every candidate after the first one is served without a query.
+
+Functions:
+    get_questionary_payload: Get the serialized questionary, loading it when needed.
+    invalidate_questionary: Remove the cached questionary.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy.orm import Session
+from personavix.src.cache.shared_cache import SharedCache
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.models.domain.disc_characteristics import CaracteristicasDisc
+from personavix.src.models.domain.questions import Perguntas
+from personavix.src.models.schemas import questionary
+from personavix.src.settings import settings
+
+QUESTIONARY_KEY = "questionary"
+
+questionary_cache = SharedCache("questionary", 1, settings.QUESTIONARY_CACHE_TTL)
+
+
+def get_questionary_payload(db: Session) -> bytes:
+    """
+    Get the serialized questionary, loading it when needed.
+
+    Args:
+        db: The database session, only used when the questionary is not cached.
+
+    Returns:
+        bytes: The questions and DISC characteristics as JSON.
+    """
+    payload = questionary_cache.get(QUESTIONARY_KEY)
+    if payload is None:
+        questions = db.query(Perguntas).all()
+        payload = serialize_response(
+            questionary.Questionary,
+            {
+                "questions": questions,
+                "disc_characteristics": db.query(CaracteristicasDisc).all(),
+            },
+        )
+        if questions:  # An empty questionary is not seeded yet, never cache it.
+            questionary_cache.set(QUESTIONARY_KEY, payload)
+    return payload
+
+
+def invalidate_questionary() -> None:
+    """Remove the cached questionary."""
+    questionary_cache.invalidate(keys=[QUESTIONARY_KEY])
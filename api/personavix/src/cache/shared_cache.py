@@ -0,0 +1,453 @@
+"""
+Module: shared_cache.py
+
+This module contains the caches shared by the workers of the API.
+
+Each cache has two tiers: an LRU cache in the process, always used, and an optional
+tier shared by every worker through a server speaking the Redis protocol. A worker
+missing an entry locally looks it up in the shared tier before the caller reads the
+database.
+
+Entries may carry tags, like "user:12", to invalidate every entry about a row at once.
+An invalidation removes the entries from the shared tier and is published on
+CACHE_INVALIDATION_CHANNEL; the invalidation listener of every worker removes them
+from its own tier. A listener which lost its connection clears its local tiers when
+it subscribes again, since it may have missed invalidations.
+
+Values are pickled in the shared tier, which must be trusted like the database. A
+worker copying an entry of the shared tier into its local tier keeps it no longer than
+it has left to live in the shared tier.
+Tests may pass any client speaking the Redis protocol to CacheBus, like a
+fakeredis.FakeRedis client: clients on the same FakeServer behave as workers sharing
+a Redis server.
+
+When the shared tier fails, the caches use their local tier only for
+SHARED_TIER_COOLDOWN seconds, so an outage of Redis does not slow every request down.
+Invalidations are still attempted during the cooldown, since the other workers may
+still read the shared tier. An invalidation that fails is kept, up to
+MAX_MISSED_INVALIDATIONS of them, and replayed before the shared tier is used again.
+
+Classes:
+    CacheBus: Shared tier and invalidation channel of the caches of a worker.
+    SharedCache: Two-tier cache with tag invalidation.
+
+Functions:
+    start_cache_invalidation: Start listening to the invalidations of other workers.
+    stop_cache_invalidation: Stop listening to the invalidations of other workers.
+"""
+
+# pylint: disable=import-error
+import json
+import pickle
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Hashable, Iterable
+import redis
+from prometheus_client import Counter
+from personavix.src.cache.ttl_cache import TTLCache
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+SHARED_TIER_COOLDOWN = 5.0
+MAX_MISSED_INVALIDATIONS = 1000
+KEY_PREFIX = "cache:"
+CACHE_LOOKUPS = Counter(
+    "personavix_cache_lookups_total",
+    "Cache lookups, by cache and by tier answering them.",
+    ["cache", "tier"],
+)
+CACHE_INVALIDATIONS = Counter(
+    "personavix_cache_invalidations_total",
+    "Invalidations applied to the local tier, by cache and origin.",
+    ["cache", "origin"],
+)
+
+
+class CacheBus:  # pylint: disable=too-many-instance-attributes
+    """
+    Shared tier and invalidation channel of the caches of a worker.
+
+    Attributes:
+        client: The Redis client, or None when the caches are local only.
+        channel: The channel of the invalidations.
+        origin: The id of the worker, so it ignores its own invalidations.
+    """
+
+    def __init__(self, client=None, channel: str = None):
+        self.client = client
+        self.channel = channel or settings.CACHE_INVALIDATION_CHANNEL
+        self.origin = uuid.uuid4().hex
+        self._caches: dict[str, "SharedCache"] = {}
+        self._stopped = threading.Event()
+        self._listener: threading.Thread = None
+        self._down_until = 0.0
+        self._missed = deque(maxlen=MAX_MISSED_INVALIDATIONS)
+        self._missed_lock = threading.Lock()
+
+    def _available(self) -> bool:
+        """
+        Check whether the shared tier should be used, replaying missed invalidations.
+
+        Returns:
+            bool: False without a client, while cooling down from a failure, or when
+            the missed invalidations still fail.
+        """
+        if self.client is None or time.monotonic() < self._down_until:
+            return False
+        return not self._missed or self._replay_missed()
+
+    def _replay_missed(self) -> bool:
+        """
+        Apply the invalidations which failed, oldest first.
+
+        Returns:
+            bool: True when every missed invalidation was applied.
+        """
+        with self._missed_lock:
+            try:
+                while self._missed:
+                    self._invalidate_shared(*self._missed[0])
+                    self._missed.popleft()
+            except redis.RedisError as e:
+                self._failed("Cache invalidation not shared, retried later", e)
+                return False
+        return True
+
+    def _failed(self, message: str, error: Exception) -> None:
+        """
+        Log a failure of the shared tier and stop using it for a while.
+
+        Args:
+            message: The message logged.
+            error: The error of the client.
+        """
+        self._down_until = time.monotonic() + SHARED_TIER_COOLDOWN
+        setup_logger().error(
+            "%s, local tier only for %ss: %s", message, SHARED_TIER_COOLDOWN, error
+        )
+
+    def register(self, cache: "SharedCache") -> None:
+        """
+        Register a cache, so it receives the invalidations of other workers.
+
+        Args:
+            cache: The cache.
+        """
+        self._caches[cache.name] = cache
+
+    def key(self, cache: str, key: Hashable) -> str:
+        """
+        Get the key of an entry in the shared tier.
+
+        Args:
+            cache: The name of the cache.
+            key: The key of the entry.
+
+        Returns:
+            str: The key of the shared tier.
+        """
+        return f"{KEY_PREFIX}{cache}:{key}"
+
+    def tag_key(self, cache: str, tag: str) -> str:
+        """
+        Get the key of the set of the entries of a tag in the shared tier.
+
+        Args:
+            cache: The name of the cache.
+            tag: The tag.
+
+        Returns:
+            str: The key of the set.
+        """
+        return f"{KEY_PREFIX}{cache}:tag:{tag}"
+
+    def get(self, cache: str, key: Hashable) -> tuple[tuple, float]:
+        """
+        Get an entry from the shared tier, with the time it has left to live.
+
+        Args:
+            cache: The name of the cache.
+            key: The key of the entry.
+
+        Returns:
+            tuple[tuple, float]: The entry, as its tags and value, and its time to live
+            in seconds, None for an entry which does not expire. None when the entry is
+            missing or the shared tier is unavailable.
+        """
+        if not self._available():
+            return None
+        try:
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.get(self.key(cache, key))
+            pipeline.pttl(self.key(cache, key))
+            data, milliseconds = pipeline.execute()
+        except redis.RedisError as e:
+            self._failed("Shared cache unavailable", e)
+            return None
+        if data is None:
+            return None
+        return pickle.loads(data), milliseconds / 1000 if milliseconds >= 0 else None
+
+    def set(self, cache: str, key: Hashable, entry: tuple, ttl: float) -> None:
+        """
+        Store an entry in the shared tier, and add it to the sets of its tags.
+
+        Args:
+            cache: The name of the cache.
+            key: The key of the entry.
+            entry: The tags and the value.
+            ttl: The time to live of the entry, in seconds.
+        """
+        if not self._available():
+            return
+        milliseconds = max(1, int(ttl * 1000))
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.set(self.key(cache, key), pickle.dumps(entry), px=milliseconds)
+            for tag in entry[0]:
+                pipeline.sadd(self.tag_key(cache, tag), str(key))
+                pipeline.pexpire(self.tag_key(cache, tag), milliseconds)
+            pipeline.execute()
+        except redis.RedisError as e:
+            self._failed("Shared cache unavailable", e)
+
+    def invalidate(self, cache: str, keys: list, tags: list) -> None:
+        """
+        Remove entries from the shared tier and tell the other workers.
+
+        The invalidation is attempted even while cooling down from a failure, and
+        kept to be replayed when it fails.
+
+        Args:
+            cache: The name of the cache.
+            keys: The keys of the entries.
+            tags: The tags of the entries.
+        """
+        if self.client is None:
+            return
+        self._missed.append((cache, keys, tags))
+        self._replay_missed()
+
+    def _invalidate_shared(self, cache: str, keys: list, tags: list) -> None:
+        """
+        Remove entries from the shared tier and publish their invalidation.
+
+        Args:
+            cache: The name of the cache.
+            keys: The keys of the entries.
+            tags: The tags of the entries.
+
+        Raises:
+            redis.RedisError: Raised when the shared tier fails.
+        """
+        tag_keys = [self.tag_key(cache, tag) for tag in tags]
+        members = set(keys)
+        for tag_key in tag_keys:
+            members.update(
+                member.decode() if isinstance(member, bytes) else member
+                for member in self.client.smembers(tag_key)
+            )
+        stale = [self.key(cache, key) for key in members] + tag_keys
+        if stale:
+            self.client.delete(*stale)
+        self.client.publish(
+            self.channel,
+            json.dumps({"origin": self.origin, "cache": cache, "keys": keys, "tags": tags}),
+        )
+
+    def _apply(self, data: bytes) -> None:
+        """
+        Apply an invalidation published by another worker.
+
+        Args:
+            data: The published message.
+        """
+        message = json.loads(data)
+        cache = self._caches.get(message["cache"])
+        if cache is not None and message["origin"] != self.origin:
+            cache.invalidate_local(message["keys"], message["tags"], origin="remote")
+
+    def _listen(self) -> None:
+        """Apply the invalidations of other workers until stopped, reconnecting."""
+        delay = 0.5
+        while not self._stopped.is_set():
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for cache in self._caches.values():
+                    cache.clear_local()  # Invalidations may have been missed.
+                delay = 0.5
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self._apply(message["data"])
+                pubsub.close()
+            except redis.RedisError as e:
+                setup_logger().error("Cache invalidation listener disconnected: %s", e)
+                self._stopped.wait(delay)
+                delay = min(delay * 2, 30.0)
+
+    def start(self) -> None:
+        """Start the invalidation listener, when there is a shared tier."""
+        if self.client is None or self._listener is not None:
+            return
+        self._stopped.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="cache-invalidation", daemon=True
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Stop the invalidation listener."""
+        if self._listener is None:
+            return
+        self._stopped.set()
+        self._listener.join(timeout=5)
+        self._listener = None
+
+
+def _create_cache_bus() -> CacheBus:
+    """
+    Create the bus of the process from the settings.
+
+    Returns:
+        CacheBus: A bus with a Redis client when CACHE_BACKEND is "redis", a local bus
+        otherwise.
+    """
+    if settings.CACHE_BACKEND != "redis":
+        return CacheBus()
+    return CacheBus(
+        redis.Redis.from_url(
+            settings.CACHE_REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25
+        )
+    )
+
+
+cache_bus = _create_cache_bus()
+
+
+class SharedCache:
+    """
+    Two-tier cache with tag invalidation.
+
+    Keys are stored as strings, the form in which other workers send them.
+
+    Attributes:
+        name: The name of the cache, unique in the process.
+        local: The tier of the process, bounded by maxsize entries and, when set, by
+            maxbytes bytes of values.
+        ttl: The default time to live of an entry, in seconds.
+        bus: The shared tier and invalidation channel.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        bus: CacheBus = None,
+        maxbytes: int = None,
+    ):
+        self.name = name
+        self.local = TTLCache(maxsize, ttl, maxbytes)
+        self.ttl = ttl
+        self.bus = bus or cache_bus
+        self.bus.register(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value, from the local tier or else from the shared tier.
+
+        A value found in the shared tier is kept in the local tier for the time it has
+        left to live there, at most the ttl of the cache.
+
+        Args:
+            key: The key of the entry.
+            default: The value returned when the key is missing.
+
+        Returns:
+            Any: The cached value, or the default.
+        """
+        key = str(key)
+        entry = self.local.get(key)
+        if entry is not None:
+            CACHE_LOOKUPS.labels(self.name, "local").inc()
+            return entry[1]
+        shared = self.bus.get(self.name, key)
+        if shared is None:
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return default
+        CACHE_LOOKUPS.labels(self.name, "shared").inc()
+        entry, ttl = shared
+        self.local.set(
+            key,
+            entry,
+            ttl=self.ttl if ttl is None else min(ttl, self.ttl),
+            tags=entry[0],
+        )
+        return entry[1]
+
+    def set(
+        self, key: Hashable, value: Any, ttl: float = None, tags: Iterable[str] = ()
+    ) -> None:
+        """
+        Store a value in both tiers.
+
+        Args:
+            key: The key of the entry.
+            value: The value, picklable.
+            ttl: The time to live of the entry. Defaults to the cache's ttl.
+            tags: The tags invalidating the entry.
+        """
+        key, entry = str(key), (frozenset(tags), value)
+        self.local.set(key, entry, ttl=ttl, tags=entry[0])
+        self.bus.set(self.name, key, entry, self.ttl if ttl is None else ttl)
+
+    def invalidate(self, keys: Iterable = (), tags: Iterable[str] = ()) -> None:
+        """
+        Remove entries from every tier of every worker.
+
+        Args:
+            keys: The keys of the entries.
+            tags: The tags of the entries.
+        """
+        keys, tags = [str(key) for key in keys], list(tags)
+        if not keys and not tags:
+            return
+        self.invalidate_local(keys, tags)
+        self.bus.invalidate(self.name, keys, tags)
+
+    def invalidate_local(
+        self, keys: Iterable, tags: Iterable[str], origin: str = "local"
+    ) -> None:
+        """
+        Remove entries from the local tier only.
+
+        Args:
+            keys: The keys of the entries.
+            tags: The tags of the entries.
+            origin: "local" for the invalidations of this worker, "remote" otherwise.
+        """
+        CACHE_INVALIDATIONS.labels(self.name, origin).inc()
+        for key in keys:
+            self.local.delete(str(key))
+        self.local.delete_tags(tags)
+
+    def clear_local(self) -> None:
+        """Remove every entry of the local tier."""
+        self.local.clear()
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+
+def start_cache_invalidation() -> None:
+    """Start listening to the invalidations of other workers."""
+    cache_bus.start()
+
+
+def stop_cache_invalidation() -> None:
+    """Stop listening to the invalidations of other workers."""
+    cache_bus.stop()
@@ -0,0 +1,175 @@
+"""
+Module: ttl_cache.py
+
+This module contains a thread-safe, size-bounded LRU cache with expiration.
+
+The cache is bounded by its number of entries and, optionally, by the total size of
+its entries: the length of the bytes and strings they hold.
+
+Entries may carry tags, indexed to the keys of their entries, so removing every entry
+of a tag only touches those entries.
+
+Classes:
+    TTLCache: LRU cache whose entries expire after a time to live.
+
+Functions:
+    sizeof: Get the size of a value, as counted against the bound of a cache.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+
+def sizeof(value: Any) -> int:
+    """
+    Get the size of a value, as counted against the bound of a cache.
+
+    Args:
+        value: The value, like serialized payloads in tuples.
+
+    Returns:
+        int: The length of its bytes and strings, or sys.getsizeof for other values.
+    """
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list, frozenset, set)):
+        return sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after a time to live.
+
+    When the cache is full, the least recently used entries are evicted. The index of
+    the tags follows the entries as they are replaced, evicted, expired or deleted.
+
+    Attributes:
+        maxsize: The maximum number of entries.
+        ttl: The default time to live of an entry, in seconds.
+        maxbytes: The maximum total size of the entries, or None for no limit.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, maxbytes: int = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self._entries: OrderedDict = OrderedDict()
+        self._tags: dict[Hashable, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value and mark it as recently used.
+
+        Args:
+            key: The key of the entry.
+            default: The value returned when the key is missing or expired.
+
+        Returns:
+            Any: The cached value, or the default.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value, _, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(
+        self, key: Hashable, value: Any, ttl: float = None, tags: Iterable = ()
+    ) -> None:
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+
+        A value larger than maxbytes is not stored.
+
+        Args:
+            key: The key of the entry.
+            value: The value to store.
+            ttl: The time to live of the entry. Defaults to the cache's ttl.
+            tags: The tags of the entry, removing it with delete_tags.
+        """
+        size = sizeof(value) if self.maxbytes is not None else 0
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            self._remove(key)
+            if self.maxsize <= 0 or (self.maxbytes is not None and size > self.maxbytes):
+                return
+            self._entries[key] = (expires_at, value, tags, size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize or (
+                self.maxbytes is not None and self._bytes > self.maxbytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        """
+        Remove an entry and its keys from the index of the tags, under the lock.
+
+        Args:
+            key: The key of the entry.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[3]
+        for tag in entry[2]:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Remove an entry, if present.
+
+        Args:
+            key: The key of the entry.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def delete_tags(self, tags: Iterable) -> int:
+        """
+        Remove the entries carrying any of the tags.
+
+        Args:
+            tags: The tags.
+
+        Returns:
+            int: The number of removed entries.
+        """
+        with self._lock:
+            keys = set().union(*(self._tags.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    @property
+    def bytes(self) -> int:
+        """The total size of the entries."""
+        with self._lock:
+            return self._bytes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,103 @@
+"""
+Module: unique_access_links.py
+
+This module contains the cache of the public lookup of unique access links.
+
+The serialized link-with-user payload is cached by link string, tagged with the
+session and the user of the link. Unknown links are cached too, for a shorter time, so
+probing random links does not reach the database. Invalidations reach every worker,
+see personavix.src.cache.shared_cache.
+
+Functions:
+    get_cached_link: Get the cached lookup of a link.
+    cache_link: Cache the serialized payload of a link.
+    cache_missing_link: Cache that a link does not exist.
+    invalidate_link: Remove the cached lookup of a link.
+    invalidate_link_sessions: Remove the cached lookups of link sessions.
+    invalidate_user_links: Remove the cached lookups of the links of a user.
+"""
+
+from typing import Iterable
+from personavix.src.cache.shared_cache import SharedCache
+from personavix.src.settings import settings
+
+MISSING_LINK = object()
+
+link_lookup_cache = SharedCache(
+    "links", settings.LINK_LOOKUP_CACHE_SIZE, settings.LINK_LOOKUP_CACHE_TTL
+)
+
+
+def get_cached_link(link: str):
+    """
+    Get the cached lookup of a link.
+
+    Args:
+        link: The link string.
+
+    Returns:
+        bytes: The serialized payload, MISSING_LINK for a link known not to exist,
+        or None when the lookup is not cached.
+    """
+    payload = link_lookup_cache.get(link)
+    if payload is None:
+        return None
+    return payload or MISSING_LINK
+
+
+def cache_link(link: str, id_session: int, id_user: int, payload: bytes) -> None:
+    """
+    Cache the serialized payload of a link.
+
+    Args:
+        link: The link string.
+        id_session: The id of the session of the link.
+        id_user: The id of the user of the link.
+        payload: The serialized link with its user.
+    """
+    link_lookup_cache.set(
+        link, payload, tags=(f"session:{id_session}", f"user:{id_user}")
+    )
+
+
+def cache_missing_link(link: str) -> None:
+    """
+    Cache that a link does not exist.
+
+    Args:
+        link: The link string.
+    """
+    # An empty payload, since a link with its user never serializes to nothing.
+    link_lookup_cache.set(link, b"", ttl=settings.LINK_LOOKUP_NEGATIVE_CACHE_TTL)
+
+
+def invalidate_link(link: str) -> None:
+    """
+    Remove the cached lookup of a link.
+
+    Args:
+        link: The link string.
+    """
+    link_lookup_cache.invalidate(keys=[link])
+
+
+def invalidate_link_sessions(id_sessions: Iterable[int]) -> None:
+    """
+    Remove the cached lookups of link sessions, after they are answered.
+
+    Args:
+        id_sessions: The ids of the sessions.
+    """
+    link_lookup_cache.invalidate(
+        tags={f"session:{id_session}" for id_session in id_sessions}
+    )
+
+
+def invalidate_user_links(id_user: int) -> None:
+    """
+    Remove the cached lookups of the links of a user, after the user is updated.
+
+    Args:
+        id_user: The id of the user.
+    """
+    link_lookup_cache.invalidate(tags=[f"user:{id_user}"])
@@ -3,37 +3,192 @@ Module: database.py
 
 This module contains the database configuration and connection setup.
 
+Creating the engine does not connect: the first connection is opened by the first
+query, and the schema is prepared by the lifespan of the application.
+
+Reads which tolerate a little replication lag may go to a read replica through
+get_read_db. Without DB_READ_HOST or DATABASE_READ_URL, read_engine is the primary
+engine. DATABASE_URL and DATABASE_READ_URL replace the MySQL URLs, so local tests can
+point both engines at the same SQLite file.
+
+Both dependencies reject the request with 503 while the circuit breaker of their
+database is open, and give their session the DB_STATEMENT_TIMEOUT of requests, see
+personavix.src.database.resilience.
+
 Functions:
     get_db: Get a database instance.
+    get_read_db: Get a database instance for reads, on the replica when possible.
+    get_dialect_name: Get the dialect of a session or connection.
 """
 
 # pylint: disable=import-error
-import os
-from sqlalchemy import create_engine
+from http import HTTPStatus
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.orm import Session, sessionmaker
+from personavix.src.database.resilience import (
+    READ_SESSIONS,
+    CircuitBreaker,
+    ReadSession,
+    install_resilience,
+    set_statement_timeout,
+)
+from personavix.src.middleware.query_budget import track_queries
+from personavix.src.middleware.read_your_writes import wrote_recently
+from personavix.src.settings import settings
 
-load_dotenv()
 
-DB_HOST = os.getenv("DB_HOST")
-DB_USER = os.getenv("DB_USER")
-DB_SCHEMA = os.getenv("DB_SCHEMA")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_PORT = os.getenv("DB_PORT")
+def _mysql_url(host: str, port: str, user: str, password: str) -> URL:
+    """
+    Build the URL of a MySQL database of the schema.
+
+    Args:
+        host: The host of the database.
+        port: The port of the database, unset for the default one.
+        user: The user of the database.
+        password: The password of the user.
+
+    Returns:
+        URL: The URL, with the user and password escaped.
+    """
+    return URL.create(
+        "mysql",
+        username=user,
+        password=password,
+        host=host,
+        port=int(port) if port else None,
+        database=settings.DB_SCHEMA,
+    )
+
+
+DATABASE_URL = settings.DATABASE_URL or _mysql_url(
+    settings.DB_HOST, settings.DB_PORT, settings.DB_USER, settings.DB_PASSWORD
+)
+DATABASE_READ_URL = settings.DATABASE_READ_URL or (
+    settings.DB_READ_HOST
+    and _mysql_url(
+        settings.DB_READ_HOST,
+        settings.DB_READ_PORT,
+        settings.DB_READ_USER,
+        settings.DB_READ_PASSWORD,
+    )
+)
+
+
+def _create_engine(url) -> Engine:
+    """
+    Create the engine of a database URL.
+
+    Args:
+        url: The URL of the database, as a string or URL.
+
+    Returns:
+        Engine: The engine, allowing SQLite connections to move between threads, or
+        giving up on a MySQL connection after DB_CONNECT_TIMEOUT seconds. Both log
+        their statements when DB_ECHO is set.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        # pylint: disable=import-outside-toplevel, unused-import
+        from personavix.src.database import sqlite_compat  # Registers the compilers.
 
-DATABASE_URL = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_SCHEMA}"
+        return create_engine(
+            url, echo=settings.DB_ECHO, connect_args={"check_same_thread": False}
+        )
+    return create_engine(
+        url,
+        echo=settings.DB_ECHO,
+        connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT},
+    )
 
-engine = create_engine(DATABASE_URL, echo=True)  # Set echo=True for debugging
+
+def _read_only_connection(dbapi_connection, _connection_record) -> None:
+    """
+    Make the MySQL sessions of the replica read only, so a misrouted write fails.
+
+    Args:
+        dbapi_connection: The new DBAPI connection.
+        _connection_record: The pool record of the connection.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("SET SESSION TRANSACTION READ ONLY")
+    cursor.close()
+
+
+def _breaker(name: str) -> CircuitBreaker:
+    """
+    Create the circuit breaker of a database from the settings.
+
+    Args:
+        name: The name of the database in the metrics.
+
+    Returns:
+        CircuitBreaker: The breaker.
+    """
+    return CircuitBreaker(
+        name, settings.DB_BREAKER_FAILURE_THRESHOLD, settings.DB_BREAKER_RESET_TIMEOUT
+    )
+
+
+engine = _create_engine(DATABASE_URL)
+breaker = _breaker("primary")
+install_resilience(engine, breaker)
+track_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+PrimaryReadSessionLocal = sessionmaker(
+    class_=ReadSession, autoflush=False, bind=engine, info={"breaker": breaker}
+)
+
+if DATABASE_READ_URL:
+    read_engine = _create_engine(DATABASE_READ_URL)
+    if read_engine.dialect.name == "mysql":
+        event.listen(read_engine, "connect", _read_only_connection)
+    read_breaker = _breaker("replica")
+    install_resilience(read_engine, read_breaker)
+    track_queries(read_engine)
+    ReadSessionLocal = sessionmaker(
+        class_=ReadSession,
+        autoflush=False,
+        bind=read_engine,
+        info={"breaker": read_breaker},
+    )
+else:
+    read_engine, read_breaker, ReadSessionLocal = engine, breaker, PrimaryReadSessionLocal
 
 Base = declarative_base()
 
 
-def get_db():
+def _admit(request: Request, database_breaker: CircuitBreaker) -> bool:
+    """
+    Check whether a request may use a database, once per request and database.
+
+    Args:
+        request: The request.
+        database_breaker: The breaker of the database.
+
+    Returns:
+        bool: True when the breaker allows the request, or already allowed it for
+        another dependency, so a probe request is not rejected by its second one.
+    """
+    admitted = getattr(request.state, "admitted_databases", None)
+    if admitted is None:
+        admitted = request.state.admitted_databases = set()
+    if database_breaker.name in admitted:
+        return True
+    if database_breaker.allow():
+        admitted.add(database_breaker.name)
+        return True
+    return False
+
+
+def get_db(request: Request):
     """
     Get a database instance.
 
+    Args:
+        request: The request using the database.
+
     Returns:
         generator: An instance of the database created with SessionLocal.
 
@@ -41,8 +196,78 @@ def get_db():
         with get_db() as db:
             # perform database operations using db
     """
+    if not _admit(request, breaker):
+        raise _unavailable(breaker)
     db = SessionLocal()
+    set_statement_timeout(db, settings.DB_STATEMENT_TIMEOUT)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _unavailable(open_breaker: CircuitBreaker) -> HTTPException:
+    """
+    Build the rejection of a request while a database is failing.
+
+    Args:
+        open_breaker: The open breaker of the database.
+
+    Returns:
+        HTTPException: The 503 error, with the seconds before the next probe.
+    """
+    return HTTPException(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        detail="Database unavailable.",
+        headers={"Retry-After": str(open_breaker.retry_after())},
+    )
+
+
+def get_read_db(request: Request):
+    """
+    Get a database instance for reads, on the replica when possible.
+
+    A client which wrote less than READ_YOUR_WRITES_WINDOW seconds ago reads from the
+    primary, so it sees its own writes despite the replication lag. Reads also go to
+    the primary while the breaker of the replica is open. Transient errors of reads
+    are retried.
+
+    Args:
+        request: The request, carrying the time of the last write of the client.
+
+    Returns:
+        generator: An instance of the database created with ReadSessionLocal, or
+        with PrimaryReadSessionLocal after a recent write.
+    """
+    if (
+        read_engine is not engine
+        and not wrote_recently(request)
+        and _admit(request, read_breaker)
+    ):
+        READ_SESSIONS.labels("replica").inc()
+        db = ReadSessionLocal()
+    elif _admit(request, breaker):
+        READ_SESSIONS.labels("primary").inc()
+        db = PrimaryReadSessionLocal()
+    else:
+        raise _unavailable(breaker)
+    set_statement_timeout(db, settings.DB_STATEMENT_TIMEOUT)
     try:
         yield db
     finally:
         db.close()
+
+
+def get_dialect_name(executor) -> str:
+    """
+    Get the dialect of a session or connection.
+
+    Args:
+        executor: The ORM session or the core connection.
+
+    Returns:
+        str: The name of the dialect.
+    """
+    if isinstance(executor, Session):
+        return executor.get_bind().dialect.name
+    return executor.dialect.name
@@ -0,0 +1,312 @@
+"""
+Module: resilience.py
+
+This module keeps the API responsive while the database is failing.
+
+Each engine has a circuit breaker fed by its own statements. After
+DB_BREAKER_FAILURE_THRESHOLD consecutive connection, timeout or other operational
+errors the breaker opens, and requests needing the database are rejected at once with
+503 instead of each one holding a worker thread for a full timeout. After
+DB_BREAKER_RESET_TIMEOUT seconds one request is let through as a probe: its success
+closes the breaker, its failure opens it again.
+
+Sessions of reads retry transient errors, a lost connection or a deadlock, up to
+DB_READ_RETRIES times with jittered exponential backoff. Each session may carry a
+statement timeout, applied to every statement it runs: a MAX_EXECUTION_TIME hint on
+MySQL SELECTs, an interrupt of the statement on SQLite.
+
+Classes:
+    CircuitBreaker: Circuit breaker of the database accessed through an engine.
+    ReadSession: Session retrying the transient errors of its reads.
+
+Functions:
+    is_timeout: Check whether a database error is a statement timeout.
+    is_transient: Check whether a database error is worth retrying.
+    set_statement_timeout: Set the statement timeout of a session.
+    install_resilience: Feed the breaker of an engine and apply statement timeouts.
+"""
+
+# pylint: disable=import-error
+import random
+import threading
+import time
+from prometheus_client import Counter, Gauge
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+BREAKER_STATE = Gauge(
+    "personavix_db_breaker_state",
+    "State of the database circuit breaker: 0 closed, 1 half-open, 2 open.",
+    ["database"],
+)
+BREAKER_TRANSITIONS = Counter(
+    "personavix_db_breaker_transitions_total",
+    "Transitions of the database circuit breaker, by new state.",
+    ["database", "state"],
+)
+BREAKER_REJECTIONS = Counter(
+    "personavix_db_breaker_rejections_total",
+    "Requests rejected while the database circuit breaker was open.",
+    ["database"],
+)
+READ_RETRIES = Counter(
+    "personavix_db_read_retries_total", "Reads retried after a transient error."
+)
+# Registered here rather than in database.py, whose import fails without a driver for
+# the database URL: importing it again would register the counter twice.
+READ_SESSIONS = Counter(
+    "personavix_read_sessions_total", "Read sessions opened, by database.", ["target"]
+)
+
+STATES = {"closed": 0, "half-open": 1, "open": 2}
+TIMEOUT_KEY = "statement_timeout"
+# Lost connection, server gone away, lock wait timeout and deadlock on MySQL.
+MYSQL_TRANSIENT_CODES = {2006, 2013, 1205, 1213}
+MYSQL_TIMEOUT_CODE = 3024
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of the database accessed through an engine.
+
+    Attributes:
+        name: The name of the database in the metrics.
+        failure_threshold: The consecutive failures opening the breaker.
+        reset_timeout: The seconds an open breaker waits before letting a probe
+            through.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        BREAKER_STATE.labels(name).set(STATES["closed"])
+
+    @property
+    def state(self) -> str:
+        """str: "closed", "half-open" or "open"."""
+        return self._state
+
+    def _move_to(self, state: str) -> None:
+        """
+        Change the state, under the lock.
+
+        Args:
+            state: The new state.
+        """
+        if state != self._state:
+            self._state = state
+            BREAKER_STATE.labels(self.name).set(STATES[state])
+            BREAKER_TRANSITIONS.labels(self.name, state).inc()
+            setup_logger().warning("Database breaker %s is %s.", self.name, state)
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may use the database.
+
+        Returns:
+            bool: False while the breaker is open. Once the reset timeout has passed,
+            True for a single probe per reset timeout, until the breaker closes.
+        """
+        if self._state == "closed" or self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                BREAKER_REJECTIONS.labels(self.name).inc()
+                return False
+            # The probe may end without a statement, another one is allowed later.
+            self._opened_at = now
+            self._move_to("half-open")
+            return True
+
+    def retry_after(self) -> int:
+        """
+        Get the seconds until the breaker lets a probe through.
+
+        Returns:
+            int: The seconds, at least 1.
+        """
+        remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+        return max(1, round(remaining))
+
+    def record_success(self) -> None:
+        """Record a successful statement, closing the breaker."""
+        if self._state == "closed" and not self._failures:
+            return
+        with self._lock:
+            self._failures = 0
+            self._move_to("closed")
+
+    def record_failure(self) -> None:
+        """Record a failed statement, opening the breaker past the threshold."""
+        with self._lock:
+            self._failures += 1
+            if self._state == "half-open" or (
+                self.failure_threshold > 0 and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._move_to("open")
+
+
+def _mysql_code(error: BaseException) -> int:
+    """
+    Get the MySQL error code of a DBAPI error.
+
+    Args:
+        error: The error raised by the DBAPI.
+
+    Returns:
+        int: The code, or None for other errors.
+    """
+    args = getattr(error, "args", ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def is_timeout(error: DBAPIError) -> bool:
+    """
+    Check whether a database error is a statement timeout.
+
+    Args:
+        error: The error raised by SQLAlchemy.
+
+    Returns:
+        bool: True when the statement was interrupted by its timeout.
+    """
+    return _mysql_code(error.orig) == MYSQL_TIMEOUT_CODE or "interrupted" in str(
+        error.orig
+    )
+
+
+def is_transient(error: DBAPIError) -> bool:
+    """
+    Check whether a database error is worth retrying.
+
+    Args:
+        error: The error raised by SQLAlchemy.
+
+    Returns:
+        bool: True for a lost connection, a deadlock or a lock wait timeout. A
+        statement timeout would only time out again and is not retried.
+    """
+    if error.connection_invalidated:
+        return True
+    if not isinstance(error, OperationalError) or is_timeout(error):
+        return False
+    code = _mysql_code(error.orig)
+    return code is None or code in MYSQL_TRANSIENT_CODES
+
+
+def set_statement_timeout(db: Session, seconds: float) -> None:
+    """
+    Set the statement timeout of a session.
+
+    Args:
+        db: The session.
+        seconds: The timeout of each statement, 0 or None for no timeout.
+    """
+    db.info[TIMEOUT_KEY] = seconds
+    if db.in_transaction():
+        db.connection().info[TIMEOUT_KEY] = seconds
+
+
+class ReadSession(Session):  # pylint: disable=too-few-public-methods
+    """
+    Session retrying the transient errors of its reads.
+
+    Only sessions which never write are created with this class: a retry rolls the
+    session back, which would discard pending changes. No retry is made once the
+    breaker in the "breaker" key of the info of the session is open.
+    """
+
+    def execute(self, statement, *args, **kwargs):
+        """
+        Execute a statement, retrying transient errors with jittered backoff.
+
+        Returns:
+            Result: The result of the statement.
+        """
+        attempt = 0
+        while True:
+            try:
+                return super().execute(statement, *args, **kwargs)
+            except DBAPIError as e:
+                breaker = self.info.get("breaker")
+                if (
+                    attempt >= settings.DB_READ_RETRIES
+                    or not is_transient(e)
+                    or (breaker is not None and breaker.state == "open")
+                ):
+                    raise
+                self.rollback()
+                READ_RETRIES.inc()
+                # Full jitter, so the retries of many requests do not land together.
+                time.sleep(random.uniform(0, settings.DB_RETRY_BASE_DELAY * 2**attempt))
+                attempt += 1
+
+
+def _apply_timeout(conn, cursor, statement, parameters, _context, _executemany):
+    """Apply the statement timeout of the transaction, before each statement."""
+    timeout = conn.info.get(TIMEOUT_KEY)
+    if not timeout:
+        return statement, parameters
+    if conn.dialect.name == "mysql":
+        if statement.lstrip()[:6].upper() == "SELECT":
+            hint = f"SELECT /*+ MAX_EXECUTION_TIME({int(timeout * 1000)}) */"
+            statement = hint + statement.lstrip()[6:]
+    elif conn.dialect.name == "sqlite":
+        deadline = time.monotonic() + timeout
+        cursor.connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, 1000
+        )
+    return statement, parameters
+
+
+def _clear_sqlite_timeout(conn, *_args) -> None:
+    """Remove the interrupt of a SQLite statement once it ran."""
+    if conn.dialect.name == "sqlite" and conn.info.get(TIMEOUT_KEY):
+        conn.connection.dbapi_connection.set_progress_handler(None, 0)
+
+
+def install_resilience(bind: Engine, breaker: CircuitBreaker) -> None:
+    """
+    Feed the breaker of an engine with its statements, and apply statement timeouts.
+
+    Args:
+        bind: The engine.
+        breaker: The breaker of the database of the engine.
+    """
+
+    @event.listens_for(bind, "after_cursor_execute")
+    def _succeeded(conn, *_args):
+        _clear_sqlite_timeout(conn)
+        breaker.record_success()
+
+    @event.listens_for(bind, "handle_error")
+    def _failed(context):
+        if context.connection is not None:
+            _clear_sqlite_timeout(context.connection)
+        error = context.sqlalchemy_exception
+        if context.is_disconnect or isinstance(error, OperationalError):
+            breaker.record_failure()
+
+    @event.listens_for(bind, "checkin")
+    def _reset_timeout(_dbapi_connection, connection_record):
+        # Connections used outside of sessions, by the background jobs, have no timeout.
+        connection_record.info.pop(TIMEOUT_KEY, None)
+
+    event.listen(bind, "before_cursor_execute", _apply_timeout, retval=True)
+
+
+@event.listens_for(Session, "after_begin")
+def _begin_with_timeout(session, _transaction, connection):
+    """Give the connection of a transaction the statement timeout of its session."""
+    connection.info[TIMEOUT_KEY] = session.info.get(TIMEOUT_KEY)
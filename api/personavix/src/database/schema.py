@@ -0,0 +1,122 @@
+"""
+Module: schema.py
+
+This module prepares the database schema when the API starts.
+
+It runs as a step of the lifespan of the application, never at import, and retries
+while the database is unreachable so a worker booting during a short outage waits
+for it instead of crashing.
+
+Functions:
+    prepare_schema: Create or check the tables of the models.
+    missing_columns: List the columns of the models missing from the database.
+    prepare_schema_with_retries: Prepare the schema, retrying while the database is
+        unreachable.
+"""
+
+# pylint: disable=import-error, unused-import
+import time
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from personavix.src.database.database import Base
+from personavix.src.models.domain import (  # Registers every table in the metadata.
+    answer_rollups,
+    answers,
+    current_profiles,
+    disc_characteristics,
+    questions,
+    revoked_tokens,
+    token_versions,
+    unique_access_links,
+    users,
+)
+from personavix.logger import setup_logger
+
+SCHEMA_MODES = ("create", "check", "skip")
+
+
+def prepare_schema(bind: Engine, mode: str) -> None:
+    """
+    Create or check the tables of the models.
+
+    Args:
+        bind: The engine of the database.
+        mode: "create" creates the missing tables, "check" only verifies that every
+            table exists and "skip" does nothing. Both "create" and "check" verify
+            that the existing tables have every column of the models.
+
+    Raises:
+        RuntimeError: Raised in "check" mode when tables are missing, and in both
+            modes when columns are missing.
+    """
+    if mode == "create":
+        Base.metadata.create_all(bind=bind)
+    elif mode == "check":
+        missing = set(Base.metadata.tables) - set(inspect(bind).get_table_names())
+        if missing:
+            raise RuntimeError(f"Missing tables: {', '.join(sorted(missing))}")
+    if mode in ("create", "check"):
+        # create_all never alters existing tables, their new columns are added by the
+        # migrations of the README.
+        missing = missing_columns(bind)
+        if missing:
+            raise RuntimeError(
+                f"Missing columns: {', '.join(missing)}. Run the migrations of the README."
+            )
+
+
+def missing_columns(bind: Engine) -> list[str]:
+    """
+    List the columns of the models missing from the tables of the database.
+
+    Args:
+        bind: The engine of the database.
+
+    Returns:
+        list[str]: The missing columns, as table.column.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for name, table in sorted(Base.metadata.tables.items()):
+        if name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(name)}
+        missing += [
+            f"{name}.{column.name}" for column in table.columns if column.name not in existing
+        ]
+    return missing
+
+
+def prepare_schema_with_retries(
+    bind: Engine, mode: str, retries: int, delay: float
+) -> None:
+    """
+    Prepare the schema, retrying while the database is unreachable.
+
+    Args:
+        bind: The engine of the database.
+        mode: The mode of prepare_schema.
+        retries: The number of retries after the first attempt.
+        delay: The seconds before the first retry, doubled after each one.
+
+    Raises:
+        OperationalError: Raised when the database is still unreachable after the
+            last retry.
+    """
+    for attempt in range(retries + 1):
+        try:
+            started_at = time.perf_counter()
+            prepare_schema(bind, mode)
+            setup_logger().info(
+                "Schema prepared (%s) in %.2fs.", mode, time.perf_counter() - started_at
+            )
+            return
+        except OperationalError as e:
+            if attempt == retries:
+                raise
+            setup_logger().error(
+                "Database unreachable, retrying in %.1fs: %s", delay * 2**attempt, e
+            )
+            time.sleep(delay * 2**attempt)
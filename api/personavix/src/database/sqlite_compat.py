@@ -0,0 +1,39 @@
+"""
+Module: sqlite_compat.py
+
+This module lets the MySQL models create their tables on SQLite, the stand-in of the
+database in local tests. It is imported by database.py for SQLite URLs only.
+
+Functions:
+    compile_tinyint: Render TINYINT columns as INTEGER on SQLite.
+    compile_column: Render columns without the MySQL ON UPDATE clause on SQLite.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy.dialects.mysql import TINYINT
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn
+
+
+@compiles(TINYINT, "sqlite")
+def compile_tinyint(_element, _compiler, **_kwargs) -> str:
+    """
+    Render TINYINT columns as INTEGER on SQLite.
+
+    Returns:
+        str: The type of the column.
+    """
+    return "INTEGER"
+
+
+@compiles(CreateColumn, "sqlite")
+def compile_column(element, compiler, **kwargs) -> str:
+    """
+    Render columns without the MySQL ON UPDATE clause on SQLite.
+
+    Returns:
+        str: The definition of the column. The updated timestamps are only maintained
+        by MySQL.
+    """
+    definition = compiler.visit_create_column(element, **kwargs)
+    return definition.replace(" ON UPDATE CURRENT_TIMESTAMP", "") if definition else definition
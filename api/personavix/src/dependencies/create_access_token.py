@@ -7,21 +7,30 @@ Functions:
     - create_access_token: Create an access token for the user.
 """
 
+# pylint: disable=import-error
 import os
+import uuid
 from datetime import datetime, timedelta
 from jose import jwt
+from personavix.src.models.domain.users import Usuarios
 
 
 def create_access_token(
-    email: str, is_unique_access_link: bool, expires_delta: timedelta
+    user: Usuarios, is_unique_access_link: bool, expires_delta: timedelta, version: int
 ) -> str:
     """
     Create an access token for the user.
 
+    The token carries the claims checked by decode_and_verify_token: the id,
+    permission and access flag of the user, the version of their tokens, and a unique
+    id (jti) to revoke the token alone.
+
     Args:
-        email: The email of the user.
+        user: The user.
         is_unique_access_link: A boolean indicating if the token is for a unique access link.
         expires_delta: The expiration time of the token.
+        version: The current version of the tokens of the user, see
+            personavix.src.dependencies.token_versions.
 
     Returns:
         str: O token JWT gerado.
@@ -29,8 +38,13 @@ def create_access_token(
     secret_key = os.getenv("SECRET_KEY")
 
     to_encode = {
-        "email": email,
+        "email": user.email,
         "is_unique_access_link": is_unique_access_link,
+        "id_user": user.id_usuario,
+        "permission": user.permissao,
+        "access_flag": user.flag_acesso,
+        "version": version,
+        "jti": uuid.uuid4().hex,
     }
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
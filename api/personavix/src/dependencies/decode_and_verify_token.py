@@ -8,29 +8,43 @@ Classes:
     - TokenData: Pydantic model for token data.
 
 Functions:
+    - decode_token: Decodes the token and checks its signature and expiration.
     - decode_and_verify_token: Decodes and verifies the token.
+    - verify_with_database: Verifies the claims of a token against the database.
     - get_user_email: Retrieves the user's email from the token.
 """
 
 # pylint: disable=import-error, too-few-public-methods
 import os
 from http import HTTPStatus
+from typing import Optional
 from pydantic import BaseModel
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from dotenv import load_dotenv
+from prometheus_client import Counter
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from sqlalchemy.exc import SQLAlchemyError
 from personavix.src.models.domain.users import Usuarios
 from personavix.src.models.schemas.users import User
 from personavix.src.database.database import get_db
+from personavix.src.dependencies.token_revocations import (
+    is_token_revoked_in_database,
+    revocation_list,
+)
+from personavix.src.dependencies.token_versions import (
+    read_token_version,
+    token_versions,
+)
 
-load_dotenv()
-
-app = FastAPI()
 security = HTTPBearer()
+CLAIMS = frozenset(("id_user", "permission", "access_flag", "version"))
+AUTH_CHECKS = Counter(
+    "personavix_auth_checks_total",
+    "Authenticated requests, by source of their claims: the token or the database.",
+    ["source"],
+)
 
 
 class TokenData(BaseModel):
@@ -43,6 +57,8 @@ class TokenData(BaseModel):
         permission: The permission level of the user.
         access_flag: The access flag indicating whether the user has access (1) or not (0).
         is_unique_access_link: Indicates if the user has a unique access link.
+        jti: The id of the token, None for tokens issued before they had one.
+        expires_at: The expiration of the token, in seconds since the epoch.
     """
 
     id_user: int = None
@@ -50,26 +66,55 @@ class TokenData(BaseModel):
     permission: int = None
     access_flag: int = None
     is_unique_access_link: bool = None
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
+
+
+def decode_token(token: str) -> dict:
+    """
+    This function decodes the token and checks its signature and expiration.
+
+    Args:
+        token: The JWT token.
+
+    Returns:
+        dict: The payload of the token.
+
+    Raises:
+        JWTError: Raised when the token is invalid or expired.
+    """
+    secret_key = os.getenv("SECRET_KEY", "")
+
+    return jwt.decode(token, secret_key, algorithms=["HS256"])
 
 
 def decode_and_verify_token(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> TokenData:
     """
     This function decodes and verifies the token.
 
+    The claims of the token are trusted once its signature, version and id are
+    checked, without a query. Tokens issued before they carried claims, and every token
+    while the token versions and revocations are not loaded, are checked against the
+    database.
+
     Args:
+        request: The request, whose database sessions are admitted by the breakers.
         credentials: The credentials of the user.
 
     Returns:
         token_data: The token data.
+
+    Raises:
+        HTTPException: Raised when the token is invalid, expired or revoked (401), or
+        when its user has no access (404).
     """
     token = credentials.credentials
 
-    secret_key = os.getenv("SECRET_KEY", "")
-
     try:
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+        payload = decode_token(token)
 
         email = payload.get("email")
         is_unique_access_link = payload.get("is_unique_access_link", False)
@@ -80,19 +125,36 @@ def decode_and_verify_token(
                 detail="Could not validate credentials.",
             )
 
-        db = next(get_db())
+        if (
+            not token_versions.loaded
+            or not revocation_list.loaded
+            or not CLAIMS.issubset(payload)
+        ):
+            AUTH_CHECKS.labels("database").inc()
+            return verify_with_database(payload, request)
+
+        if token_versions.is_revoked(
+            payload["id_user"], payload["version"]
+        ) or revocation_list.is_revoked(payload.get("jti", "")):
+            raise HTTPException(
+                status_code=HTTPStatus.UNAUTHORIZED, detail="Revoked token."
+            )
+        if payload["access_flag"] != 1:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail=f"User {email} not found."
+            )
 
-        user_datas: User = get_user_email(email, db)
-        token_data = TokenData(
-            id_user=user_datas.id_usuario,
+        AUTH_CHECKS.labels("token").inc()
+        return TokenData(
+            id_user=payload["id_user"],
             email=email,
-            permission=user_datas.permissao,
-            access_flag=user_datas.flag_acesso,
+            permission=payload["permission"],
+            access_flag=payload["access_flag"],
             is_unique_access_link=is_unique_access_link,
+            jti=payload.get("jti"),
+            expires_at=payload.get("exp"),
         )
 
-        return token_data
-
     except jwt.ExpiredSignatureError as e:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail="Expired token."
@@ -104,6 +166,53 @@ def decode_and_verify_token(
         ) from e
 
 
+def verify_with_database(payload: dict, request: Request) -> TokenData:
+    """
+    This function verifies the claims of a token against the database.
+
+    The primary is read, never the replica: during the replication lag, a token just
+    revoked would still be accepted.
+
+    Args:
+        payload: The decoded token, with an email.
+        request: The request, whose database sessions are admitted by the breakers.
+
+    Returns:
+        token_data: The token data, with the current permission and access flag.
+
+    Raises:
+        HTTPException: Raised when the token is revoked (401), or when its user has no
+        access (404).
+    """
+    sessions = get_db(request)
+    db = next(sessions)
+    try:
+        user_datas: User = get_user_email(payload["email"], db)
+        if (
+            "version" in payload
+            and payload["version"] < read_token_version(db, user_datas.id_usuario)
+        ) or ("jti" in payload and is_token_revoked_in_database(db, payload["jti"])):
+            raise HTTPException(
+                status_code=HTTPStatus.UNAUTHORIZED, detail="Revoked token."
+            )
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error to get user."
+        ) from e
+    finally:
+        sessions.close()
+
+    return TokenData(
+        id_user=user_datas.id_usuario,
+        email=payload["email"],
+        permission=user_datas.permissao,
+        access_flag=user_datas.flag_acesso,
+        is_unique_access_link=payload.get("is_unique_access_link", False),
+        jti=payload.get("jti"),
+        expires_at=payload.get("exp"),
+    )
+
+
 def get_user_email(useremail: str, db: Session) -> User:
     """
     This function retrieves the user's email from the token.
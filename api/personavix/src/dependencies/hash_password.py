@@ -11,17 +11,18 @@ Functions:
 import bcrypt
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int = 12) -> str:
     """
     Hash the password of the user.
 
     Args:
         password: str: The password of the user.
+        rounds: int: The bcrypt cost factor. Defaults to 12.
 
     Returns:
         str: The hashed password.
     """
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
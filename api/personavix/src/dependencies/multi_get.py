@@ -0,0 +1,96 @@
+"""
+Module: multi_get.py
+
+This module resolves many rows by id in one request, with an ids= parameter.
+
+The ids are a comma-separated list, like "12,7,31". They are fetched with a single IN
+query, returned in the order asked, and the ids matching no row are listed in the
+X-Missing-Ids header of the response.
+
+Functions:
+    - parse_ids: Parse and validate an ids parameter.
+    - order_by_ids: Order fetched rows like the asked ids, and find the missing ones.
+    - missing_ids_headers: Build the headers reporting the missing ids.
+"""
+
+# pylint: disable=import-error
+from http import HTTPStatus
+from typing import Callable, Iterable
+from fastapi import HTTPException
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+IDS_DESCRIPTION = (
+    "Comma-separated ids to fetch, like 12,7,31, returned in that order. The ids "
+    "matching nothing are listed in the X-Missing-Ids header."
+)
+MISSING_IDS_HEADER = "X-Missing-Ids"
+
+
+def parse_ids(ids: str) -> list[int]:
+    """
+    Parse and validate an ids parameter.
+
+    Args:
+        ids: The comma-separated ids.
+
+    Returns:
+        list[int]: The ids in the order asked, without duplicates.
+
+    Raises:
+        HTTPException: Raised when an id is not a positive integer, or when there are
+        no ids or more than MULTI_GET_MAX_IDS (400).
+    """
+    try:
+        parsed = list(dict.fromkeys(int(id_) for id_ in ids.split(",") if id_.strip()))
+    except ValueError as e:
+        setup_logger().error("Code:400 Message: Invalid ids %s", ids[:200])
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="ids must be comma-separated integers",
+        ) from e
+
+    if not parsed or len(parsed) > settings.MULTI_GET_MAX_IDS or min(parsed) < 1:
+        setup_logger().error("Code:400 Message: Invalid ids %s", ids[:200])
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"ids must hold from 1 to {settings.MULTI_GET_MAX_IDS} positive ids",
+        )
+
+    return parsed
+
+
+def order_by_ids(
+    rows: Iterable, ids: list[int], key: Callable[[object], int]
+) -> tuple[list, list[int]]:
+    """
+    Order fetched rows like the asked ids, and find the missing ones.
+
+    Args:
+        rows: The rows fetched by the IN query.
+        ids: The asked ids, in order.
+        key: The function getting the id of a row.
+
+    Returns:
+        tuple[list, list[int]]: The rows in the order of their ids, and the ids
+        matching no row.
+    """
+    found = {key(row): row for row in rows}
+    return (
+        [found[id_] for id_ in ids if id_ in found],
+        [id_ for id_ in ids if id_ not in found],
+    )
+
+
+def missing_ids_headers(missing: list[int]) -> dict[str, str]:
+    """
+    Build the headers reporting the missing ids.
+
+    Args:
+        missing: The ids matching no row.
+
+    Returns:
+        dict[str, str]: The X-Missing-Ids header, always sent so an empty value means
+        every id was found.
+    """
+    return {MISSING_IDS_HEADER: ",".join(str(id_) for id_ in missing)}
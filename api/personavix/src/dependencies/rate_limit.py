@@ -0,0 +1,95 @@
+"""
+Module: rate_limit.py
+
+This module limits the rate of the unauthenticated routes.
+
+Every login costs a bcrypt verification, so each client IP and each targeted account
+or link session gets a token bucket, and requests finding an empty bucket are
+rejected with 429 before any password is checked.
+
+Functions:
+    - get_client_ip: Get the IP of the client of a request.
+    - enforce_rate_limit: Take a token for a request, or reject it.
+"""
+
+# pylint: disable=import-error
+import math
+from http import HTTPStatus
+from fastapi import HTTPException, Request
+from prometheus_client import Counter
+from personavix.src.rate_limit.token_bucket import get_token_buckets, parse_rate
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+RATE_LIMITED = Counter(
+    "personavix_rate_limited_total",
+    "Requests rejected by the rate limiter.",
+    ["endpoint", "key"],
+)
+
+# The rates of the client IP and of the targeted account or session, per endpoint.
+ENDPOINT_RATES = {
+    "users_login": (
+        parse_rate(settings.RATE_LIMIT_LOGIN_PER_IP),
+        parse_rate(settings.RATE_LIMIT_LOGIN_PER_ACCOUNT),
+    ),
+    "link_login": (
+        parse_rate(settings.RATE_LIMIT_LOGIN_PER_IP),
+        parse_rate(settings.RATE_LIMIT_LOGIN_PER_ACCOUNT),
+    ),
+    "link_lookup": (parse_rate(settings.RATE_LIMIT_LINK_LOOKUP_PER_IP), None),
+}
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Get the IP of the client of a request.
+
+    Args:
+        request: The request.
+
+    Returns:
+        str: The last address of X-Forwarded-For, the one added by the proxy, when
+        RATE_LIMIT_TRUST_FORWARDED_FOR is set, the address of the peer otherwise.
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for", "")
+        if forwarded_for.strip():
+            return forwarded_for.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def enforce_rate_limit(request: Request, endpoint: str, target=None) -> None:
+    """
+    Take a token for a request, or reject it.
+
+    The bucket of the client IP is checked first, so a client already over its limit
+    does not drain the bucket of the account it targets.
+
+    Args:
+        request: The request.
+        endpoint: The key of the endpoint in ENDPOINT_RATES.
+        target: The account or session targeted by the request, if any.
+
+    Raises:
+        HTTPException: Raised when a bucket is empty (429), with Retry-After.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    ip_rate, target_rate = ENDPOINT_RATES[endpoint]
+    buckets = [("ip", get_client_ip(request), ip_rate)]
+    if target is not None and target_rate is not None:
+        buckets.append(("target", str(target).lower(), target_rate))
+
+    token_buckets = get_token_buckets()
+    for key, value, rate in buckets:
+        allowed, retry_after = token_buckets.take(f"{endpoint}:{key}:{value}", rate)
+        if not allowed:
+            RATE_LIMITED.labels(endpoint, key).inc()
+            setup_logger().error("Code:429 Message: Rate limit of %s by %s", endpoint, key)
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
@@ -0,0 +1,56 @@
+"""
+Module: serialize_response.py
+
+This module serializes ORM objects with a response schema, the way FastAPI does for
+a response_model, so the JSON can be cached and sent as is.
+
+Functions:
+    - serialize_response: Validates the content with the schema and renders it as JSON.
+"""
+
+# pylint: disable=import-error
+import json
+from functools import lru_cache
+from fastapi.encoders import jsonable_encoder
+
+from pydantic import parse_obj_as
+
+try:
+    from pydantic import TypeAdapter
+except ImportError:  # Pydantic v1 validates through parse_obj_as.
+    TypeAdapter = None
+
+
+@lru_cache(maxsize=None)
+def _type_adapter(model):
+    """
+    Build the type adapter of a schema once.
+
+    Args:
+        model: The schema, or a generic type like list[Schema].
+
+    Returns:
+        TypeAdapter: The adapter of the schema.
+    """
+    return TypeAdapter(model)
+
+
+def serialize_response(model, content) -> bytes:
+    """
+    This function validates the content with the schema and renders it as JSON.
+
+    Args:
+        model: The schema, or a generic type like list[Schema].
+        content: The ORM objects or dicts to serialize.
+
+    Returns:
+        bytes: The JSON document, using the field aliases.
+    """
+    if TypeAdapter is None:
+        validated = parse_obj_as(model, content)
+        return json.dumps(jsonable_encoder(validated, by_alias=True)).encode("utf-8")
+
+    adapter = _type_adapter(model)
+    return adapter.dump_json(
+        adapter.validate_python(content, from_attributes=True), by_alias=True
+    )
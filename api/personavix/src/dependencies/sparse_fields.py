@@ -0,0 +1,186 @@
+"""
+Module: sparse_fields.py
+
+This module narrows list responses to the fields asked with a fields= parameter.
+
+The fields are a comma-separated list of schema fields, with a dot for the fields of a
+nested schema, like "id_resposta,dominancia,usuarios_.nome". The same selection
+narrows the response schema and the columns loaded by the query.
+
+Functions:
+    - parse_fields: Parse and validate a fields parameter against a schema.
+    - narrow_model: Build the schema restricted to the selected fields.
+    - load_options: Build the loader options selecting only the needed columns.
+"""
+
+# pylint: disable=import-error
+from functools import lru_cache
+from http import HTTPStatus
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only
+from personavix.logger import setup_logger
+
+PYDANTIC_V2 = hasattr(BaseModel, "model_fields")
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return, with a dot for the fields of a nested object, "
+    "like id_resposta,dominancia,usuarios_.nome. Defaults to every field."
+)
+
+
+def _schema_fields(model) -> dict[str, tuple]:
+    """
+    Get the fields of a schema, for Pydantic v1 and v2.
+
+    Args:
+        model: The schema.
+
+    Returns:
+        dict[str, tuple]: The annotation, alias and required flag of each field.
+    """
+    if PYDANTIC_V2:
+        return {
+            name: (field.annotation, field.alias, field.is_required())
+            for name, field in model.model_fields.items()
+        }
+    return {
+        name: (field.outer_type_, field.alias, field.required)
+        for name, field in model.__fields__.items()
+    }
+
+
+def _is_schema(annotation) -> bool:
+    """
+    Check whether an annotation is a nested schema.
+
+    Args:
+        annotation: The annotation of a field.
+
+    Returns:
+        bool: True for a subclass of BaseModel.
+    """
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def parse_fields(fields: str, model) -> tuple:
+    """
+    Parse and validate a fields parameter against a schema.
+
+    Args:
+        fields: The comma-separated fields, None or empty for every field.
+        model: The schema of the response items.
+
+    Returns:
+        tuple: The selection, sorted pairs of a field name and the selection of its
+        nested schema (None for the whole field), or None for every field.
+
+    Raises:
+        HTTPException: Raised when a field is not in the schema (400).
+    """
+    if not fields:
+        return None
+
+    selection = {}
+    for path in filter(None, (path.strip() for path in fields.split(","))):
+        schema, level = model, selection
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            schema_field = _schema_fields(schema).get(name)
+            is_leaf = depth == len(names) - 1
+            if schema_field is None or not (is_leaf or _is_schema(schema_field[0])):
+                setup_logger().error("Code:400 Message: Unknown field %s", path)
+                raise HTTPException(
+                    status_code=HTTPStatus.BAD_REQUEST, detail=f"Unknown field: {path}"
+                )
+            if is_leaf:
+                level[name] = None
+            elif level.get(name, {}) is None:
+                break  # The whole nested schema is already selected.
+            else:
+                schema, level = schema_field[0], level.setdefault(name, {})
+
+    def freeze(level: dict) -> tuple:
+        return tuple(
+            sorted(
+                (name, None if nested is None else freeze(nested))
+                for name, nested in level.items()
+            )
+        )
+
+    return freeze(selection) or None
+
+
+@lru_cache(maxsize=256)
+def narrow_model(model, selection: tuple):
+    """
+    Build the schema restricted to the selected fields.
+
+    Args:
+        model: The schema of the response items.
+        selection: The selection returned by parse_fields.
+
+    Returns:
+        The schema itself when every field is selected, or a schema with only the
+        selected fields.
+    """
+    if selection is None:
+        return model
+
+    schema_fields = _schema_fields(model)
+    definitions = {}
+    for name, nested in selection:
+        annotation, alias, required = schema_fields[name]
+        if nested is not None:
+            annotation = narrow_model(annotation, nested)
+        definitions[name] = (annotation, Field(... if required else None, alias=alias))
+
+    # Pydantic v1 reads ORM objects through the orm_mode of the schema config.
+    config = {} if PYDANTIC_V2 else {"__config__": model.__config__}
+    return create_model(f"{model.__name__}Fields", **config, **definitions)
+
+
+def load_options(entity, selection: tuple, relationships: tuple = ()) -> list:
+    """
+    Build the loader options selecting only the needed columns.
+
+    Relationships in the selection, and every relationship of relationships when all
+    the fields are selected, are loaded in the same query with a join.
+
+    Args:
+        entity: The mapped class queried.
+        selection: The selection returned by parse_fields.
+        relationships: The relationships of the full schema.
+
+    Returns:
+        list: The options for Query.options.
+    """
+    if selection is None:
+        return [joinedload(getattr(entity, name)) for name in relationships]
+
+    mapper = inspect(entity)
+    names = {name for name, _ in selection}
+    options = [
+        load_only(
+            *(
+                getattr(entity, column.key)
+                for column in mapper.column_attrs
+                if column.key in names or column.columns[0].primary_key
+            )
+        )
+    ]
+    for name, nested in selection:
+        if name not in mapper.relationships:
+            continue
+        loader = joinedload(getattr(entity, name))
+        if nested is not None:
+            related = mapper.relationships[name].mapper
+            loader = loader.load_only(
+                *(
+                    getattr(related.class_, column)
+                    for column, _ in nested
+                    if column in related.columns
+                )
+            )
+        options.append(loader)
+    return options
@@ -0,0 +1,295 @@
+"""
+Module: token_revocations.py
+
+This module keeps the ids (jti) of the revoked tokens in memory.
+
+Logging out, or an admin revoking a compromised token, stores the id of the token in
+the tokens_revogados table until the token expires, so revocations survive restarts.
+Each worker keeps the revoked ids in an exact map from id to expiration, behind a
+Bloom filter: most tokens were never revoked, and the filter answers for them with a
+fixed number of bit lookups. The map is only read for the ids the filter may contain,
+its false positives included.
+
+The revocations are refreshed with the token versions, see
+personavix.src.dependencies.token_versions, reading only the rows revoked since the
+last refresh. Every TOKEN_REVOCATION_PURGE_INTERVAL seconds, the expired ids are
+evicted from the map and the table, and the filter is rebuilt from the remaining ones,
+since a Bloom filter cannot forget an id.
+
+Classes:
+    BloomFilter: Set of strings answering membership with false positives only.
+    RevocationList: Ids of the revoked tokens, behind a Bloom filter.
+
+Functions:
+    revoke_token: Revoke a token, in the transaction of the session.
+    is_token_revoked_in_database: Check whether a token was revoked, with a query.
+    refresh_token_revocations: Read the revocations made since the last refresh.
+    purge_token_revocations: Evict the expired revocations.
+"""
+
+# pylint: disable=import-error
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from prometheus_client import Counter, Gauge
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from personavix.src.models.domain.revoked_tokens import TokensRevogados
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+# Revocations committed late behind a later one are read again.
+WATERMARK_OVERLAP = timedelta(seconds=60)
+REVOKED_TOKENS = Gauge(
+    "personavix_revoked_tokens", "Unexpired revoked tokens known by the worker."
+)
+REVOCATION_FALSE_POSITIVES = Counter(
+    "personavix_revocation_false_positives_total",
+    "Tokens the Bloom filter of the revocations matched wrongly.",
+)
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership with false positives only.
+
+    Attributes:
+        size: The number of bits.
+        hashes: The number of bits set per string.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        """
+        Get the bits of a string, by double hashing of a single digest.
+
+        Args:
+            value: The string.
+
+        Returns:
+            Iterator[int]: The positions of its bits.
+        """
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(
+            digest[8:], "big"
+        )
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        """
+        Add a string.
+
+        Args:
+            value: The string.
+        """
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class RevocationList:
+    """
+    Ids of the revoked tokens, behind a Bloom filter.
+
+    Attributes:
+        loaded: Whether every unexpired revocation was read once.
+        watermark: The latest revocation read from the database.
+        purged_at: The monotonic time of the last purge.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expirations: dict[str, datetime] = {}
+        self._filter = self._build_filter(0)
+        self.loaded = False
+        self.watermark = None
+        self.purged_at = time.monotonic()
+
+    @staticmethod
+    def _build_filter(count: int) -> BloomFilter:
+        """
+        Build an empty filter sized for the given number of ids.
+
+        Args:
+            count: The number of ids to add.
+
+        Returns:
+            BloomFilter: A filter for TOKEN_REVOCATION_CAPACITY ids, or twice count when
+            more ids are already revoked.
+        """
+        return BloomFilter(
+            max(settings.TOKEN_REVOCATION_CAPACITY, 2 * count),
+            settings.TOKEN_REVOCATION_FALSE_POSITIVE_RATE,
+        )
+
+    def add(self, revocations) -> None:
+        """
+        Add revoked tokens.
+
+        Args:
+            revocations: Pairs of the id and the expiration, in UTC, of a token.
+        """
+        with self._lock:
+            for jti, expires_at in revocations:
+                self._expirations[jti] = expires_at
+                self._filter.add(jti)
+            REVOKED_TOKENS.set(len(self._expirations))
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        Check whether a token was revoked, in constant time.
+
+        Args:
+            jti: The id of the token.
+
+        Returns:
+            bool: True when the token was revoked.
+        """
+        if jti not in self._filter:
+            return False
+        if jti in self._expirations:
+            return True
+        REVOCATION_FALSE_POSITIVES.inc()
+        return False
+
+    def evict_expired(self, now: datetime) -> int:
+        """
+        Evict the expired ids, and rebuild the filter from the remaining ones.
+
+        Args:
+            now: The current time, in UTC.
+
+        Returns:
+            int: The number of ids evicted.
+        """
+        with self._lock:
+            remaining = {
+                jti: expires_at
+                for jti, expires_at in self._expirations.items()
+                if expires_at > now
+            }
+            bloom_filter = self._build_filter(len(remaining))
+            for jti in remaining:
+                bloom_filter.add(jti)
+            evicted = len(self._expirations) - len(remaining)
+            self._expirations, self._filter = remaining, bloom_filter
+            self.purged_at = time.monotonic()
+            REVOKED_TOKENS.set(len(remaining))
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._expirations)
+
+
+revocation_list = RevocationList()
+
+
+def _expiration(exp: int) -> datetime:
+    """
+    Convert the exp claim of a token to a naive UTC datetime, like the columns.
+
+    Args:
+        exp: The expiration, in seconds since the epoch.
+
+    Returns:
+        datetime: The expiration.
+    """
+    return datetime.utcfromtimestamp(exp)
+
+
+def revoke_token(db: Session, jti: str, exp: int, id_user: int = None) -> None:
+    """
+    Revoke a token, in the transaction of the session, which is committed.
+
+    Revoking a token twice is not an error.
+
+    Args:
+        db: The database session.
+        jti: The id of the token.
+        exp: The exp claim of the token.
+        id_user: The id of the user of the token.
+    """
+    expires_at = _expiration(exp)
+    if db.get(TokensRevogados, jti) is None:
+        db.add(TokensRevogados(jti=jti, id_usuario=id_user, expira_em=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Revoked at the same time by another request.
+    revocation_list.add([(jti, expires_at)])
+
+
+def is_token_revoked_in_database(db: Session, jti: str) -> bool:
+    """
+    Check whether a token was revoked, with a query.
+
+    Args:
+        db: The database session.
+        jti: The id of the token.
+
+    Returns:
+        bool: True when the token was revoked.
+    """
+    return db.get(TokensRevogados, jti) is not None
+
+
+def refresh_token_revocations(db: Session) -> int:
+    """
+    Read the unexpired revocations made since the last refresh, every one at first.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        int: The number of revocations read.
+    """
+    statement = select(
+        TokensRevogados.jti, TokensRevogados.expira_em, TokensRevogados.revogado_em
+    ).where(TokensRevogados.expira_em > datetime.utcnow())
+    if revocation_list.watermark is not None:
+        statement = statement.where(
+            TokensRevogados.revogado_em >= revocation_list.watermark - WATERMARK_OVERLAP
+        )
+    rows = db.execute(statement).all()
+    revocation_list.add((row.jti, row.expira_em) for row in rows)
+    revocation_list.watermark = max(
+        (row.revogado_em for row in rows), default=revocation_list.watermark
+    )
+    revocation_list.loaded = True
+    return len(rows)
+
+
+def purge_token_revocations(db: Session) -> int:
+    """
+    Evict the expired revocations from the memory and the table, when due.
+
+    Args:
+        db: A session of the primary database, which is committed.
+
+    Returns:
+        int: The number of revocations evicted from the memory, 0 when not due.
+    """
+    elapsed = time.monotonic() - revocation_list.purged_at
+    if elapsed < settings.TOKEN_REVOCATION_PURGE_INTERVAL:
+        return 0
+    now = datetime.utcnow()
+    evicted = revocation_list.evict_expired(now)
+    db.execute(delete(TokensRevogados).where(TokensRevogados.expira_em <= now))
+    db.commit()
+    setup_logger().info("Evicted %s expired token revocations.", evicted)
+    return evicted
@@ -0,0 +1,270 @@
+"""
+Module: token_versions.py
+
+This module keeps the versions of the tokens of the users in memory.
+
+Tokens carry the email, permission, access flag and token version of their user, so
+decode_and_verify_token authorizes a request without a query. A token is revoked by
+incrementing the version of its user, which update_user does when one of the claims
+changes: every token issued before is then older than the version known by the
+workers, and rejected. Updates of other fields, like a candidate filling in their
+name before the test, keep the tokens valid.
+
+Each worker keeps the versions in a map refreshed in the background every
+TOKEN_VERSION_REFRESH_INTERVAL seconds, together with the revoked tokens of
+personavix.src.dependencies.token_revocations, reading only the rows incremented since
+the last refresh. The worker incrementing a version knows it at once, the others within an
+interval. Until the map is first loaded, or when TOKEN_VERSION_REFRESH_INTERVAL is 0,
+tokens are checked against the database. Versions are always read from the primary: a
+lagging replica would accept a token just revoked.
+
+Classes:
+    TokenVersions: Versions of the tokens of the users, by user id.
+    TokenVersionRefresher: Background thread refreshing the versions and revocations.
+
+Functions:
+    claims_change: Check whether an update changes the claims carried by the tokens.
+    read_token_version: Read the current version of the tokens of a user.
+    increment_token_version: Revoke every token of a user.
+    refresh_token_versions: Read the versions incremented since the last refresh.
+    start_token_version_refresher: Load the versions and start refreshing them.
+    stop_token_version_refresher: Stop refreshing the versions.
+"""
+
+# pylint: disable=import-error
+import threading
+from datetime import timedelta
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from personavix.src.database.database import PrimaryReadSessionLocal, SessionLocal
+from personavix.src.dependencies.token_revocations import (
+    purge_token_revocations,
+    refresh_token_revocations,
+)
+from personavix.src.models.domain.token_versions import VersoesToken
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+# Increments committed late behind a later one are read again.
+WATERMARK_OVERLAP = timedelta(seconds=60)
+# The columns of the users carried by the tokens, see create_access_token.
+CLAIM_COLUMNS = ("email", "permissao", "flag_acesso")
+
+
+class TokenVersions:
+    """
+    Versions of the tokens of the users, by user id.
+
+    Versions only grow: a stale refresh never lowers a version the worker already
+    knows. Users missing from the map are at version 0.
+
+    Attributes:
+        loaded: Whether every version was read once.
+        watermark: The latest increment read from the database.
+    """
+
+    def __init__(self):
+        self._versions: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.watermark = None
+
+    def get(self, id_user: int) -> int:
+        """
+        Get the version of the tokens of a user.
+
+        Args:
+            id_user: The id of the user.
+
+        Returns:
+            int: The version, 0 for users never revoked.
+        """
+        return self._versions.get(id_user, 0)
+
+    def update(self, versions) -> None:
+        """
+        Raise the versions of users to the given ones.
+
+        Args:
+            versions: Pairs of a user id and a version.
+        """
+        with self._lock:
+            for id_user, version in versions:
+                if version > self._versions.get(id_user, 0):
+                    self._versions[id_user] = version
+
+    def is_revoked(self, id_user: int, version: int) -> bool:
+        """
+        Check whether a token was revoked.
+
+        Args:
+            id_user: The id of the user of the token.
+            version: The version carried by the token.
+
+        Returns:
+            bool: True when the user's tokens were revoked after the token was issued.
+            A token newer than the known version was issued by a worker which knew
+            the increment first, and is valid.
+        """
+        return version < self.get(id_user)
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+
+token_versions = TokenVersions()
+
+
+def claims_change(user, updated_fields: dict) -> bool:
+    """
+    Check whether an update changes the claims carried by the tokens of a user.
+
+    Args:
+        user: The user, before the update.
+        updated_fields: The new values of the updated columns.
+
+    Returns:
+        bool: True when the email, permission or access flag changes, so the tokens
+        issued before must be revoked.
+    """
+    return any(
+        field in CLAIM_COLUMNS and getattr(user, field) != value
+        for field, value in updated_fields.items()
+    )
+
+
+def read_token_version(db: Session, id_user: int) -> int:
+    """
+    Read the current version of the tokens of a user, to issue a token.
+
+    The database is read rather than the map, which may lag behind an increment made
+    by another worker.
+
+    Args:
+        db: The database session.
+        id_user: The id of the user.
+
+    Returns:
+        int: The version, 0 for users never revoked.
+    """
+    version = db.execute(
+        select(VersoesToken.versao).where(VersoesToken.id_usuario == id_user)
+    ).scalar()
+    token_versions.update([(id_user, version or 0)])
+    return version or 0
+
+
+def increment_token_version(db: Session, id_user: int) -> int:
+    """
+    Revoke every token of a user, in the transaction of the session.
+
+    The caller commits. The map of the worker is raised by the caller once the
+    transaction is committed, with the returned version.
+
+    Args:
+        db: The database session.
+        id_user: The id of the user.
+
+    Returns:
+        int: The new version.
+    """
+    incremented = db.execute(
+        update(VersoesToken)
+        .where(VersoesToken.id_usuario == id_user)
+        .values(
+            versao=VersoesToken.versao + 1,
+            atualizado_em=func.now(),  # pylint: disable=not-callable
+        )
+    ).rowcount
+    if not incremented:
+        db.add(VersoesToken(id_usuario=id_user, versao=1))
+        db.flush()
+        return 1
+    return db.execute(
+        select(VersoesToken.versao).where(VersoesToken.id_usuario == id_user)
+    ).scalar()
+
+
+def refresh_token_versions(db: Session) -> int:
+    """
+    Read the versions incremented since the last refresh, every one the first time.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        int: The number of versions read.
+    """
+    statement = select(
+        VersoesToken.id_usuario, VersoesToken.versao, VersoesToken.atualizado_em
+    )
+    if token_versions.watermark is not None:
+        statement = statement.where(
+            VersoesToken.atualizado_em >= token_versions.watermark - WATERMARK_OVERLAP
+        )
+    rows = db.execute(statement).all()
+    token_versions.update((row.id_usuario, row.versao) for row in rows)
+    token_versions.watermark = max(
+        (row.atualizado_em for row in rows), default=token_versions.watermark
+    )
+    token_versions.loaded = True
+    return len(rows)
+
+
+def _refresh() -> None:
+    """Refresh the versions and revocations from the primary, logging failures."""
+    try:
+        with PrimaryReadSessionLocal() as db:
+            refresh_token_versions(db)
+            refresh_token_revocations(db)
+        with SessionLocal() as db:
+            purge_token_revocations(db)
+    except SQLAlchemyError as e:
+        setup_logger().error("Error refreshing the token versions: %s", e)
+
+
+class TokenVersionRefresher(threading.Thread):
+    """
+    Background thread refreshing the versions and revocations of the tokens.
+
+    Attributes:
+        interval: The seconds between refreshes.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="token-version-refresher", daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            _refresh()
+
+    def stop(self) -> None:
+        """Stop the thread after the running refresh."""
+        self._stopped.set()
+        self.join()
+
+
+_refresher: TokenVersionRefresher = None
+
+
+def start_token_version_refresher() -> None:
+    """Load the versions, then start refreshing them in the background."""
+    global _refresher  # pylint: disable=global-statement
+    if settings.TOKEN_VERSION_REFRESH_INTERVAL <= 0:
+        return
+    _refresh()
+    _refresher = TokenVersionRefresher(settings.TOKEN_VERSION_REFRESH_INTERVAL)
+    _refresher.start()
+    setup_logger().info("Token version refresher started.")
+
+
+def stop_token_version_refresher() -> None:
+    """Stop refreshing the versions."""
+    global _refresher  # pylint: disable=global-statement
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
+        setup_logger().info("Token version refresher stopped.")
@@ -0,0 +1,244 @@
+"""
+Module: link_status.py
+
+This module publishes the status changes of unique access links to the live streams
+of the API.
+
+Answer submissions publish the links they answer to an in-process broker, which fans
+each event out to the subscriptions of the worker. Every subscription buffers at most
+LINK_EVENTS_BUFFER_SIZE events: a subscriber too slow to keep up loses the oldest
+ones and is told to resync, so a slow client never holds the memory of the others.
+
+Classes:
+    LinkStatusSubscription: Bounded buffer of the events of one subscriber.
+    LinkStatusBroker: In-process pub/sub of link status events.
+
+Functions:
+    publish_link_status: Publish the new status of answered links.
+    stream_link_status: Stream the events of a subscription as Server-Sent Events.
+"""
+
+# pylint: disable=import-error
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator
+from fastapi import Request
+from prometheus_client import Counter, Gauge
+from personavix.src.settings import settings
+
+SUBSCRIBERS = Gauge(
+    "personavix_link_events_subscribers", "Open streams of link status events."
+)
+DROPPED_EVENTS = Counter(
+    "personavix_link_events_dropped_total",
+    "Link status events dropped from the buffer of a slow subscriber.",
+)
+
+
+class LinkStatusSubscription:
+    """
+    Bounded buffer of the events of one subscriber.
+
+    Events may be pushed from any thread, the subscriber reads them on its event loop.
+
+    Attributes:
+        lost_events: Whether events were dropped since the last read.
+        closed: Whether the broker closed the subscription.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, buffer_size: int):
+        self.lost_events = False
+        self.closed = False
+        self._loop = loop
+        self._events: deque = deque(maxlen=buffer_size)
+        self._ready = asyncio.Event()
+
+    def push(self, event: tuple[int, dict]) -> None:
+        """
+        Buffer an event, dropping the oldest one when the buffer is full.
+
+        Args:
+            event: The id and the data of the event.
+        """
+        if len(self._events) == self._events.maxlen:
+            self.lost_events = True
+            DROPPED_EVENTS.inc()
+        self._events.append(event)
+        self._wake()
+
+    def close(self) -> None:
+        """Close the subscription, ending its stream."""
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        """Wake the reader up from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:  # The event loop of the subscriber is closed.
+            self.closed = True
+
+    async def read(self, timeout: float) -> list[tuple[int, dict]]:
+        """
+        Wait for events and take every buffered one.
+
+        Args:
+            timeout: The seconds to wait for an event.
+
+        Returns:
+            list[tuple[int, dict]]: The buffered events, empty after the timeout.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+
+class LinkStatusBroker:
+    """
+    In-process pub/sub of link status events.
+
+    Attributes:
+        buffer_size: The maximum number of events buffered per subscriber.
+        max_subscribers: The maximum number of open subscriptions.
+    """
+
+    def __init__(self, buffer_size: int, max_subscribers: int):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscriptions: set = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self) -> LinkStatusSubscription:
+        """
+        Open a subscription, from the event loop of the subscriber.
+
+        Returns:
+            LinkStatusSubscription: The subscription, or None when max_subscribers are
+            already open.
+        """
+        subscription = LinkStatusSubscription(
+            asyncio.get_running_loop(), self.buffer_size
+        )
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                return None
+            self._subscriptions.add(subscription)
+        SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: LinkStatusSubscription) -> None:
+        """
+        Close a subscription.
+
+        Args:
+            subscription: The subscription.
+        """
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+        SUBSCRIBERS.dec()
+
+    def has_subscribers(self) -> bool:
+        """
+        Check whether a subscription is open.
+
+        Returns:
+            bool: True when at least one stream is open.
+        """
+        return bool(self._subscriptions)
+
+    def publish(self, events: list[dict]) -> None:
+        """
+        Push events to every subscription, from any thread.
+
+        Args:
+            events: The events, each one gets the next id of the broker.
+        """
+        if not events:
+            return
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            events = [(next(self._ids), event) for event in events]
+        for subscription in subscriptions:
+            for event in events:
+                subscription.push(event)
+
+    def close(self) -> None:
+        """Close every subscription, ending the open streams."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
+
+
+link_status_broker = LinkStatusBroker(
+    settings.LINK_EVENTS_BUFFER_SIZE, settings.LINK_EVENTS_MAX_SUBSCRIBERS
+)
+
+
+def publish_link_status(links: list[dict]) -> None:
+    """
+    Publish the new status of answered links.
+
+    Args:
+        links: The answered links, with id_sessao, id_resposta and respondido_em.
+    """
+    link_status_broker.publish(
+        [
+            {
+                "id_sessao": link["id_sessao"],
+                "respondido": 1,
+                "id_resposta": link["id_resposta"],
+                "respondido_em": (
+                    link["respondido_em"].isoformat()
+                    if isinstance(link["respondido_em"], datetime)
+                    else link["respondido_em"]
+                ),
+            }
+            for link in links
+        ]
+    )
+
+
+async def stream_link_status(
+    request: Request, subscription: LinkStatusSubscription
+) -> AsyncIterator[str]:
+    """
+    Stream the events of a subscription as Server-Sent Events.
+
+    A comment is sent every LINK_EVENTS_HEARTBEAT seconds without events, which keeps
+    proxies from closing the stream and notices clients that went away.
+
+    Args:
+        request: The request of the stream.
+        subscription: The subscription, closed when the stream ends.
+
+    Yields:
+        str: The retry delay, then link_status events, resync events when events were
+        dropped and heartbeat comments.
+    """
+    try:
+        yield "retry: 5000\n\n"
+        while not subscription.closed and not await request.is_disconnected():
+            events = await subscription.read(settings.LINK_EVENTS_HEARTBEAT)
+            if subscription.lost_events:
+                subscription.lost_events = False
+                yield "event: resync\ndata: {}\n\n"
+            for event_id, event in events:
+                yield f"id: {event_id}\nevent: link_status\ndata: {json.dumps(event)}\n\n"
+            if not events and not subscription.closed:
+                yield ": keep-alive\n\n"
+    finally:
+        link_status_broker.unsubscribe(subscription)
@@ -0,0 +1,539 @@
+"""
+Module: answers_queue.py
+
+This module contains the write-behind ingestion of answers.
+
+Submitted answers are appended to a durable SQLite journal on the local disk and a
+background thread flushes them to the respostas table in batches. An answer stays in
+the journal until the transaction writing it is committed, so a crash or a database
+outage delays answers but does not lose them.
+
+The workers of a host share the journal at ANSWERS_QUEUE_PATH, each running its own
+flusher. A flusher claims its batch in one write transaction, so two flushers never
+write the same answer. A claim older than ANSWERS_CLAIM_TIMEOUT seconds, left by a
+worker which died while flushing, is taken over by the others. An answer the database
+rejects, like one violating a constraint, or whose payload cannot be decoded, is moved
+to the respostas_rejeitadas table of the journal, so it does not hold back the answers
+queued after it.
+
+Classes:
+    AnswersQueue: Durable local journal of submitted answers.
+    AnswersFlusher: Background thread writing the journal to the database.
+
+Functions:
+    write_answers_batch: Write a batch of queued answers in one transaction.
+    get_answers_queue: Get the journal of the process.
+    start_answers_flusher: Start the background flusher.
+    stop_answers_flusher: Flush what is left and stop the background flusher.
+"""
+
+# pylint: disable=import-error
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+from personavix.src.database.database import engine
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+from personavix.src.models.schemas import answers
+from personavix.src.cache.unique_access_links import invalidate_link_sessions
+from personavix.src.events.link_status import link_status_broker, publish_link_status
+from personavix.src.projections.answer_rollups import add_answers_to_rollups
+from personavix.src.projections.current_profiles import refresh_current_profiles
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+QUEUE_DEPTH = Gauge(
+    "personavix_answers_queue_depth", "Answers waiting in the local journal."
+)
+QUEUE_LAG = Gauge(
+    "personavix_answers_queue_lag_seconds",
+    "Age of the oldest answer waiting in the local journal.",
+)
+FLUSH_BATCH_SIZE = Histogram(
+    "personavix_answers_flush_batch_size",
+    "Number of queued answers read per flush.",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+# Errors of a single answer, raised by the database or by a payload of the journal
+# that cannot be decoded. The answer is set aside instead of being retried.
+REJECTED_ERRORS = (DataError, IntegrityError, ValueError, TypeError)
+
+FLUSHED_ANSWERS = Counter(
+    "personavix_answers_flushed_total",
+    "Queued answers handled by the flusher.",
+    ["result"],
+)
+
+
+class AnswersQueue:
+    """
+    Durable local journal of submitted answers.
+
+    The journal is a SQLite database in WAL mode with synchronous writes, so an
+    appended answer survives a crash of the process.
+
+    Attributes:
+        path: The path of the journal.
+        claim_timeout: The seconds after which a claimed answer may be claimed again.
+        claimant: The identifier of the claims of this journal.
+    """
+
+    def __init__(self, path: str, claim_timeout: float = 60.0):
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self.claimant = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS respostas_pendentes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                receipt TEXT NOT NULL UNIQUE,
+                id_usuario INTEGER NOT NULL,
+                id_sessao INTEGER UNIQUE,
+                payload TEXT NOT NULL,
+                queued_at REAL NOT NULL,
+                claimed_by TEXT,
+                claimed_at REAL
+            )
+            """
+        )
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS respostas_rejeitadas (
+                id INTEGER PRIMARY KEY,
+                receipt TEXT NOT NULL,
+                id_usuario INTEGER NOT NULL,
+                id_sessao INTEGER,
+                payload TEXT NOT NULL,
+                queued_at REAL NOT NULL,
+                erro TEXT NOT NULL,
+                rejeitado_em REAL NOT NULL
+            )
+            """
+        )
+
+    def append(self, id_user: int, answer: answers.AnswersCreate) -> dict:
+        """
+        Append an answer to the journal.
+
+        An answer for a session that is already in the journal is not appended again,
+        the receipt of the queued answer is returned instead.
+
+        Args:
+            id_user: The id of the user who answered.
+            answer: The validated answer.
+
+        Returns:
+            dict: The receipt of the answer.
+        """
+        queued_at = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO respostas_pendentes "
+                "(receipt, id_usuario, id_sessao, payload, queued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(uuid.uuid4()),
+                    id_user,
+                    answer.id_sessao,
+                    json.dumps(answer.dict()),
+                    queued_at,
+                ),
+            )
+            if cursor.rowcount:
+                lookup = ("id = ?", cursor.lastrowid)
+            else:
+                lookup = ("id_sessao = ?", answer.id_sessao)
+            receipt = self._connection.execute(
+                "SELECT receipt, id_usuario, id_sessao, queued_at "
+                f"FROM respostas_pendentes WHERE {lookup[0]}",
+                (lookup[1],),
+            ).fetchone()
+
+        return {
+            "receipt": receipt["receipt"],
+            "id_usuario": receipt["id_usuario"],
+            "id_sessao": receipt["id_sessao"],
+            "queued_at": datetime.fromtimestamp(receipt["queued_at"]),
+        }
+
+    @contextmanager
+    def _write_transaction(self):
+        """
+        Run statements in one write transaction, locking the journal for every process.
+
+        Yields:
+            sqlite3.Connection: The connection of the journal.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    @staticmethod
+    def _placeholders(ids: list[int]) -> str:
+        """Build the placeholders of a list of ids."""
+        return ",".join("?" * len(ids))
+
+    def claim(self, limit: int) -> list[dict]:
+        """
+        Claim the oldest answers of the journal no other flusher is writing.
+
+        Args:
+            limit: The maximum number of answers.
+
+        Returns:
+            list[dict]: The claimed answers, oldest first.
+        """
+        now = time.time()
+        with self._write_transaction() as connection:
+            rows = connection.execute(
+                "SELECT id, receipt, id_usuario, id_sessao, payload, queued_at "
+                "FROM respostas_pendentes "
+                "WHERE claimed_by IS NULL OR claimed_at < ? ORDER BY id LIMIT ?",
+                (now - self.claim_timeout, limit),
+            ).fetchall()
+            ids = [row["id"] for row in rows]
+            if ids:
+                connection.execute(
+                    "UPDATE respostas_pendentes SET claimed_by = ?, claimed_at = ? "
+                    f"WHERE id IN ({self._placeholders(ids)})",
+                    (self.claimant, now, *ids),
+                )
+        return [dict(row) for row in rows]
+
+    def release(self, ids: list[int]) -> None:
+        """
+        Release claimed answers which could not be written, for a later flush.
+
+        Args:
+            ids: The journal ids of the answers.
+        """
+        if not ids:
+            return
+        with self._write_transaction() as connection:
+            connection.execute(
+                "UPDATE respostas_pendentes SET claimed_by = NULL, claimed_at = NULL "
+                f"WHERE claimed_by = ? AND id IN ({self._placeholders(ids)})",
+                (self.claimant, *ids),
+            )
+
+    def remove(self, ids: list[int]) -> None:
+        """
+        Remove written answers from the journal.
+
+        Args:
+            ids: The journal ids of the answers.
+        """
+        if not ids:
+            return
+        with self._write_transaction() as connection:
+            connection.execute(
+                f"DELETE FROM respostas_pendentes WHERE id IN ({self._placeholders(ids)})",
+                ids,
+            )
+
+    def reject(self, entry_id: int, error: str) -> None:
+        """
+        Move an answer the database rejected to the respostas_rejeitadas table.
+
+        Args:
+            entry_id: The journal id of the answer.
+            error: The error of the database.
+        """
+        with self._write_transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO respostas_rejeitadas "
+                "(id, receipt, id_usuario, id_sessao, payload, queued_at, erro, "
+                "rejeitado_em) "
+                "SELECT id, receipt, id_usuario, id_sessao, payload, queued_at, ?, ? "
+                "FROM respostas_pendentes WHERE id = ?",
+                (error, time.time(), entry_id),
+            )
+            connection.execute("DELETE FROM respostas_pendentes WHERE id = ?", (entry_id,))
+
+    def rejected(self) -> list[dict]:
+        """
+        Read the answers the database rejected.
+
+        Returns:
+            list[dict]: The rejected answers, with the error of the database.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT * FROM respostas_rejeitadas ORDER BY id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> tuple[int, float]:
+        """
+        Get the depth and the lag of the journal.
+
+        Returns:
+            tuple[int, float]: The number of queued answers and the age of the oldest
+            one in seconds.
+        """
+        with self._lock:
+            depth, oldest = self._connection.execute(
+                "SELECT COUNT(*), MIN(queued_at) FROM respostas_pendentes"
+            ).fetchone()
+        return depth, (time.time() - oldest) if oldest else 0.0
+
+    def close(self) -> None:
+        """Close the journal."""
+        with self._lock:
+            self._connection.close()
+
+
+def write_answers_batch(bind: Engine, entries: list[dict]) -> int:
+    """
+    Write a batch of queued answers in one transaction.
+
+    The open links of the batch are locked first, so answers for links that were
+    answered meanwhile (or twice in the same batch) are dropped. The answers are then
+    written with one multi-row INSERT, the current profiles of their users and the
+    daily rollup are updated and their links are marked with one UPDATE joined on
+    respostas.id_sessao. The answered links are published to the open link status
+    streams once committed.
+
+    Args:
+        bind: The engine of the database.
+        entries: The queued answers, as claimed by AnswersQueue.claim.
+
+    Returns:
+        int: The number of written answers.
+    """
+    sessions = {entry["id_sessao"] for entry in entries if entry["id_sessao"]}
+    answered_links = []
+
+    with bind.begin() as connection:
+        open_sessions = set()
+        if sessions:
+            open_sessions = set(
+                connection.execute(
+                    select(LinksAcessoUnico.id_sessao)
+                    .where(
+                        LinksAcessoUnico.id_sessao.in_(sessions),
+                        LinksAcessoUnico.respondido == 0,
+                        LinksAcessoUnico.expirado_em.is_(None),
+                    )
+                    .with_for_update()
+                ).scalars()
+            )
+
+        rows = []
+        for entry in entries:
+            if entry["id_sessao"] and entry["id_sessao"] not in open_sessions:
+                continue
+            open_sessions.discard(entry["id_sessao"])
+
+            payload = json.loads(entry["payload"])
+            payload.pop("id_sessao", None)
+            rows.append(
+                {
+                    **payload,
+                    "id_usuario": entry["id_usuario"],
+                    "id_sessao": entry["id_sessao"],
+                    "respondido_em": datetime.fromtimestamp(
+                        int(entry["queued_at"])
+                    ),
+                }
+            )
+
+        if rows:
+            connection.execute(insert(Respostas).values(rows))
+            refresh_current_profiles(
+                connection, list({row["id_usuario"] for row in rows})
+            )
+            add_answers_to_rollups(connection, rows)
+
+        answered_sessions = [row["id_sessao"] for row in rows if row["id_sessao"]]
+        if answered_sessions:
+            connection.execute(
+                update(LinksAcessoUnico)
+                .where(
+                    LinksAcessoUnico.id_sessao == Respostas.id_sessao,
+                    LinksAcessoUnico.id_sessao.in_(answered_sessions),
+                )
+                .values(
+                    respondido=1,
+                    id_resposta=Respostas.id_resposta,
+                    respondido_em=Respostas.respondido_em,
+                )
+            )
+            # The ids of the answers are only read back for the open streams.
+            if link_status_broker.has_subscribers():
+                answered_links = connection.execute(
+                    select(
+                        LinksAcessoUnico.id_sessao,
+                        LinksAcessoUnico.id_resposta,
+                        LinksAcessoUnico.respondido_em,
+                    ).where(LinksAcessoUnico.id_sessao.in_(answered_sessions))
+                ).mappings().all()
+
+    invalidate_link_sessions(answered_sessions)
+    publish_link_status(answered_links)
+    return len(rows)
+
+
+class AnswersFlusher(threading.Thread):
+    """
+    Background thread writing the journal to the database.
+
+    Attributes:
+        queue: The journal of answers.
+        batch_size: The maximum number of answers written per transaction.
+        interval: The seconds between flushes.
+    """
+
+    def __init__(self, queue: AnswersQueue, batch_size: int, interval: float):
+        super().__init__(name="answers-flusher", daemon=True)
+        self.queue = queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            # The thread outlives any failed flush, the journal keeps the answers
+            # for the next interval.
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                setup_logger().error("Error reading the answers journal: %s", e)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                setup_logger().exception("Unexpected error flushing answers: %s", e)
+
+    def flush(self) -> int:
+        """
+        Write the journal to the database until it is empty or the database fails.
+
+        Returns:
+            int: The number of answers handled.
+        """
+        handled = 0
+        while True:
+            entries = self.queue.claim(self.batch_size)
+            if entries:
+                FLUSH_BATCH_SIZE.observe(len(entries))
+                ids = [entry["id"] for entry in entries]
+                try:
+                    try:
+                        written, rejected = write_answers_batch(engine, entries), 0
+                    except REJECTED_ERRORS:
+                        # Some answer of the batch is rejected: each one is written
+                        # alone, to set the rejected ones aside.
+                        written, rejected = self._write_one_by_one(entries)
+                except SQLAlchemyError as e:
+                    self.queue.release(ids)
+                    setup_logger().error("Error flushing queued answers: %s", e)
+                    break
+
+                self.queue.remove(ids)
+                FLUSHED_ANSWERS.labels("written").inc(written)
+                FLUSHED_ANSWERS.labels("rejected").inc(rejected)
+                FLUSHED_ANSWERS.labels("dropped").inc(len(entries) - written - rejected)
+                handled += len(entries)
+
+            if len(entries) < self.batch_size:
+                break
+
+        depth, lag = self.queue.stats()
+        QUEUE_DEPTH.set(depth)
+        QUEUE_LAG.set(lag)
+        return handled
+
+    def _write_one_by_one(self, entries: list[dict]) -> tuple[int, int]:
+        """
+        Write answers in a transaction each, moving the rejected ones aside.
+
+        Each written answer leaves the journal at once, so a database failing midway
+        releases only the answers left.
+
+        Args:
+            entries: The claimed answers.
+
+        Returns:
+            tuple[int, int]: The numbers of written and rejected answers.
+
+        Raises:
+            SQLAlchemyError: Raised when the database fails for another reason.
+        """
+        written = rejected = 0
+        for entry in entries:
+            try:
+                written += write_answers_batch(engine, [entry])
+            except REJECTED_ERRORS as e:
+                self.queue.reject(entry["id"], str(getattr(e, "orig", e)))
+                rejected += 1
+                setup_logger().error(
+                    "Queued answer %s rejected by the database: %s", entry["receipt"], e
+                )
+                continue
+            self.queue.remove([entry["id"]])
+        return written, rejected
+
+    def stop(self) -> None:
+        """Stop the thread and flush what is left in the journal."""
+        self._stopped.set()
+        self.join()
+        self.flush()
+
+
+_answers_queue: AnswersQueue = None
+_answers_flusher: AnswersFlusher = None
+
+
+def get_answers_queue() -> AnswersQueue:
+    """
+    Get the journal of the process, opening it on first use.
+
+    Returns:
+        AnswersQueue: The journal of answers.
+    """
+    global _answers_queue  # pylint: disable=global-statement
+    if _answers_queue is None:
+        _answers_queue = AnswersQueue(
+            settings.ANSWERS_QUEUE_PATH, settings.ANSWERS_CLAIM_TIMEOUT
+        )
+    return _answers_queue
+
+
+def start_answers_flusher() -> None:
+    """Start the background flusher."""
+    global _answers_flusher  # pylint: disable=global-statement
+    _answers_flusher = AnswersFlusher(
+        get_answers_queue(),
+        settings.ANSWERS_FLUSH_BATCH_SIZE,
+        settings.ANSWERS_FLUSH_INTERVAL,
+    )
+    _answers_flusher.start()
+    setup_logger().info("Answers flusher started.")
+
+
+def stop_answers_flusher() -> None:
+    """Flush what is left and stop the background flusher."""
+    global _answers_flusher  # pylint: disable=global-statement
+    if _answers_flusher is not None:
+        _answers_flusher.stop()
+        _answers_flusher = None
+        setup_logger().info("Answers flusher stopped.")
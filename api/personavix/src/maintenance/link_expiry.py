@@ -0,0 +1,261 @@
+"""
+Module: link_expiry.py
+
+This module contains the sweeper of stale unique access links.
+
+Unanswered links created more than LINK_VALIDITY_DAYS ago are expired (marked with
+expirado_em) or deleted. Links are swept in small batches ordered by id_sessao, each
+in its own short transaction, so the table is never locked for long and the sweep can
+run during business hours.
+
+A sweep only runs in the process holding the sweep lock, so the workers of the API
+and the command line do not sweep the same links at once: a MySQL named lock
+(GET_LOCK) held for the whole sweep, or a lock of the process on other databases,
+which are local to one host.
+
+Usage:
+    python -m personavix.src.maintenance.link_expiry --mode delete
+
+Classes:
+    LinkSweeper: Background thread sweeping stale links periodically.
+
+Functions:
+    sweep_lock: Hold the lock allowing one process to sweep at a time.
+    sweep_expired_links: Expire or delete the unanswered links created before a cutoff.
+    run_sweep: Sweep the links older than the validity window and report the run.
+    start_link_sweeper: Start the background sweeper.
+    stop_link_sweeper: Stop the background sweeper.
+    main: Command line entry point to sweep once.
+"""
+
+# pylint: disable=import-error
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from prometheus_client import Counter, Gauge
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from personavix.src.database.database import engine
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+from personavix.src.cache.unique_access_links import invalidate_link_sessions
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+SWEPT_LINKS = Counter(
+    "personavix_links_swept_total", "Stale unique access links swept.", ["mode"]
+)
+LAST_SWEEP_DURATION = Gauge(
+    "personavix_links_last_sweep_duration_seconds",
+    "Duration of the last sweep of stale unique access links.",
+)
+SWEEP_MODES = ("expire", "delete")
+SWEEP_LOCK_NAME = "personavix_link_sweep"
+_process_sweep_lock = threading.Lock()
+
+
+@contextmanager
+def sweep_lock(bind: Engine):
+    """
+    Hold the lock allowing one process to sweep at a time, without waiting for it.
+
+    Args:
+        bind: The engine of the database.
+
+    Yields:
+        bool: True when the lock is held until the end of the block, False when
+        another sweep holds it.
+    """
+    if bind.dialect.name != "mysql":
+        acquired = _process_sweep_lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _process_sweep_lock.release()
+        return
+
+    # The named lock belongs to the connection, which is kept until the sweep ends.
+    with bind.connect() as connection:
+        acquired = connection.execute(
+            text("SELECT GET_LOCK(:name, 0)"), {"name": SWEEP_LOCK_NAME}
+        ).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(
+                    text("SELECT RELEASE_LOCK(:name)"), {"name": SWEEP_LOCK_NAME}
+                )
+
+
+def sweep_expired_links(
+    bind: Engine,
+    cutoff: datetime,
+    batch_size: int,
+    mode: str = "expire",
+    stopped: threading.Event = None,
+) -> int:
+    """
+    Expire or delete the unanswered links created before a cutoff.
+
+    Args:
+        bind: The engine of the database.
+        cutoff: Links created before this moment are swept.
+        batch_size: The maximum number of links per transaction.
+        mode: "expire" marks the links with expirado_em, "delete" removes them.
+        stopped: Stops the sweep between two batches when set.
+
+    Returns:
+        int: The number of swept links.
+    """
+    is_stale = (
+        LinksAcessoUnico.respondido == 0,
+        LinksAcessoUnico.expirado_em.is_(None),
+        LinksAcessoUnico.criado_em < cutoff,
+    )
+    swept = 0
+    last_id_session = 0
+    while True:
+        with bind.begin() as connection:
+            id_sessions = connection.execute(
+                select(LinksAcessoUnico.id_sessao)
+                .where(LinksAcessoUnico.id_sessao > last_id_session, *is_stale)
+                .order_by(LinksAcessoUnico.id_sessao)
+                .limit(batch_size)
+            ).scalars().all()
+            if not id_sessions:
+                return swept
+
+            # The conditions are checked again, a link answered since the SELECT is
+            # kept.
+            if mode == "delete":
+                statement = delete(LinksAcessoUnico)
+            else:
+                statement = update(LinksAcessoUnico).values(expirado_em=datetime.now())
+            swept_now = connection.execute(
+                statement.where(LinksAcessoUnico.id_sessao.in_(id_sessions), *is_stale)
+            ).rowcount
+
+        invalidate_link_sessions(id_sessions)
+        SWEPT_LINKS.labels(mode).inc(swept_now)
+        swept += swept_now
+        last_id_session = id_sessions[-1]
+        if stopped is not None and stopped.wait(settings.LINK_SWEEP_BATCH_PAUSE):
+            return swept
+        if stopped is None:
+            time.sleep(settings.LINK_SWEEP_BATCH_PAUSE)
+
+
+def run_sweep(
+    validity_days: int, batch_size: int, mode: str, stopped: threading.Event = None
+) -> tuple[int, float]:
+    """
+    Sweep the links older than the validity window and report the run.
+
+    The sweep is skipped while another process holds the sweep lock.
+
+    Args:
+        validity_days: The days a link stays valid after its creation.
+        batch_size: The maximum number of links per transaction.
+        mode: "expire" or "delete".
+        stopped: Stops the sweep between two batches when set.
+
+    Returns:
+        tuple[int, float]: The number of swept links and the duration in seconds,
+        (0, 0.0) when the sweep was skipped.
+    """
+    started_at = time.perf_counter()
+    with sweep_lock(engine) as acquired:
+        if not acquired:
+            setup_logger().info("Another process is sweeping the links, skipped.")
+            return 0, 0.0
+        swept = sweep_expired_links(
+            engine,
+            datetime.now() - timedelta(days=validity_days),
+            batch_size,
+            mode,
+            stopped,
+        )
+    duration = time.perf_counter() - started_at
+    LAST_SWEEP_DURATION.set(duration)
+    setup_logger().info(
+        "Swept %s stale unique access links (%s) in %.2fs.", swept, mode, duration
+    )
+    return swept, duration
+
+
+class LinkSweeper(threading.Thread):
+    """
+    Background thread sweeping stale links periodically.
+
+    Attributes:
+        interval: The seconds between sweeps.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="link-sweeper", daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                run_sweep(
+                    settings.LINK_VALIDITY_DAYS,
+                    settings.LINK_SWEEP_BATCH_SIZE,
+                    settings.LINK_SWEEP_MODE,
+                    self._stopped,
+                )
+            except SQLAlchemyError as e:
+                setup_logger().error("Error sweeping stale unique access links: %s", e)
+
+    def stop(self) -> None:
+        """Stop the thread after the running batch."""
+        self._stopped.set()
+        self.join()
+
+
+_link_sweeper: LinkSweeper = None
+
+
+def start_link_sweeper() -> None:
+    """Start the background sweeper."""
+    global _link_sweeper  # pylint: disable=global-statement
+    _link_sweeper = LinkSweeper(settings.LINK_SWEEP_INTERVAL)
+    _link_sweeper.start()
+    setup_logger().info("Link sweeper started.")
+
+
+def stop_link_sweeper() -> None:
+    """Stop the background sweeper."""
+    global _link_sweeper  # pylint: disable=global-statement
+    if _link_sweeper is not None:
+        _link_sweeper.stop()
+        _link_sweeper = None
+        setup_logger().info("Link sweeper stopped.")
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point to sweep once.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Sweep stale unique access links.")
+    parser.add_argument("--mode", choices=SWEEP_MODES, default=settings.LINK_SWEEP_MODE)
+    parser.add_argument("--days", type=int, default=settings.LINK_VALIDITY_DAYS)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.LINK_SWEEP_BATCH_SIZE
+    )
+    args = parser.parse_args(argv)
+
+    swept, duration = run_sweep(args.days, args.batch_size, args.mode)
+    print(f"Swept {swept} links in {duration:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
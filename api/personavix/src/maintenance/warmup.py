@@ -0,0 +1,180 @@
+"""
+Module: warmup.py
+
+This module warms up a worker before it reports ready.
+
+A new worker pays on its first requests for the connections of the pools, the
+questionary read from the database, the compilation of the statements of the hot
+routes and the serializers of their response models. The warm-up pays for all of
+them once, in the background of the lifespan, and the readiness probe only succeeds
+once it has finished, so the load balancer sends no traffic to a cold worker.
+
+The warm-up is best effort: a failing step is logged and skipped, a worker that cannot
+warm up still serves traffic, only more slowly.
+
+Functions:
+    open_pool_connections: Open connections of the pool and return them to it.
+    run_hot_queries: Run once each statement of the hot routes.
+    warm_up_serializers: Build the serializers of the hot response models.
+    run_warmup: Run every step of the warm-up, then report ready.
+    mark_ready: Report the worker ready without warming it up.
+    mark_not_ready: Report the worker not ready.
+    is_ready: Check whether the worker is ready.
+"""
+
+# pylint: disable=import-error
+import threading
+import time
+from prometheus_client import Gauge
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload
+from personavix.src.cache.questionary import get_questionary_payload
+from personavix.src.database.database import engine, read_engine
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.models.schemas import answers, unique_access_links, users
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+WARMUP_DURATION = Gauge(
+    "personavix_warmup_duration_seconds", "Duration of the warm-up of the worker."
+)
+READY = Gauge("personavix_ready", "Whether the worker is ready to serve traffic.")
+
+_ready = threading.Event()
+
+
+def open_pool_connections(bind: Engine, count: int) -> int:
+    """
+    Open connections of the pool and return them to it.
+
+    The connections are checked out together, so the pool opens count of them instead
+    of reusing the first one.
+
+    Args:
+        bind: The engine of the database.
+        count: The number of connections, capped by the size of the pool.
+
+    Returns:
+        int: The number of connections opened.
+    """
+    size = getattr(bind.pool, "size", lambda: count)()
+    connections = []
+    try:
+        for _ in range(min(count, size)):
+            connections.append(bind.connect())
+            connections[-1].execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def run_hot_queries(db: Session) -> None:
+    """
+    Run once each statement of the hot routes, filling the compiled cache.
+
+    The parameters match no row, only the statements matter.
+
+    Args:
+        db: The database session.
+    """
+    db.query(LinksAcessoUnico).options(joinedload(LinksAcessoUnico.usuarios_)).filter(
+        LinksAcessoUnico.link == "", LinksAcessoUnico.expirado_em.is_(None)
+    ).first()
+    db.query(LinksAcessoUnico).filter(
+        LinksAcessoUnico.id_sessao == "", LinksAcessoUnico.expirado_em.is_(None)
+    ).first()
+    db.query(Usuarios).filter(Usuarios.email == "").first()
+    db.query(Usuarios).filter(Usuarios.telefone == "").first()
+    db.query(Usuarios).filter(Usuarios.id_usuario == 0).first()
+    db.query(Respostas).filter(Respostas.id_resposta == 0).first()
+    db.query(Respostas).options(joinedload(Respostas.usuarios_)).filter(
+        Respostas.id_resposta == 0
+    ).first()
+    db.query(Respostas).join(
+        LinksAcessoUnico, LinksAcessoUnico.id_resposta == Respostas.id_resposta
+    ).filter(LinksAcessoUnico.id_sessao == "").first()
+
+
+def warm_up_serializers(db: Session) -> None:
+    """
+    Build the serializers of the hot response models, and run each one on a row.
+
+    Args:
+        db: The database session.
+    """
+    user = db.query(Usuarios).first()
+    link = db.query(LinksAcessoUnico).first()
+    answer = db.query(Respostas).first()
+    serialize_response(list[users.User], [user] if user else [])
+    serialize_response(
+        list[unique_access_links.UniqueAccessLink], [link] if link else []
+    )
+    serialize_response(list[answers.AnswersWithUser], [answer] if answer else [])
+    if link is not None:
+        serialize_response(unique_access_links.UniqueAccessLinkWithUser, link)
+    if answer is not None:
+        serialize_response(answers.Answer, answer)
+
+
+def run_warmup() -> float:
+    """
+    Run every step of the warm-up, then report ready.
+
+    Returns:
+        float: The duration of the warm-up in seconds.
+    """
+    started_at = time.perf_counter()
+    # Each engine has its own pool and compiled cache, the replica is warmed up too.
+    binds = (engine,) if read_engine is engine else (engine, read_engine)
+    steps = (get_questionary_payload, run_hot_queries, warm_up_serializers)
+    for bind in binds:
+        try:
+            opened = open_pool_connections(bind, settings.WARMUP_POOL_CONNECTIONS)
+            setup_logger().info(
+                "Warm-up opened %s connections to %s.",
+                opened,
+                bind.url.host or bind.url.database,
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            setup_logger().error("Warm-up could not open the pool: %s", e)
+
+        with Session(bind) as db:
+            for step in steps:
+                try:
+                    step(db)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    db.rollback()
+                    setup_logger().error("Warm-up step %s failed: %s", step.__name__, e)
+
+    duration = time.perf_counter() - started_at
+    WARMUP_DURATION.set(duration)
+    setup_logger().info("Warm-up finished in %.2fs.", duration)
+    mark_ready()
+    return duration
+
+
+def mark_ready() -> None:
+    """Report the worker ready without warming it up."""
+    _ready.set()
+    READY.set(1)
+
+
+def mark_not_ready() -> None:
+    """Report the worker not ready."""
+    _ready.clear()
+    READY.set(0)
+
+
+def is_ready() -> bool:
+    """
+    Check whether the worker is ready.
+
+    Returns:
+        bool: True once the warm-up has finished.
+    """
+    return _ready.is_set()
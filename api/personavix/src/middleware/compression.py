@@ -0,0 +1,160 @@
+"""
+Module: compression.py
+
+This module contains the middleware compressing large responses.
+
+The encoding is negotiated from the Accept-Encoding header: brotli when the client
+accepts it and the brotli package is installed, gzip otherwise. Only complete bodies
+above the minimum size are compressed, streamed responses are sent as they are.
+
+Classes:
+    CompressionMiddleware: ASGI middleware compressing large response bodies.
+
+Functions:
+    choose_encoding: Choose the encoding of a response from the Accept-Encoding header.
+"""
+
+# pylint: disable=import-error
+import gzip
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available.
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/csv")
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    Choose the encoding of a response from the Accept-Encoding header.
+
+    Args:
+        accept_encoding: The value of the Accept-Encoding header.
+
+    Returns:
+        str: "br", "gzip", or None when the response is sent as is.
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        if parameters.strip().startswith("q="):
+            try:
+                quality = float(parameters.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+    candidates = [
+        coding
+        for coding in available
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda coding: accepted.get(coding, accepted.get("*")))
+
+
+class CompressionMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    ASGI middleware compressing large response bodies.
+
+    Attributes:
+        app: The wrapped ASGI application.
+        minimum_size: The smallest body compressed, in bytes.
+        gzip_level: The gzip compression level.
+        brotli_quality: The brotli quality.
+    """
+
+    def __init__(
+        self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._should_compress(start, body):
+                await send(start)
+                await send(message)
+                return
+
+            # Compressing a large body takes milliseconds, off the event loop.
+            body = await run_in_threadpool(self._compress, body, encoding)
+            vary = [b"Accept-Encoding"]
+            response_headers = []
+            for name, value in start["headers"]:
+                if name.lower() == b"vary":
+                    vary.insert(0, value)
+                elif name.lower() != b"content-length":
+                    response_headers.append((name, value))
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"vary", b", ".join(vary)),
+            ]
+            await send({**start, "headers": response_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _should_compress(self, start: dict, body: bytes) -> bool:
+        """
+        Check whether a complete response is worth compressing.
+
+        Args:
+            start: The http.response.start message.
+            body: The whole body.
+
+        Returns:
+            bool: True for a large body of a compressible type not encoded yet.
+        """
+        if len(body) < self.minimum_size:
+            return False
+        headers = {name.lower(): value for name, value in start["headers"]}
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        return b"content-encoding" not in headers and content_type.startswith(
+            COMPRESSIBLE_TYPES
+        )
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress a body.
+
+        Args:
+            body: The body.
+            encoding: "br" or "gzip".
+
+        Returns:
+            bytes: The compressed body.
+        """
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
@@ -0,0 +1,190 @@
+"""
+Module: query_budget.py
+
+This module counts the statements each request runs, and the time they take.
+
+Engine events add each statement to the statistics of the request being served,
+found in a context variable set by the middleware. When the response starts, a route
+running more statements than the budget declared with @query_budget is logged, and so
+is a statement repeated N_PLUS_ONE_THRESHOLD times, usually a relationship lazily
+loaded in a loop. In DEBUG mode, the counts are also sent back in the x-db-queries,
+x-db-time-ms and x-db-query-budget headers.
+
+Classes:
+    QueryStats: Statements run by a request.
+    QueryBudgetMiddleware: ASGI middleware measuring the statements of each request.
+
+Functions:
+    query_budget: Declare the maximum number of statements of a route.
+    track_queries: Count the statements of an engine in the current request.
+"""
+
+# pylint: disable=import-error
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+QUERIES_PER_REQUEST = Histogram(
+    "personavix_db_queries_per_request",
+    "Statements run by a request, by route.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+BUDGET_ATTRIBUTE = "__query_budget__"
+START_KEY = "query_started_at"
+
+
+class QueryStats:  # pylint: disable=too-few-public-methods
+    """
+    Statements run by a request.
+
+    Attributes:
+        count: The number of statements.
+        duration: The seconds spent running them.
+        statements: The number of runs of each statement.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = StatementCounter()
+
+    def record(self, statement: str, duration: float) -> None:
+        """
+        Record a statement.
+
+        Args:
+            statement: The SQL of the statement.
+            duration: The seconds it took.
+        """
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+
+current_query_stats: ContextVar[QueryStats] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def query_budget(budget: int):
+    """
+    Declare the maximum number of statements of a route.
+
+    Args:
+        budget: The maximum number of statements of a request to the route.
+
+    Returns:
+        Callable: A decorator marking the route function, to apply before the route
+        decorator.
+    """
+
+    def decorator(function):
+        setattr(function, BUDGET_ATTRIBUTE, budget)
+        return function
+
+    return decorator
+
+
+def track_queries(bind: Engine) -> None:
+    """
+    Count the statements of an engine in the statistics of the current request.
+
+    Args:
+        bind: The engine.
+    """
+
+    @event.listens_for(bind, "before_cursor_execute")
+    def _started(conn, *_args):
+        conn.info.setdefault(START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(bind, "after_cursor_execute")
+    def _finished(conn, _cursor, statement, *_args):
+        started_at = conn.info[START_KEY].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - started_at)
+
+    @event.listens_for(bind, "handle_error")
+    def _failed(context):
+        if context.connection is not None and context.connection.info.get(START_KEY):
+            context.connection.info[START_KEY].pop()
+
+
+class QueryBudgetMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    ASGI middleware measuring the statements of each request.
+
+    Attributes:
+        app: The wrapped ASGI application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                budget = self._check(scope, stats)
+                if settings.DEBUG:
+                    headers = [
+                        (b"x-db-queries", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.duration * 1000:.1f}".encode()),
+                    ]
+                    if budget is not None:
+                        headers.append((b"x-db-query-budget", str(budget).encode()))
+                    message = {**message, "headers": [*message["headers"], *headers]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_query_stats.reset(token)
+
+    @staticmethod
+    def _check(scope: dict, stats: QueryStats) -> int:
+        """
+        Record the statements of a request and log the routes over their budget.
+
+        Args:
+            scope: The scope of the request, with its route once routed.
+            stats: The statements of the request.
+
+        Returns:
+            int: The budget of the route, or None when it declares none.
+        """
+        route = scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        budget = getattr(getattr(route, "endpoint", None), BUDGET_ATTRIBUTE, None)
+        QUERIES_PER_REQUEST.labels(path).observe(stats.count)
+
+        if budget is not None and stats.count > budget:
+            setup_logger().warning(
+                "%s %s ran %s statements, over its budget of %s.",
+                scope["method"],
+                path,
+                stats.count,
+                budget,
+            )
+        statement, runs = next(iter(stats.statements.most_common(1)), (None, 0))
+        if runs >= settings.N_PLUS_ONE_THRESHOLD:
+            setup_logger().warning(
+                "%s %s ran the same statement %s times, a possible N+1: %s",
+                scope["method"],
+                path,
+                runs,
+                " ".join(statement.split())[:200],
+            )
+        return budget
@@ -0,0 +1,84 @@
+"""
+Module: read_your_writes.py
+
+This module remembers the last write of each client, so its reads following a write
+go to the primary database instead of a lagging replica.
+
+Every successful request with a writing method gets the time of the write in the
+personavix_last_write cookie and in the X-Last-Write header. Browsers send the cookie
+back; other clients may send the header back on their next reads.
+
+Classes:
+    ReadYourWritesMiddleware: ASGI middleware stamping the responses to writes.
+
+Functions:
+    wrote_recently: Check whether the client of a request wrote recently.
+"""
+
+# pylint: disable=import-error
+import time
+from fastapi import Request
+from personavix.src.settings import settings
+
+LAST_WRITE_COOKIE = "personavix_last_write"
+LAST_WRITE_HEADER = "x-last-write"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def wrote_recently(request: Request) -> bool:
+    """
+    Check whether the client of a request wrote recently.
+
+    Args:
+        request: The request.
+
+    Returns:
+        bool: True when the client wrote less than READ_YOUR_WRITES_WINDOW seconds ago.
+    """
+    last_write = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(
+        LAST_WRITE_COOKIE
+    )
+    if not last_write:
+        return False
+    try:
+        return time.time() - float(last_write) < settings.READ_YOUR_WRITES_WINDOW
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    ASGI middleware stamping the responses to writes with the time of the write.
+
+    Attributes:
+        app: The wrapped ASGI application.
+        window: The seconds a client reads from the primary after a write.
+    """
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or not self.window:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_stamped(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                written_at = f"{time.time():.3f}".encode("latin-1")
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={written_at.decode('latin-1')}; "
+                    f"Max-Age={max(1, round(self.window))}; Path=/; SameSite=Lax"
+                )
+                message = {
+                    **message,
+                    "headers": [
+                        *message["headers"],
+                        (LAST_WRITE_HEADER.encode("latin-1"), written_at),
+                        (b"set-cookie", cookie.encode("latin-1")),
+                    ],
+                }
+            await send(message)
+
+        await self.app(scope, receive, send_stamped)
@@ -0,0 +1,34 @@
+"""
+Module: answer_rollups.py
+
+This module contains the domain model of the daily counts of answers.
+
+Classes:
+    RespostasDiarias (Base): Represents the number of answers of a day, setor and motivo.
+"""
+
+# pylint: disable=import-error, duplicate-code
+from sqlalchemy import Column, Date, Integer, String
+from personavix.src.database.database import Base
+
+
+class RespostasDiarias(Base):  # pylint: disable=too-few-public-methods
+    """
+    Represents the number of answers of a day, setor and motivo.
+
+    The setor is the one of the user when the answer was recorded, an empty string
+    when the user had none.
+
+    Attributes:
+        dia (Date): The day the answers were given.
+        setor (str): The setor of the users who answered.
+        motivo (str): The reason for the answers.
+        total (int): The number of answers.
+    """
+
+    __tablename__ = "respostas_diarias"
+
+    dia = Column(Date, primary_key=True, nullable=False)
+    setor = Column(String(45), primary_key=True, nullable=False)
+    motivo = Column(String(45), primary_key=True, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
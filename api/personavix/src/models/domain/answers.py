@@ -15,6 +15,7 @@ from sqlalchemy import (
     ForeignKeyConstraint,
     Integer,
     String,
+    UniqueConstraint,
     text,
 )
 from sqlalchemy.orm import relationship
@@ -33,6 +34,7 @@ class Respostas(Base):  # pylint: disable=too-few-public-methods
         estabilidade (str): The stability score.
         conformidade (str): The conformity score.
         motivo (str): The reason for the answer.
+        id_sessao (int): The unique access link session the answer was submitted through.
     """
 
     __tablename__ = "respostas"
@@ -43,6 +45,7 @@ class Respostas(Base):  # pylint: disable=too-few-public-methods
             ondelete="CASCADE",
             name="fk_respostas_usuarios",
         ),
+        UniqueConstraint("id_sessao", name="id_sessao_UNIQUE"),
     )
 
     id_resposta = Column(
@@ -54,6 +57,7 @@ class Respostas(Base):  # pylint: disable=too-few-public-methods
     estabilidade = Column(Float, nullable=False)
     conformidade = Column(Float, nullable=False)
     motivo = Column(String(45), nullable=False)
+    id_sessao = Column(Integer)
     respondido_em = Column(
         DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP")
     )
@@ -0,0 +1,57 @@
+"""
+Module: current_profiles.py
+
+This module contains the domain model of the latest DISC profile of each user.
+
+Classes:
+    PerfilAtual (Base): Represents the latest answer of a user.
+"""
+
+# pylint: disable=import-error, duplicate-code
+from sqlalchemy import Column, DateTime, Float, ForeignKeyConstraint, Integer, text
+from personavix.src.database.database import Base
+
+
+class PerfilAtual(Base):  # pylint: disable=too-few-public-methods
+    """
+    Represents the latest answer of a user, maintained from the answers table.
+
+    Attributes:
+        id_usuario (int): The unique identifier of the user.
+        id_resposta (int): The unique identifier of the latest answer of the user.
+        dominancia (float): The dominance score.
+        influencia (float): The influence score.
+        estabilidade (float): The stability score.
+        conformidade (float): The conformity score.
+        respondido_em (DateTime): The date and time the answer was given.
+        atualizado_em (DateTime): The timestamp of the last update of the profile.
+    """
+
+    __tablename__ = "perfil_atual"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["id_usuario"],
+            ["usuarios.id_usuario"],
+            ondelete="CASCADE",
+            name="fk_perfil_atual_usuarios",
+        ),
+        ForeignKeyConstraint(
+            ["id_resposta"],
+            ["respostas.id_resposta"],
+            ondelete="CASCADE",
+            name="fk_perfil_atual_respostas",
+        ),
+    )
+
+    id_usuario = Column(Integer, primary_key=True, autoincrement=False, nullable=False)
+    id_resposta = Column(Integer, nullable=False)
+    dominancia = Column(Float, nullable=False)
+    influencia = Column(Float, nullable=False)
+    estabilidade = Column(Float, nullable=False)
+    conformidade = Column(Float, nullable=False)
+    respondido_em = Column(DateTime, nullable=False)
+    atualizado_em = Column(
+        DateTime,
+        nullable=False,
+        server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+    )
@@ -0,0 +1,35 @@
+"""
+Module: revoked_tokens.py
+
+This module contains the domain model of the revoked tokens.
+
+Classes:
+    TokensRevogados (Base): Represents a token revoked before its expiration.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy import Column, DateTime, Integer, String, text
+from personavix.src.database.database import Base
+
+
+class TokensRevogados(Base):  # pylint: disable=too-few-public-methods
+    """
+    Represents a token revoked before its expiration.
+
+    Rows are only needed until the token expires, and are deleted afterwards.
+
+    Attributes:
+        jti (str): The unique identifier of the token.
+        id_usuario (int): The unique identifier of the user of the token.
+        expira_em (DateTime): The expiration of the token, in UTC.
+        revogado_em (DateTime): The timestamp of the revocation.
+    """
+
+    __tablename__ = "tokens_revogados"
+
+    jti = Column(String(32), primary_key=True, nullable=False)
+    id_usuario = Column(Integer)
+    expira_em = Column(DateTime, nullable=False, index=True)
+    revogado_em = Column(
+        DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP"), index=True
+    )
@@ -0,0 +1,42 @@
+"""
+Module: token_versions.py
+
+This module contains the domain model of the version of the tokens of each user.
+
+Classes:
+    VersoesToken (Base): Represents the current version of the tokens of a user.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Integer, text
+from personavix.src.database.database import Base
+
+
+class VersoesToken(Base):  # pylint: disable=too-few-public-methods
+    """
+    Represents the current version of the tokens of a user.
+
+    Tokens carry the version of their user when they are issued, and are revoked by
+    incrementing it. Users without a row are at version 0.
+
+    Attributes:
+        id_usuario (int): The unique identifier of the user.
+        versao (int): The current version of the tokens of the user.
+        atualizado_em (DateTime): The timestamp of the last increment, set by the API.
+    """
+
+    __tablename__ = "versoes_token"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["id_usuario"],
+            ["usuarios.id_usuario"],
+            ondelete="CASCADE",
+            name="fk_versoes_token_usuarios",
+        ),
+    )
+
+    id_usuario = Column(Integer, primary_key=True, autoincrement=False, nullable=False)
+    versao = Column(Integer, nullable=False, server_default=text("'0'"))
+    atualizado_em = Column(
+        DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP"), index=True
+    )
@@ -8,7 +8,15 @@ Classes:
 """
 
 # pylint: disable=import-error, duplicate-code
-from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Integer, String, text
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKeyConstraint,
+    Integer,
+    String,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.mysql import TINYINT
 from personavix.src.database.database import Base
@@ -38,22 +46,21 @@ class LinksAcessoUnico(Base):  # pylint: disable=too-few-public-methods
             name="fk_links_acesso_unico_respostas",
             ondelete="CASCADE",
         ),
+        UniqueConstraint("id_resposta", name="id_resposta_UNIQUE"),
     )
 
     id_sessao = Column(
         Integer, primary_key=True, autoincrement=True, nullable=False, index=True
     )
     id_usuario = Column(Integer, nullable=False)
-    link = Column(String(255), nullable=False)
+    link = Column(String(255), nullable=False, unique=True)
     senha_hash = Column(String(60))
     respondido = Column(TINYINT, nullable=False, server_default=text("'0'"))
     id_resposta = Column(Integer)
     criado_em = Column(
         DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP")
     )
-    respondido_em = Column(
-        DateTime,
-        nullable=False,
-    )
+    respondido_em = Column(DateTime)
+    expirado_em = Column(DateTime)
 
     usuarios_ = relationship("Usuarios", back_populates="links_acesso_unico")
@@ -47,6 +47,7 @@ class Usuarios(Base):  # pylint: disable=too-few-public-methods
         DateTime,
         nullable=False,
         server_default=text("CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+        index=True,
     )
 
     links_acesso_unico = relationship("LinksAcessoUnico", back_populates="usuarios_")
@@ -8,13 +8,17 @@ Classes:
     AnswersCreate (AnswerBase): Represents the schema for creating an answer.
     Answers (AnswerBase): Represents the schema for an answer.
     AnswersWithUser (Answer): Represents the schema for an answer with user details.
+    AnswerReceipt (BaseModel): Represents the receipt of a queued answer.
+    TimeseriesBucket (BaseModel): Represents the number of answers of a period.
+    AnswersTimeseries (BaseModel): Represents the number of answers over time.
 """
 
 # pylint: disable=import-error
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, confloat, conint, Field
 from pydantic.types import constr
+from personavix.src.models.schemas.enums import AgrupamentoEnum, GranularidadeEnum
 from personavix.src.models.schemas.users import User
 
 
@@ -111,3 +115,52 @@ class AnswersWithUser(Answer):  # pylint: disable=too-few-public-methods
 
         orm_mode = True
         allow_population_by_field_name = True
+
+
+class AnswerReceipt(BaseModel):  # pylint: disable=too-few-public-methods
+    """Schema for the receipt of an answer queued for ingestion.
+
+    Attributes:
+        receipt (str): The unique identifier of the queued answer.
+        id_usuario (int): The unique identifier of the user.
+        id_sessao (int): The unique identifier of the session.
+        queued_at (datetime): The date and time the answer was queued.
+    """
+
+    receipt: constr(min_length=36, max_length=36)
+    id_usuario: conint(ge=1)
+    id_sessao: Optional[conint(ge=1)]
+    queued_at: datetime
+
+
+class TimeseriesBucket(BaseModel):  # pylint: disable=too-few-public-methods
+    """Schema for the number of answers of a period.
+
+    Attributes:
+        inicio (date): The first day of the period.
+        total (int): The number of answers.
+        grupos (dict[str, int]): The number of answers by setor or motivo, when the
+        time series is grouped.
+    """
+
+    inicio: date
+    total: conint(ge=0)
+    grupos: Optional[dict[str, int]] = None
+
+
+class AnswersTimeseries(BaseModel):  # pylint: disable=too-few-public-methods
+    """Schema for the number of answers over time.
+
+    Attributes:
+        inicio (date): The first day of the time series.
+        fim (date): The last day of the time series.
+        granularidade (GranularidadeEnum): The size of the buckets.
+        agrupamento (AgrupamentoEnum): The grouping of the buckets, if any.
+        buckets (list[TimeseriesBucket]): One bucket per period, empty ones included.
+    """
+
+    inicio: date
+    fim: date
+    granularidade: GranularidadeEnum
+    agrupamento: Optional[AgrupamentoEnum] = None
+    buckets: list[TimeseriesBucket]
@@ -0,0 +1,47 @@
+"""
+Module: current_profiles.py
+
+This module contains the schemas for the latest DISC profile of each user.
+
+Classes:
+    CurrentProfile (BaseModel): Represents the latest answer of a user.
+"""
+
+# pylint: disable=import-error, too-few-public-methods, duplicate-code
+from datetime import datetime
+from pydantic import BaseModel, confloat, conint
+
+
+class CurrentProfile(BaseModel):
+    """
+    Schema for the latest DISC profile of a user.
+
+    Attributes:
+        id_usuario (int): The unique identifier of the user.
+        id_resposta (int): The unique identifier of the latest answer of the user.
+        dominancia (float): The dominance score.
+        influencia (float): The influence score.
+        estabilidade (float): The stability score.
+        conformidade (float): The conformity score.
+        respondido_em (datetime): The date and time the answer was given.
+    """
+
+    id_usuario: conint(ge=1)
+    id_resposta: conint(ge=1)
+    dominancia: confloat(ge=0, le=100)
+    influencia: confloat(ge=0, le=100)
+    estabilidade: confloat(ge=0, le=100)
+    conformidade: confloat(ge=0, le=100)
+    respondido_em: datetime
+
+    class Config:  # pylint: disable=too-few-public-methods
+        """
+        Configuration class for Pydantic models.
+
+        This class provides configuration options for Pydantic models, such as enabling ORM mode.
+
+        Attributes:
+            orm_mode (bool): Flag indicating whether ORM mode is enabled for the model.
+        """
+
+        orm_mode = True
@@ -0,0 +1,62 @@
+"""
+Module: dashboard.py
+
+This module contains the schemas for the dashboard of the admin landing page.
+
+Classes:
+    LinkStats (BaseModel): Represents the number of unique access links by status.
+    UsersByPermission (BaseModel): Represents the number of users of a permission level.
+    Dashboard (BaseModel): Represents the dashboard of the admin landing page.
+"""
+
+# pylint: disable=import-error, too-few-public-methods
+from datetime import datetime
+from pydantic import BaseModel, conint
+from personavix.src.models.schemas.answers import AnswersWithUser
+
+
+class LinkStats(BaseModel):
+    """
+    Schema for the number of unique access links by status.
+
+    Attributes:
+        total (int): The number of links.
+        respondidos (int): The number of answered links.
+        pendentes (int): The number of links still waiting for an answer.
+        expirados (int): The number of links expired without an answer.
+    """
+
+    total: conint(ge=0)
+    respondidos: conint(ge=0)
+    pendentes: conint(ge=0)
+    expirados: conint(ge=0)
+
+
+class UsersByPermission(BaseModel):
+    """
+    Schema for the number of users of a permission level.
+
+    Attributes:
+        permissao (int): The permission level.
+        total (int): The number of users.
+    """
+
+    permissao: int
+    total: conint(ge=0)
+
+
+class Dashboard(BaseModel):
+    """
+    Schema for the dashboard of the admin landing page.
+
+    Attributes:
+        links (LinkStats): The number of unique access links by status.
+        usuarios (list[UsersByPermission]): The number of users by permission level.
+        ultimas_respostas (list[AnswersWithUser]): The latest answers, newest first.
+        gerado_em (datetime): The date and time the dashboard was computed.
+    """
+
+    links: LinkStats
+    usuarios: list[UsersByPermission]
+    ultimas_respostas: list[AnswersWithUser]
+    gerado_em: datetime
@@ -5,6 +5,8 @@ This module contains the enum classes
 
 Classes:
     FatoresDiscEnum (Enum): The possible disc factors.
+    GranularidadeEnum (Enum): The possible sizes of a time series bucket.
+    AgrupamentoEnum (Enum): The possible groupings of a time series.
 """
 
 from enum import Enum
@@ -25,3 +27,31 @@ class FatoresDiscEnum(str, Enum):
     INFLUENCIA = "Influência"
     ESTABILIDADE = "Estabilidade"
     CONFORMIDADE = "Conformidade"
+
+
+class GranularidadeEnum(str, Enum):
+    """
+    This class defines the possible sizes of a time series bucket.
+
+    Attributes:
+        DIA (str): One bucket per day.
+        SEMANA (str): One bucket per week, starting on Monday.
+        MES (str): One bucket per month.
+    """
+
+    DIA = "day"
+    SEMANA = "week"
+    MES = "month"
+
+
+class AgrupamentoEnum(str, Enum):
+    """
+    This class defines the possible groupings of a time series.
+
+    Attributes:
+        SETOR (str): Group the answers by the setor of the users.
+        MOTIVO (str): Group the answers by their motivo.
+    """
+
+    SETOR = "setor"
+    MOTIVO = "motivo"
@@ -75,6 +75,7 @@ class UniqueAccessLink(UniqueAccessLinkBase):
         respondido (int): The date the link was answered.
         criado_em (datetime): The creation date of the link.
         respondido_em (Optional[datetime]): The date the link was answered.
+        expirado_em (Optional[datetime]): The date the link expired.
     """
 
     id_sessao: conint(ge=1)
@@ -83,6 +84,7 @@ class UniqueAccessLink(UniqueAccessLinkBase):
     respondido: conint(ge=0, le=1)
     criado_em: datetime
     respondido_em: Optional[datetime]
+    expirado_em: Optional[datetime] = None
 
     class Config:  # pylint: disable=too-few-public-methods
         """
@@ -143,7 +145,7 @@ class LoginResponse(BaseModel):
     """
 
     session_datas: UniqueAccessLinkWithUser = Field(..., alias="session_datas")
-    access_token: constr(min_length=1, max_length=255)
+    access_token: constr(min_length=1, max_length=1024)
 
     class Config:
         """Configuration class for Pydantic models.
@@ -10,6 +10,7 @@ Classes:
     UserLogin (BaseModel): Represents the schema for logging in a user.
     UserUpdate (BaseModel): Represents the schema for updating a user.
     LoginResponse (BaseModel): Represents the schema for the login response.
+    TokenRevocation (BaseModel): Represents the schema for revoking a token.
 """
 
 # pylint: disable=import-error, too-few-public-methods
@@ -128,7 +129,7 @@ class LoginResponse(BaseModel):
     """
 
     user_datas: User = Field(..., alias="user_datas")
-    access_token: constr(min_length=1, max_length=255)
+    access_token: constr(min_length=1, max_length=1024)
 
     class Config:
         """Configuration class for Pydantic models.
@@ -143,3 +144,14 @@ class LoginResponse(BaseModel):
 
         orm_mode = True
         allow_population_by_field_name = True
+
+
+class TokenRevocation(BaseModel):
+    """
+    Schema for revoking a token.
+
+    Attributes:
+        access_token (str): The revoked access token.
+    """
+
+    access_token: constr(min_length=1, max_length=1024)
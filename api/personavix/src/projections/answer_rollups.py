@@ -0,0 +1,249 @@
+"""
+Module: answer_rollups.py
+
+This module maintains the respostas_diarias rollup: the number of answers of each day,
+setor and motivo.
+
+Answers are added to the rollup in the same transaction that inserts them, with an
+upsert that increments the count of their bucket. Rebuilding replaces the rollup one
+window of days at a time from the respostas table, using the current setor of the
+users, so the API can keep running while it rebuilds.
+
+Usage:
+    python -m personavix.src.projections.answer_rollups --days 31
+
+Functions:
+    add_answers_to_rollups: Count answer rows in the rollup.
+    bucket_start: Get the first day of the bucket of a day.
+    read_answers_timeseries: Read the number of answers per bucket from the rollup.
+    rebuild_answer_rollups: Rebuild the whole rollup in windows of days.
+    main: Command line entry point to rebuild the rollup.
+"""
+
+# pylint: disable=import-error
+import argparse
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.engine import Engine
+from personavix.src.database.database import engine, get_dialect_name
+from personavix.src.models.domain.answer_rollups import RespostasDiarias
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.models.schemas.enums import AgrupamentoEnum, GranularidadeEnum
+from personavix.logger import setup_logger
+
+
+def add_answers_to_rollups(executor, rows: list[dict]) -> None:
+    """
+    Count answer rows in the rollup.
+
+    Args:
+        executor: The ORM session or the core connection of the transaction.
+        rows: The answers, with at least id_usuario, motivo and respondido_em.
+    """
+    if not rows:
+        return
+
+    sectors = dict(
+        executor.execute(
+            select(Usuarios.id_usuario, Usuarios.setor).where(
+                Usuarios.id_usuario.in_({row["id_usuario"] for row in rows})
+            )
+        ).all()
+    )
+    buckets = Counter(
+        (row["respondido_em"].date(), sectors.get(row["id_usuario"]) or "", row["motivo"])
+        for row in rows
+    )
+    values = [
+        {"dia": day, "setor": sector, "motivo": reason, "total": total}
+        for (day, sector, reason), total in buckets.items()
+    ]
+
+    if get_dialect_name(executor) == "mysql":
+        statement = mysql.insert(RespostasDiarias).values(values)
+        statement = statement.on_duplicate_key_update(
+            total=RespostasDiarias.total + statement.inserted.total
+        )
+    else:
+        statement = sqlite.insert(RespostasDiarias).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                RespostasDiarias.dia,
+                RespostasDiarias.setor,
+                RespostasDiarias.motivo,
+            ],
+            set_={"total": RespostasDiarias.total + statement.excluded.total},
+        )
+
+    executor.execute(statement)
+
+
+def bucket_start(day: date, granularity: GranularidadeEnum) -> date:
+    """
+    Get the first day of the bucket of a day.
+
+    Args:
+        day: The day.
+        granularity: The size of the buckets.
+
+    Returns:
+        date: The day itself, the Monday of its week or the first day of its month.
+    """
+    if granularity == GranularidadeEnum.SEMANA:
+        return day - timedelta(days=day.weekday())
+    if granularity == GranularidadeEnum.MES:
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start: date, granularity: GranularidadeEnum) -> date:
+    """
+    Get the first day of the bucket following a bucket.
+
+    Args:
+        start: The first day of the bucket.
+        granularity: The size of the buckets.
+
+    Returns:
+        date: The first day of the next bucket.
+    """
+    if granularity == GranularidadeEnum.SEMANA:
+        return start + timedelta(weeks=1)
+    if granularity == GranularidadeEnum.MES:
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def read_answers_timeseries(
+    executor, start: date, end: date, granularity: GranularidadeEnum, group_by=None
+) -> list[dict]:
+    """
+    Read the number of answers per bucket from the rollup.
+
+    Only the rollup is read, at most one row per day and group of the range.
+
+    Args:
+        executor: The ORM session or the core connection.
+        start: The first day of the range.
+        end: The last day of the range.
+        granularity: The size of the buckets.
+        group_by (AgrupamentoEnum): The grouping of the buckets, if any.
+
+    Returns:
+        list[dict]: One bucket per period of the range, empty ones included, with
+        inicio, total and, when grouped, grupos.
+    """
+    columns = [RespostasDiarias.dia]
+    if group_by == AgrupamentoEnum.SETOR:
+        columns.append(RespostasDiarias.setor)
+    elif group_by == AgrupamentoEnum.MOTIVO:
+        columns.append(RespostasDiarias.motivo)
+
+    buckets = {}
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets[current] = {"inicio": current, "total": 0}
+        if group_by:
+            buckets[current]["grupos"] = {}
+        current = _next_bucket(current, granularity)
+
+    for row in executor.execute(
+        select(*columns, func.sum(RespostasDiarias.total))
+        .where(RespostasDiarias.dia >= start, RespostasDiarias.dia <= end)
+        .group_by(*columns)
+    ):
+        bucket = buckets[bucket_start(row[0], granularity)]
+        bucket["total"] += row[-1]
+        if group_by:
+            bucket["grupos"][row[1]] = bucket["grupos"].get(row[1], 0) + row[-1]
+
+    return list(buckets.values())
+
+
+def rebuild_answer_rollups(bind: Engine, days: int = 31) -> int:
+    """
+    Rebuild the whole rollup in windows of days, one short transaction each.
+
+    Args:
+        bind: The engine of the database.
+        days: The number of days per transaction.
+
+    Returns:
+        int: The number of buckets written.
+    """
+    with bind.connect() as connection:
+        first_answer, last_answer = connection.execute(
+            select(func.min(Respostas.respondido_em), func.max(Respostas.respondido_em))
+        ).one()
+
+    with bind.begin() as connection:
+        statement = delete(RespostasDiarias)
+        if first_answer is not None:
+            statement = statement.where(
+                (RespostasDiarias.dia < first_answer.date())
+                | (RespostasDiarias.dia > last_answer.date())
+            )
+        connection.execute(statement)
+
+    if first_answer is None:
+        return 0
+
+    day = func.date(Respostas.respondido_em)
+    sector = func.coalesce(Usuarios.setor, "")  # pylint: disable=assignment-from-no-return
+    total = func.count()  # pylint: disable=not-callable
+    written = 0
+    window_start = datetime.combine(first_answer.date(), datetime.min.time())
+    while window_start <= last_answer:
+        window_end = window_start + timedelta(days=days)
+        with bind.begin() as connection:
+            # The window is replaced in one transaction, answers counted meanwhile
+            # wait for it and increment the rebuilt buckets.
+            connection.execute(
+                delete(RespostasDiarias).where(
+                    RespostasDiarias.dia >= window_start.date(),
+                    RespostasDiarias.dia < window_end.date(),
+                )
+            )
+            written += connection.execute(
+                insert(RespostasDiarias).from_select(
+                    ["dia", "setor", "motivo", "total"],
+                    select(day, sector, Respostas.motivo, total)
+                    .join(Usuarios, Usuarios.id_usuario == Respostas.id_usuario)
+                    .where(
+                        Respostas.respondido_em >= window_start,
+                        Respostas.respondido_em < window_end,
+                    )
+                    .group_by(day, sector, Respostas.motivo),
+                )
+            ).rowcount
+        window_start = window_end
+
+    return written
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point to rebuild the rollup.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Rebuild the respostas_diarias rollup.")
+    parser.add_argument("--days", type=int, default=31)
+    args = parser.parse_args(argv)
+
+    started_at = time.perf_counter()
+    written = rebuild_answer_rollups(engine, args.days)
+    setup_logger().info(
+        "Rebuilt %s daily answer buckets in %.1fs.",
+        written,
+        time.perf_counter() - started_at,
+    )
+
+
+if __name__ == "__main__":
+    main()
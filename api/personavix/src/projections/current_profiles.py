@@ -0,0 +1,162 @@
+"""
+Module: current_profiles.py
+
+This module maintains the perfil_atual projection: the latest answer of each user.
+
+The latest answer is the one with the highest id_resposta, that is, the last one
+recorded. Profiles are upserted in the same transaction that inserts the answers, and
+an upsert never replaces a profile with an older answer, so concurrent writers and
+rebuilds can run in any order.
+
+Usage:
+    python -m personavix.src.projections.current_profiles --batch-size 1000
+
+Functions:
+    upsert_current_profiles: Upsert profiles from answer rows.
+    refresh_current_profiles: Upsert the profiles of users from their latest answers.
+    rebuild_current_profiles: Rebuild the whole projection in batches of users.
+    main: Command line entry point to rebuild the projection.
+"""
+
+# pylint: disable=import-error
+import argparse
+import time
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.engine import Engine
+from personavix.src.database.database import engine, get_dialect_name
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.current_profiles import PerfilAtual
+from personavix.src.models.domain.users import Usuarios
+from personavix.logger import setup_logger
+
+PROFILE_COLUMNS = (
+    "id_usuario",
+    "dominancia",
+    "influencia",
+    "estabilidade",
+    "conformidade",
+    "respondido_em",
+    "id_resposta",
+)
+
+
+def upsert_current_profiles(executor, rows: list[dict]) -> None:
+    """
+    Upsert profiles from answer rows, keeping the answer with the highest id.
+
+    Args:
+        executor: The ORM session or the core connection of the transaction.
+        rows: The answers, with at least the PROFILE_COLUMNS keys.
+    """
+    if not rows:
+        return
+
+    values = [{column: row[column] for column in PROFILE_COLUMNS} for row in rows]
+
+    if get_dialect_name(executor) == "mysql":
+        statement = mysql.insert(PerfilAtual).values(values)
+        is_newer = statement.inserted.id_resposta > PerfilAtual.id_resposta
+        # MySQL applies the assignments in order, id_resposta is compared by the
+        # other columns so it is assigned last.
+        statement = statement.on_duplicate_key_update(
+            [
+                (
+                    column,
+                    func.if_(
+                        is_newer,
+                        statement.inserted[column],
+                        PerfilAtual.__table__.c[column],
+                    ),
+                )
+                for column in PROFILE_COLUMNS[1:]
+            ]
+        )
+    else:
+        statement = sqlite.insert(PerfilAtual).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[PerfilAtual.id_usuario],
+            set_={column: statement.excluded[column] for column in PROFILE_COLUMNS[1:]},
+            where=statement.excluded.id_resposta > PerfilAtual.id_resposta,
+        )
+
+    executor.execute(statement)
+
+
+def refresh_current_profiles(executor, id_users: list[int]) -> int:
+    """
+    Upsert the profiles of users from their latest answers.
+
+    Args:
+        executor: The ORM session or the core connection of the transaction.
+        id_users: The ids of the users.
+
+    Returns:
+        int: The number of users that have at least one answer.
+    """
+    if not id_users:
+        return 0
+
+    latest_answers = (
+        select(func.max(Respostas.id_resposta))
+        .where(Respostas.id_usuario.in_(id_users))
+        .group_by(Respostas.id_usuario)
+    )
+    rows = executor.execute(
+        select(*(Respostas.__table__.c[column] for column in PROFILE_COLUMNS)).where(
+            Respostas.id_resposta.in_(latest_answers)
+        )
+    ).mappings().all()
+
+    upsert_current_profiles(executor, rows)
+    return len(rows)
+
+
+def rebuild_current_profiles(bind: Engine, batch_size: int = 1000) -> int:
+    """
+    Rebuild the whole projection in batches of users, one short transaction each.
+
+    Args:
+        bind: The engine of the database.
+        batch_size: The number of users per transaction.
+
+    Returns:
+        int: The number of profiles written.
+    """
+    written = 0
+    last_id_user = 0
+    while True:
+        with bind.begin() as connection:
+            id_users = connection.execute(
+                select(Usuarios.id_usuario)
+                .where(Usuarios.id_usuario > last_id_user)
+                .order_by(Usuarios.id_usuario)
+                .limit(batch_size)
+            ).scalars().all()
+            if not id_users:
+                return written
+
+            written += refresh_current_profiles(connection, id_users)
+            last_id_user = id_users[-1]
+
+
+def main(argv: list[str] = None) -> None:
+    """
+    Command line entry point to rebuild the projection.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Rebuild the perfil_atual projection.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    started_at = time.perf_counter()
+    written = rebuild_current_profiles(engine, args.batch_size)
+    setup_logger().info(
+        "Rebuilt %s current profiles in %.1fs.", written, time.perf_counter() - started_at
+    )
+
+
+if __name__ == "__main__":
+    main()
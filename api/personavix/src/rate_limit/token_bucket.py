@@ -0,0 +1,212 @@
+"""
+Module: token_bucket.py
+
+This module contains the token buckets of the rate limiter.
+
+A bucket holds up to capacity tokens and is refilled at a constant rate. Each request
+takes a token and is rejected when the bucket is empty. Buckets live in the process
+by default, sharded so concurrent requests on different keys rarely wait for the same
+lock. When several workers must share their buckets, they are kept in Redis and
+updated by a Lua script, so each take is a single atomic round trip.
+
+Classes:
+    Rate: The capacity and refill rate of a bucket.
+    LocalTokenBuckets: Token buckets kept in the process.
+    RedisTokenBuckets: Token buckets shared through Redis.
+
+Functions:
+    parse_rate: Parse a rate like "20/minute".
+    get_token_buckets: Get the token buckets of the process.
+"""
+
+# pylint: disable=import-error
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+import redis
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+class Rate(NamedTuple):
+    """
+    The capacity and refill rate of a bucket.
+
+    Attributes:
+        capacity: The maximum number of tokens, the largest burst allowed.
+        refill: The tokens added per second.
+    """
+
+    capacity: int
+    refill: float
+
+
+def parse_rate(rate: str) -> Rate:
+    """
+    Parse a rate like "20/minute".
+
+    Args:
+        rate: The number of requests per second, minute, hour or day.
+
+    Returns:
+        Rate: A bucket holding that many tokens, refilled over the period.
+
+    Raises:
+        ValueError: Raised when the rate is malformed.
+    """
+    count, _, period = rate.partition("/")
+    if period.strip() not in PERIODS or int(count) <= 0:
+        raise ValueError(f"Invalid rate: {rate}")
+    return Rate(int(count), int(count) / PERIODS[period.strip()])
+
+
+def _retry_after(tokens: float, rate: Rate) -> float:
+    """
+    Get the seconds until a bucket holds a whole token again.
+
+    Args:
+        tokens: The tokens left in the bucket.
+        rate: The rate of the bucket.
+
+    Returns:
+        float: The seconds to wait, 0 when a token is available.
+    """
+    return max(0.0, (1 - tokens) / rate.refill)
+
+
+class LocalTokenBuckets:
+    """
+    Token buckets kept in the process.
+
+    Keys are spread over shards with a lock each. Every shard keeps its least
+    recently used buckets up to a bound; an evicted bucket comes back full, which is
+    what an idle bucket would have refilled to anyway.
+
+    Attributes:
+        max_keys: The maximum number of buckets kept.
+    """
+
+    def __init__(self, max_keys: int, shards: int = 16):
+        self.max_keys = max_keys
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+        self._max_keys_per_shard = max(1, max_keys // shards)
+
+    def take(self, key: str, rate: Rate) -> tuple[bool, float]:
+        """
+        Take a token from a bucket.
+
+        Args:
+            key: The key of the bucket.
+            rate: The rate of the bucket.
+
+        Returns:
+            tuple[bool, float]: Whether a token was taken, and the seconds until the
+            next token when it was not.
+        """
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            tokens, updated = buckets.pop(key, (rate.capacity, now))
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            buckets[key] = (tokens, now)
+            if len(buckets) > self._max_keys_per_shard:
+                buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else _retry_after(tokens, rate)
+
+    def clear(self) -> None:
+        """Remove every bucket."""
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class RedisTokenBuckets:
+    """
+    Token buckets shared through Redis.
+
+    When Redis cannot be reached, the buckets of the process are used instead, so an
+    outage of Redis loosens the limits but does not block logins.
+
+    Attributes:
+        fallback: The buckets used while Redis is unavailable.
+    """
+
+    def __init__(self, url: str, fallback: LocalTokenBuckets, prefix: str = "ratelimit:"):
+        self.fallback = fallback
+        self._prefix = prefix
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=0.25, socket_connect_timeout=0.25
+        )
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    def take(self, key: str, rate: Rate) -> tuple[bool, float]:
+        """
+        Take a token from a bucket.
+
+        Args:
+            key: The key of the bucket.
+            rate: The rate of the bucket.
+
+        Returns:
+            tuple[bool, float]: Whether a token was taken, and the seconds until the
+            next token when it was not.
+        """
+        try:
+            allowed, tokens = self._take(
+                keys=[self._prefix + key], args=[rate.capacity, rate.refill]
+            )
+        except redis.RedisError as e:
+            setup_logger().error("Rate limiter falling back to local buckets: %s", e)
+            return self.fallback.take(key, rate)
+        return bool(allowed), 0.0 if allowed else _retry_after(float(tokens), rate)
+
+    def clear(self) -> None:
+        """Remove the local fallback buckets."""
+        self.fallback.clear()
+
+
+_token_buckets = None
+_token_buckets_lock = threading.Lock()
+
+
+def get_token_buckets():
+    """
+    Get the token buckets of the process, creating them on first use.
+
+    Returns:
+        LocalTokenBuckets | RedisTokenBuckets: The Redis buckets when
+        RATE_LIMIT_BACKEND is "redis", the local buckets otherwise.
+    """
+    global _token_buckets  # pylint: disable=global-statement
+    with _token_buckets_lock:
+        if _token_buckets is None:
+            local = LocalTokenBuckets(settings.RATE_LIMIT_MAX_KEYS)
+            _token_buckets = local
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                _token_buckets = RedisTokenBuckets(settings.RATE_LIMIT_REDIS_URL, local)
+    return _token_buckets
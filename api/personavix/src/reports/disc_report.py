@@ -0,0 +1,194 @@
+"""
+Module: disc_report.py
+
+This module renders the DISC report of an answer as a standalone HTML document with
+an inline SVG radar chart, a factor breakdown and the characteristics of each factor.
+
+Rendering only depends on the standard library and on plain data, so it can run in a
+worker process of the report renderer.
+
+Constants:
+    REPORT_TEMPLATE_VERSION: Version of the template, part of the key of cached reports.
+
+Functions:
+    render_radar_chart: Render the radar chart of the four DISC scores.
+    render_disc_report: Render the DISC report of an answer.
+"""
+
+import math
+from html import escape
+
+# Bump whenever the output changes, so reports rendered by older templates are not
+# served from the cache.
+REPORT_TEMPLATE_VERSION = 1
+
+FACTORS = (
+    ("dominancia", "Dominância", "#d9534f"),
+    ("influencia", "Influência", "#f0ad4e"),
+    ("estabilidade", "Estabilidade", "#5cb85c"),
+    ("conformidade", "Conformidade", "#428bca"),
+)
+CHART_SIZE = 320
+CHART_RADIUS = 120
+CHART_RINGS = (25, 50, 75, 100)
+
+
+def _radar_point(index: int, score: float) -> tuple[float, float]:
+    """
+    Get the position of a score on the axis of a factor.
+
+    The axes start at the top and go clockwise.
+
+    Args:
+        index: The index of the factor.
+        score: The score, from 0 to 100.
+
+    Returns:
+        tuple[float, float]: The x and y coordinates.
+    """
+    angle = -math.pi / 2 + index * 2 * math.pi / len(FACTORS)
+    distance = CHART_RADIUS * score / 100
+    center = CHART_SIZE / 2
+    return center + distance * math.cos(angle), center + distance * math.sin(angle)
+
+
+def _polygon(scores: list[float]) -> str:
+    """
+    Format the points of a polygon with one vertex per factor.
+
+    Args:
+        scores: The score of each factor.
+
+    Returns:
+        str: The points attribute of the polygon.
+    """
+    points = [_radar_point(index, score) for index, score in enumerate(scores)]
+    return " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+
+
+def render_radar_chart(answer: dict) -> str:
+    """
+    Render the radar chart of the four DISC scores.
+
+    Args:
+        answer: The answer, with the four scores.
+
+    Returns:
+        str: The SVG element.
+    """
+    elements = [
+        f'<polygon points="{_polygon([ring] * len(FACTORS))}" class="ring"/>'
+        for ring in CHART_RINGS
+    ]
+    for index, (column, label, color) in enumerate(FACTORS):
+        x_axis, y_axis = _radar_point(index, 100)
+        x_label, y_label = _radar_point(index, 118)
+        elements.append(
+            f'<line x1="{CHART_SIZE / 2}" y1="{CHART_SIZE / 2}" '
+            f'x2="{x_axis:.1f}" y2="{y_axis:.1f}" class="axis"/>'
+        )
+        elements.append(
+            f'<text x="{x_label:.1f}" y="{y_label:.1f}" fill="{color}">'
+            f"{label} {answer[column]:.1f}%</text>"
+        )
+
+    scores = [answer[column] for column, _, _ in FACTORS]
+    elements.append(f'<polygon points="{_polygon(scores)}" class="scores"/>')
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{CHART_SIZE}" '
+        f'height="{CHART_SIZE}" viewBox="-40 -10 {CHART_SIZE + 80} {CHART_SIZE + 20}" '
+        f'role="img" aria-label="Gráfico DISC">{"".join(elements)}</svg>'
+    )
+
+
+def _render_breakdown(answer: dict) -> str:
+    """
+    Render the table of the four factors, highest score first.
+
+    Args:
+        answer: The answer, with the four scores.
+
+    Returns:
+        str: The table element.
+    """
+    rows = [
+        f"<tr><th>{label}</th>"
+        f'<td><div class="bar" style="width:{answer[column]:.1f}%;background:{color}">'
+        f"</div></td><td>{answer[column]:.1f}%</td></tr>"
+        for column, label, color in sorted(
+            FACTORS, key=lambda factor: answer[factor[0]], reverse=True
+        )
+    ]
+    return f'<table class="breakdown">{"".join(rows)}</table>'
+
+
+def _render_characteristics(characteristics: dict[str, list[str]]) -> str:
+    """
+    Render the characteristics of each factor.
+
+    Args:
+        characteristics: The characteristics by factor label.
+
+    Returns:
+        str: The section elements.
+    """
+    sections = []
+    for _, label, color in FACTORS:
+        items = "".join(
+            f"<li>{escape(characteristic)}</li>"
+            for characteristic in characteristics.get(label, [])
+        )
+        sections.append(
+            f'<section><h3 style="color:{color}">{label}</h3><ul>{items}</ul></section>'
+        )
+    return "".join(sections)
+
+
+def render_disc_report(answer: dict, characteristics: dict[str, list[str]]) -> bytes:
+    """
+    Render the DISC report of an answer.
+
+    Args:
+        answer: The answer, with its id, scores, respondido_em and the nome of the user.
+        characteristics: The characteristics of the questionary by factor label.
+
+    Returns:
+        bytes: The UTF-8 encoded HTML document.
+    """
+    main_factor = max(FACTORS, key=lambda factor: answer[factor[0]])
+    name = escape(answer.get("nome") or f"Usuário {answer['id_usuario']}")
+
+    document = f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Relatório DISC - {name}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 60em; color: #222; }}
+.ring {{ fill: none; stroke: #ddd; }}
+.axis {{ stroke: #bbb; }}
+.scores {{ fill: rgba(66, 139, 202, .35); stroke: #428bca; stroke-width: 2; }}
+text {{ font-size: 12px; text-anchor: middle; }}
+.breakdown {{ width: 100%; border-collapse: collapse; }}
+.breakdown td, .breakdown th {{ padding: .3em; text-align: left; }}
+.breakdown td:nth-child(2) {{ width: 70%; }}
+.bar {{ height: 1em; }}
+.characteristics {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+.characteristics section {{ flex: 1 1 12em; }}
+</style>
+</head>
+<body>
+<h1>Relatório DISC</h1>
+<p><strong>{name}</strong> - resposta {answer['id_resposta']}, respondida em
+{escape(str(answer['respondido_em']))}. Motivo: {escape(answer['motivo'])}.</p>
+<p>Fator predominante: <strong style="color:{main_factor[2]}">{main_factor[1]}</strong></p>
+{render_radar_chart(answer)}
+<h2>Fatores</h2>
+{_render_breakdown(answer)}
+<h2>Características</h2>
+<div class="characteristics">{_render_characteristics(characteristics)}</div>
+</body>
+</html>
+"""
+    return document.encode("utf-8")
@@ -0,0 +1,194 @@
+"""
+Module: renderer.py
+
+This module renders DISC reports in a pool of worker processes.
+
+Rendering is CPU-bound, so it runs outside the API process and the request thread
+only waits for the result. Concurrent requests for the same report share one
+rendering, and rendered reports are kept in a size-bounded disk cache keyed by the id
+of the answer, a digest of the rendered answer and the version of the template. A
+report is never served for an answer rendered with other data, like the former name
+of its user, on any host sharing the cache or not.
+
+Classes:
+    ReportRenderer: Renders reports in a process pool, deduplicated and cached.
+
+Functions:
+    get_report_renderer: Get the renderer of the process.
+    shutdown_report_renderer: Stop the worker processes of the renderer.
+"""
+
+# pylint: disable=import-error
+import hashlib
+import json
+import multiprocessing
+import threading
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from prometheus_client import Counter
+from personavix.src.cache.disk_cache import DiskCache
+from personavix.src.reports.disc_report import (
+    REPORT_TEMPLATE_VERSION,
+    render_disc_report,
+)
+from personavix.src.settings import settings
+from personavix.logger import setup_logger
+
+REPORTS = Counter(
+    "personavix_reports_total",
+    "DISC reports requested, by how they were served.",
+    ["result"],
+)
+
+
+class ReportRenderer:
+    """
+    Renders reports in a process pool, deduplicated and cached.
+
+    Attributes:
+        cache: The disk cache of rendered reports.
+        workers: The number of worker processes.
+        timeout: The seconds a request waits for a rendering.
+    """
+
+    def __init__(self, cache: DiskCache, workers: int, timeout: float):
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor = None
+        self._pending: dict[str, Future] = {}
+
+    @staticmethod
+    def key(answer: dict) -> str:
+        """
+        Get the cache key of the report of an answer.
+
+        Args:
+            answer: The answer, as expected by render_disc_report.
+
+        Returns:
+            str: The key, also used as the file name of the cached report.
+        """
+        digest = hashlib.sha256(
+            json.dumps(answer, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+        return f"disc-{answer['id_resposta']}-{digest}-v{REPORT_TEMPLATE_VERSION}.html"
+
+    def get_cached(self, answer: dict) -> bytes:
+        """
+        Get a rendered report from the cache.
+
+        Args:
+            answer: The answer, as expected by render_disc_report.
+
+        Returns:
+            bytes: The report, or None when it was not rendered yet.
+        """
+        report = self.cache.get(self.key(answer))
+        if report is not None:
+            REPORTS.labels("cached").inc()
+        return report
+
+    def render(self, answer: dict, characteristics: dict[str, list[str]]) -> bytes:
+        """
+        Render a report, or wait for the rendering already running for the answer.
+
+        Args:
+            answer: The answer, as expected by render_disc_report.
+            characteristics: The characteristics by factor label.
+
+        Returns:
+            bytes: The report.
+        """
+        key = self.key(answer)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                # The rendering may have finished since the caller missed the cache.
+                report = self.cache.get(key)
+                if report is not None:
+                    REPORTS.labels("cached").inc()
+                    return report
+
+                REPORTS.labels("rendered").inc()
+                if self._executor is None:
+                    # Spawned workers do not inherit the threads, locks and database
+                    # connections of the API process.
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                future = self._executor.submit(render_disc_report, answer, characteristics)
+                self._pending[key] = future
+                is_new = True
+            else:
+                REPORTS.labels("deduplicated").inc()
+                is_new = False
+
+        if is_new:
+            # Registered outside the lock, a rendering already finished runs the
+            # callback in this thread, and the callback takes the lock.
+            future.add_done_callback(lambda done: self._store(key, done))
+
+        return future.result(self.timeout)
+
+    def _store(self, key: str, future: Future) -> None:
+        """
+        Cache a finished rendering and forget it as pending.
+
+        Args:
+            key: The cache key of the report.
+            future: The finished rendering.
+        """
+        try:
+            if not future.cancelled() and future.exception() is None:
+                self.cache.set(key, future.result())
+            elif not future.cancelled():
+                setup_logger().error(
+                    "Error rendering report %s: %s", key, future.exception()
+                )
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+                # A worker that died breaks the whole pool, the next rendering
+                # starts a new one.
+                if not future.cancelled() and isinstance(
+                    future.exception(), BrokenExecutor
+                ):
+                    self._executor = None
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, waiting for the running renderings."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_report_renderer: ReportRenderer = None
+_report_renderer_lock = threading.Lock()
+
+
+def get_report_renderer() -> ReportRenderer:
+    """
+    Get the renderer of the process, creating it on first use.
+
+    The worker processes are only started by the first rendering.
+
+    Returns:
+        ReportRenderer: The report renderer.
+    """
+    global _report_renderer  # pylint: disable=global-statement
+    with _report_renderer_lock:
+        if _report_renderer is None:
+            _report_renderer = ReportRenderer(
+                DiskCache(settings.REPORTS_CACHE_DIR, settings.REPORTS_CACHE_MAX_BYTES),
+                settings.REPORTS_WORKERS,
+                settings.REPORTS_RENDER_TIMEOUT,
+            )
+    return _report_renderer
+
+
+def shutdown_report_renderer() -> None:
+    """Stop the worker processes of the renderer, if it was used."""
+    if _report_renderer is not None:
+        _report_renderer.shutdown()
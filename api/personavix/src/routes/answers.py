@@ -5,27 +5,65 @@ This module contains the routes for handling answers-related tasks.
 
 Routes:
     /answers:
-        GET: Retrieve all answers from the database.
+        GET: Retrieve all answers, or the answers with the given ids, from the database.
         POST: Register a new test response in the database.
+    /answers/timeseries:
+        GET: Retrieve the number of answers per day, week or month.
     /answers/{id_answer}:
         GET: Retrieve a specific answer from the database.
+    /answers/{id_answer}/report:
+        GET: Download the DISC report of an answer.
 """
 
 # pylint: disable=import-error
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from concurrent.futures import TimeoutError as RenderTimeoutError
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from personavix.src.database.database import get_db
+from personavix.src.database.database import get_db, get_read_db
+from personavix.src.middleware.query_budget import query_budget
 from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
 from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.models.domain.disc_characteristics import CaracteristicasDisc
 from personavix.src.models.schemas import answers
+from personavix.src.models.schemas.enums import AgrupamentoEnum, GranularidadeEnum
 from personavix.logger import setup_logger
 from personavix.src.dependencies.decode_and_verify_token import (
     TokenData,
     decode_and_verify_token,
 )
 from personavix.src.dependencies import guard_clauses
+from personavix.src.ingestion.answers_queue import get_answers_queue
+from personavix.src.cache.unique_access_links import invalidate_link_sessions
+from personavix.src.events.link_status import publish_link_status
+from personavix.src.cache.answers import cache_answer, etag_matches, get_cached_answer
+from personavix.src.dependencies.multi_get import (
+    IDS_DESCRIPTION,
+    missing_ids_headers,
+    order_by_ids,
+    parse_ids,
+)
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.dependencies.sparse_fields import (
+    FIELDS_DESCRIPTION,
+    load_options,
+    narrow_model,
+    parse_fields,
+)
+from personavix.src.projections import current_profiles
+from personavix.src.projections.answer_rollups import (
+    add_answers_to_rollups,
+    read_answers_timeseries,
+)
+from personavix.src.projections.current_profiles import upsert_current_profiles
+from personavix.src.reports.renderer import get_report_renderer
+from personavix.src.settings import settings
 
 
 router = APIRouter(prefix="/answers", tags=["Answers"])
@@ -34,38 +72,142 @@ router = APIRouter(prefix="/answers", tags=["Answers"])
 @router.get(
     "/",
     summary="Get all answers",
-    description="Retrieves all answers from the database.",
+    description="Retrieves all answers from the database, or with ids= the answers "
+    "with these ids, in a single query.",
     response_model=list[answers.AnswersWithUser],
 )
+@query_budget(1)
 def get_answers(
-    db: Session = Depends(get_db),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
+    ids: str = Query(None, description=IDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
     token_data: TokenData = Depends(decode_and_verify_token),
 ):
     """
-    Retrieve a list of answers.
+    Retrieve a list of answers, every one or the ones with the given ids.
+
+    Listing every answer is reserved to managers. Fetching answers by id needs the
+    permission of GET /answers/{id_answer}, checked once for the whole batch.
 
     Args:
-        db: Database session dependency. Defaults to Depends(get_db).
+        fields: Comma-separated fields to return, with a dot for the fields of the
+            user, like "id_resposta,dominancia,usuarios_.nome". Defaults to every field.
+        ids: Comma-separated ids of the answers to return. Defaults to every answer.
+        db: Database session dependency. Defaults to Depends(get_read_db).
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
-        List[Answer]: A list of answers.
+        List[AnswersWithUser]: A list of answers, with only the selected fields. With
+        ids, the answers in the order of their ids, and the ids of no answer in
+        X-Missing-Ids.
+    """
+    if ids is None:
+        guard_clauses.verify_permission_is_manager(
+            token_data.permission, token_data.access_flag
+        )
+    else:
+        if not token_data.is_unique_access_link:
+            guard_clauses.verify_permission_is_user(
+                token_data.permission, token_data.access_flag
+            )
+        id_answers = parse_ids(ids)
+    selection = parse_fields(fields, answers.AnswersWithUser)
+    headers = None
+
+    try:
+        query = db.query(Respostas).options(
+            *load_options(Respostas, selection, ("usuarios_",))
+        )
+        if ids is None:
+            setup_logger().info("Getting all answers in table Answers.")
+            found_answers: list[Respostas] = query.all()
+        else:
+            setup_logger().info("Getting %s answers in table Answers.", len(id_answers))
+            found_answers, missing = order_by_ids(
+                query.filter(Respostas.id_resposta.in_(id_answers)),
+                id_answers,
+                lambda answer: answer.id_resposta,
+            )
+            headers = missing_ids_headers(missing)
+        payload = serialize_response(
+            list[narrow_model(answers.AnswersWithUser, selection)], found_answers
+        )
+
+    except SQLAlchemyError as e:
+        setup_logger().error("Code:500 Message: %s", e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error getting answers"
+        ) from e
+
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/timeseries",
+    summary="Get the number of answers over time",
+    description="Retrieves the number of answers per day, week or month, optionally "
+    "grouped by setor or motivo, from the daily rollup of answers.",
+    response_model=answers.AnswersTimeseries,
+)
+@query_budget(1)
+def get_answers_timeseries(
+    start: date = Query(None, description="First day. Defaults to one year before end."),
+    end: date = Query(None, description="Last day. Defaults to today."),
+    granularity: GranularidadeEnum = GranularidadeEnum.DIA,
+    group_by: AgrupamentoEnum = None,
+    db: Session = Depends(get_read_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):  # pylint: disable=too-many-arguments
+    """
+    Retrieve the number of answers per day, week or month.
+
+    Args:
+        start: The first day of the time series. Defaults to one year before end.
+        end: The last day of the time series. Defaults to today.
+        granularity: The size of the buckets. Defaults to one day.
+        group_by: Group the buckets by setor or motivo. Defaults to no grouping.
+        db: Database session dependency. Defaults to Depends(get_read_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        AnswersTimeseries: One bucket per period of the range, empty ones included.
+
+    Raises:
+        HTTPException: Raised when the range is empty or longer than
+        TIMESERIES_MAX_DAYS (400).
     """
     guard_clauses.verify_permission_is_manager(
         token_data.permission, token_data.access_flag
     )
 
+    end = end or date.today()
+    start = start or end - timedelta(days=365)
+    if start > end or (end - start).days > settings.TIMESERIES_MAX_DAYS:
+        setup_logger().error("Code:400 Message: Invalid range %s to %s", start, end)
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"start must be before end and at most {settings.TIMESERIES_MAX_DAYS} "
+            "days apart",
+        )
+
     try:
-        setup_logger().info("Getting all answers in table Answers.")
-        all_answers: list[Respostas] = db.query(Respostas).all()
+        setup_logger().info("Getting answers time series in table RespostasDiarias.")
+        buckets = read_answers_timeseries(db, start, end, granularity, group_by)
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
         raise HTTPException(
-            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error getting answers"
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Error retrieving answers time series",
         ) from e
 
-    return all_answers
+    return {
+        "inicio": start,
+        "fim": end,
+        "granularidade": granularity,
+        "agrupamento": group_by,
+        "buckets": buckets,
+    }
 
 
 @router.get(
@@ -74,21 +216,27 @@ def get_answers(
     description="Retrieve a specific answer from the database.",
     response_model=answers.Answer,
 )
+@query_budget(1)
 def get_answer(
     id_answer: int,
-    db: Session = Depends(get_db),
+    if_none_match: str = Header(None),
+    db: Session = Depends(get_read_db),
     token_data: TokenData = Depends(decode_and_verify_token),
 ):
     """
     Retrieve a specific answer from the database.
 
+    Answers are immutable, so the serialized answer is cached and sent with a strong
+    ETag. Permissions are checked before the cache is read, on every request.
+
     Args:
         id_answer: The id of the answer to be retrieved.
-        db: Database session dependency. Defaults to Depends(get_db).
+        if_none_match: The ETag of the representation the client already has.
+        db: Database session dependency. Defaults to Depends(get_read_db).
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
-        Answer: The answer object.
+        Answer: The answer object, or 304 when the client has the current one.
 
     Raises:
         HTTPException: Raised when answer with specified id is not found (404).
@@ -98,19 +246,122 @@ def get_answer(
             token_data.permission, token_data.access_flag
         )
 
+    cached_answer = get_cached_answer(id_answer)
+
+    if cached_answer is None:
+        try:
+            setup_logger().info("Getting answer with id %s in table Answers", id_answer)
+            answer: Respostas = (
+                db.query(Respostas).filter(Respostas.id_resposta == id_answer).first()
+            )
+
+            if not answer:
+                setup_logger().error(
+                    "Code:404 Message: Answer with id %s not found", id_answer
+                )
+                raise HTTPException(
+                    status_code=HTTPStatus.NOT_FOUND, detail="Answer not found"
+                )
+
+        except SQLAlchemyError as e:
+            setup_logger().error("Code:500 Message: %s", e)
+            raise HTTPException(
+                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                detail="Error retrieving answer",
+            ) from e
+
+        cached_answer = cache_answer(
+            id_answer, serialize_response(answers.Answer, answer)
+        )
+
+    etag, payload = cached_answer
+    # Browsers keep the answer for ANSWER_MAX_AGE. Shared caches must revalidate
+    # (s-maxage=0), so the permissions of each user are still checked and the
+    # repeat view costs a 304 without a body.
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"max-age={settings.ANSWER_MAX_AGE}, s-maxage=0, "
+        "must-revalidate, immutable",
+        "Vary": "Authorization",
+    }
+
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/{id_answer}/report",
+    summary="Download the DISC report of an answer",
+    description="Renders the DISC report of an answer as an HTML document with the "
+    "radar chart, the factor breakdown and the characteristics of each factor.",
+    response_class=Response,
+    responses={HTTPStatus.OK.value: {"content": {"text/html": {}}}},
+)
+@query_budget(2)
+def get_answer_report(
+    id_answer: int,
+    db: Session = Depends(get_read_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):
+    """
+    Download the DISC report of an answer.
+
+    Reports are rendered in worker processes and cached on disk for the data they
+    show, so the characteristics are only read when the report was not rendered yet.
+
+    Args:
+        id_answer: The id of the answer.
+        db: Database session dependency. Defaults to Depends(get_read_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        Response: The HTML report, as an attachment.
+
+    Raises:
+        HTTPException: Raised when answer with specified id is not found (404), or
+        when the report could not be rendered in time (503).
+    """
+    guard_clauses.verify_permission_is_manager(
+        token_data.permission, token_data.access_flag
+    )
+
+    renderer = get_report_renderer()
+
     try:
-        setup_logger().info("Getting answer with id %s in table Answers", id_answer)
+        setup_logger().info("Getting answer with id %s for its report", id_answer)
         answer: Respostas = (
-            db.query(Respostas).filter(Respostas.id_resposta == id_answer).first()
+            db.query(Respostas)
+            .options(joinedload(Respostas.usuarios_))
+            .filter(Respostas.id_resposta == id_answer)
+            .first()
         )
 
         if not answer:
-            setup_logger().error(
-                "Code:404 Message: Answer with id %s not found", id_answer
-            )
-            raise HTTPException(
-                status_code=HTTPStatus.NOT_FOUND, detail="Answer not found"
-            )
+            setup_logger().error("Code:404 Message: Answer with id %s not found", id_answer)
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Answer not found")
+
+        # The report is cached for the data it shows, a renamed user gets a new one.
+        report_answer = {
+            "id_resposta": answer.id_resposta,
+            "id_usuario": answer.id_usuario,
+            "dominancia": answer.dominancia,
+            "influencia": answer.influencia,
+            "estabilidade": answer.estabilidade,
+            "conformidade": answer.conformidade,
+            "motivo": answer.motivo,
+            "respondido_em": answer.respondido_em,
+            "nome": answer.usuarios_.nome,
+        }
+        report = renderer.get_cached(report_answer)
+
+        characteristics: dict[str, list[str]] = {}
+        if report is None:
+            for factor, characteristic in db.query(
+                CaracteristicasDisc.fator, CaracteristicasDisc.caracteristica
+            ).order_by(CaracteristicasDisc.id_caracteristica):
+                characteristics.setdefault(factor.value, []).append(characteristic)
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
@@ -119,14 +370,34 @@ def get_answer(
             detail="Error retrieving answer",
         ) from e
 
-    return answer
+    if report is None:
+        try:
+            report = renderer.render(report_answer, characteristics)
+        except RenderTimeoutError as e:
+            setup_logger().error("Code:503 Message: Report %s timed out", id_answer)
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail="Report is still being rendered, try again later",
+            ) from e
+
+    return Response(
+        content=report,
+        media_type="text/html; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="relatorio-disc-{id_answer}.html"',
+            "Cache-Control": "private, max-age=3600",
+        },
+    )
 
 
 @router.post(
     "/{id_user}",
     summary="Cadastre a new test response",
-    description="Cadastre a new test response in the database.",
+    description="Cadastre a new test response in the database. When the answers "
+    "ingestion queue is enabled, the response is queued and a receipt is returned "
+    "with status 202, once its user and unique access link are found.",
     response_model=answers.Answer,
+    responses={HTTPStatus.ACCEPTED.value: {"model": answers.AnswerReceipt}},
 )
 def cadastre_a_test_response(
     id_user: int,
@@ -144,16 +415,34 @@ def cadastre_a_test_response(
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
-        Answer: The registered answer.
+        Answer: The registered answer. When the unique access link of the session was
+        already answered, the original answer is returned and nothing is written.
+        AnswerReceipt: The receipt of the answer, when the ingestion queue is enabled.
+        The user and the link are checked before the answer is queued, and a retry
+        for a link already answered returns the original answer.
     """
     if not token_data.is_unique_access_link:
         guard_clauses.verify_permission_is_user(
             token_data.permission, token_data.access_flag
         )
 
+    if settings.ANSWERS_INGESTION_MODE == "queue":
+        answered = check_queued_answer(id_user, answer.id_sessao, db)
+        if answered is not None:
+            return answered
+        setup_logger().info("Queueing a new test response for ingestion.")
+        receipt = get_answers_queue().append(id_user, answer)
+        return JSONResponse(
+            status_code=HTTPStatus.ACCEPTED,
+            content=jsonable_encoder(answers.AnswerReceipt(**receipt)),
+        )
+
     try:
         setup_logger().info("Registering a new test response in table Answers.")
 
+        # The answer and the link are written in the same transaction, the UPDATE
+        # only matches a link that was not answered yet, so a retried submission
+        # can not answer the same link twice.
         new_answer = Respostas(
             id_usuario=id_user,
             dominancia=answer.dominancia,
@@ -161,23 +450,76 @@ def cadastre_a_test_response(
             estabilidade=answer.estabilidade,
             conformidade=answer.conformidade,
             motivo=answer.motivo,
+            id_sessao=answer.id_sessao,
+            respondido_em=datetime.now().replace(microsecond=0),
         )
         db.add(new_answer)
+        try:
+            db.flush()
+        except IntegrityError:
+            if not answer.id_sessao:
+                raise
+            # The session of an answer is unique: an earlier submission of the
+            # link already registered its answer.
+            db.rollback()
+            return get_link_answer(answer.id_sessao, db)
+
+        if answer.id_sessao:
+            marked_links = db.execute(
+                update(LinksAcessoUnico)
+                .where(
+                    LinksAcessoUnico.id_sessao == answer.id_sessao,
+                    LinksAcessoUnico.respondido == 0,
+                    LinksAcessoUnico.expirado_em.is_(None),
+                )
+                .values(
+                    respondido=1,
+                    id_resposta=new_answer.id_resposta,
+                    respondido_em=new_answer.respondido_em,
+                )
+            ).rowcount
+
+            if not marked_links:
+                db.rollback()
+                return get_link_answer(answer.id_sessao, db)
+
+        upsert_current_profiles(
+            db,
+            [
+                {
+                    column: getattr(new_answer, column)
+                    for column in current_profiles.PROFILE_COLUMNS
+                }
+            ],
+        )
+        add_answers_to_rollups(
+            db,
+            [
+                {
+                    "id_usuario": new_answer.id_usuario,
+                    "motivo": new_answer.motivo,
+                    "respondido_em": new_answer.respondido_em,
+                }
+            ],
+        )
+
+        # Every column is already loaded, detaching the answer keeps the commit from
+        # expiring it and costing another SELECT when the response is serialized.
+        db.expunge(new_answer)
         db.commit()
-        db.refresh(new_answer)
 
         if answer.id_sessao:
-            link: LinksAcessoUnico = (
-                db.query(LinksAcessoUnico)
-                .filter(LinksAcessoUnico.id_sessao == answer.id_sessao)
-                .first()
+            invalidate_link_sessions([answer.id_sessao])
+            publish_link_status(
+                [
+                    {
+                        "id_sessao": answer.id_sessao,
+                        "id_resposta": new_answer.id_resposta,
+                        "respondido_em": new_answer.respondido_em,
+                    }
+                ]
             )
 
-            if link:
-                link.id_resposta = new_answer.id_resposta
-                link.respondido = 1
-                db.commit()
-
     except IntegrityError as e:
         setup_logger().error("Code:400 Message: %s", e)
         raise HTTPException(
@@ -192,3 +534,82 @@ def cadastre_a_test_response(
         ) from e
 
     return new_answer
+
+
+def check_queued_answer(id_user: int, id_session: int, db: Session) -> Respostas:
+    """
+    Check an answer before it is queued, as the flusher will write it.
+
+    An answer the database would reject is refused now, rather than accepted with
+    202 and set aside by the flusher.
+
+    Args:
+        id_user: The id of the user who answered.
+        id_session: The id of the session of the unique access link, or None.
+        db: Database session.
+
+    Returns:
+        Respostas: The answer already registered through the unique access link, for
+        a retried submission, or None when the answer may be queued.
+
+    Raises:
+        HTTPException: Raised when the user, or the open link, does not exist (404).
+    """
+    try:
+        user_exists = db.get(Usuarios, id_user) is not None
+        link = db.get(LinksAcessoUnico, id_session) if id_session else None
+    except SQLAlchemyError as e:
+        setup_logger().error("Code:500 Message: %s", e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Error registering test response",
+        ) from e
+
+    if not user_exists:
+        setup_logger().error("Code:404 Message: User with ID %s not found", id_user)
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail=f"User with id {id_user} not found"
+        )
+    if id_session and link is not None and link.respondido:
+        return get_link_answer(id_session, db)
+    if id_session and (link is None or link.expirado_em is not None):
+        setup_logger().error(
+            "Code:404 Message: Open unique access link %s not found", id_session
+        )
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="Unique access link not found"
+        )
+    return None
+
+
+def get_link_answer(id_session: int, db: Session) -> Respostas:
+    """
+    Retrieve the answer registered through a unique access link.
+
+    Args:
+        id_session: The id of the session of the unique access link.
+        db: Database session.
+
+    Returns:
+        Respostas: The answer of the link.
+
+    Raises:
+        HTTPException: Raised when the link does not exist or was not answered (404).
+    """
+    answer: Respostas = (
+        db.query(Respostas)
+        .join(LinksAcessoUnico, LinksAcessoUnico.id_resposta == Respostas.id_resposta)
+        .filter(LinksAcessoUnico.id_sessao == id_session)
+        .first()
+    )
+
+    if not answer:
+        setup_logger().error(
+            "Code:404 Message: Answered unique access link %s not found", id_session
+        )
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="Unique access link not found"
+        )
+
+    setup_logger().info("Unique access link %s was already answered", id_session)
+    return answer
@@ -0,0 +1,70 @@
+"""
+Module: dashboard.py
+
+This module contains the route of the dashboard of the admin landing page.
+
+Routes:
+    /dashboard:
+        GET: Retrieve the link stats, users by permission and latest answers.
+"""
+
+# pylint: disable=import-error
+from http import HTTPStatus
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from personavix.src.cache.dashboard import get_dashboard_payload
+from personavix.src.database.database import get_read_db
+from personavix.src.middleware.query_budget import query_budget
+from personavix.src.models.schemas import dashboard
+from personavix.logger import setup_logger
+from personavix.src.dependencies.decode_and_verify_token import (
+    TokenData,
+    decode_and_verify_token,
+)
+from personavix.src.dependencies import guard_clauses
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+
+@router.get(
+    "/",
+    summary="Get the dashboard of the admin landing page",
+    description="Retrieves the number of unique access links by status, the number of "
+    "users by permission and the latest answers, in a single request. The dashboard is "
+    "cached for a few seconds.",
+    response_model=dashboard.Dashboard,
+)
+@query_budget(3)
+def get_dashboard(
+    db: Session = Depends(get_read_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):
+    """
+    Retrieve the dashboard of the admin landing page.
+
+    The serialized dashboard is cached, see personavix.src.cache.dashboard.
+
+    Args:
+        db: Database session dependency. Defaults to Depends(get_read_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        Dashboard: The link stats, users by permission and latest answers.
+    """
+    guard_clauses.verify_permission_is_admin(
+        token_data.permission, token_data.access_flag
+    )
+
+    try:
+        setup_logger().info("Getting the dashboard.")
+        payload = get_dashboard_payload(db)
+
+    except SQLAlchemyError as e:
+        setup_logger().error("Code:500 Message: %s", e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Error getting the dashboard",
+        ) from e
+
+    return Response(content=payload, media_type="application/json")
@@ -0,0 +1,47 @@
+"""
+Module: health.py
+
+This module contains the probes of the worker.
+
+Routes:
+    /health/live:
+        GET: Check that the worker is running.
+    /health/ready:
+        GET: Check that the worker finished its warm-up and can serve traffic.
+"""
+
+# pylint: disable=import-error
+from http import HTTPStatus
+from fastapi import APIRouter, HTTPException
+from personavix.src.maintenance.warmup import is_ready
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live", summary="Check that the worker is running.")
+def live() -> dict:
+    """
+    Check that the worker is running.
+
+    Returns:
+        dict: The status of the worker.
+    """
+    return {"status": "live"}
+
+
+@router.get("/ready", summary="Check that the worker can serve traffic.")
+def ready() -> dict:
+    """
+    Check that the worker finished its warm-up and can serve traffic.
+
+    Returns:
+        dict: The status of the worker.
+
+    Raises:
+        HTTPException: Raised while the worker is warming up or shutting down (503).
+    """
+    if not is_ready():
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Warming up"
+        )
+    return {"status": "ready"}
@@ -9,12 +9,12 @@ Routes:
 """
 
 from http import HTTPStatus
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from personavix.src.database.database import get_db
-from personavix.src.models.domain.questions import Perguntas
-from personavix.src.models.domain.disc_characteristics import CaracteristicasDisc
+from personavix.src.cache.questionary import get_questionary_payload
+from personavix.src.database.database import get_read_db
+from personavix.src.middleware.query_budget import query_budget
 from personavix.src.models.schemas import questionary
 from personavix.logger import setup_logger
 from personavix.src.dependencies.decode_and_verify_token import (
@@ -32,15 +32,18 @@ router = APIRouter(prefix="/questionary", tags=["Questionary"])
     description="Retrieves all disc characteristics and questions.",
     response_model=questionary.Questionary,
 )
+@query_budget(2)
 def get_questionary(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     token_data: TokenData = Depends(decode_and_verify_token),
 ):
     """
     Retrieve a list of disc characteristics and questions.
 
+    The serialized questionary is cached, see personavix.src.cache.questionary.
+
     Args:
-        db: Database session dependency. Defaults to Depends(get_db).
+        db: Database session dependency. Defaults to Depends(get_read_db).
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
@@ -55,15 +58,7 @@ def get_questionary(
         setup_logger().info(
             "Getting all disc characteristics in table CaracteristicasDisc."
         )
-        all_questions: list[Perguntas] = db.query(Perguntas).all()
-        all_disc_characteristics: list[CaracteristicasDisc] = db.query(
-            CaracteristicasDisc
-        ).all()
-
-        formatted_response = {
-            "questions": all_questions,
-            "disc_characteristics": all_disc_characteristics,
-        }
+        payload = get_questionary_payload(db)
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
@@ -72,4 +67,4 @@ def get_questionary(
             detail="Error getting questions.",
         ) from e
 
-    return formatted_response
+    return Response(content=payload, media_type="application/json")
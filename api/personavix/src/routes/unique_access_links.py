@@ -5,9 +5,12 @@ This module contains the schemas for the unique access links.
 
 Routes:
     /unique-access-links:
-        GET: Retrieve all unique access links from the database.
+        GET: Retrieve all unique access links from the database, expired or not.
         POST: Create a unique access link in the database.
 
+    /unique-access-links/events:
+        GET: Stream the status changes of the unique access links.
+
     /unique-access-links/{session_link}:
         GET: Retrieve a unique access link by session ID from the database.
 
@@ -18,10 +21,12 @@ Routes:
 # pylint: disable=import-error
 from http import HTTPStatus
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
-from personavix.src.database.database import get_db
+from personavix.src.database.database import get_db, get_read_db
+from personavix.src.middleware.query_budget import query_budget
 from personavix.src.models.domain.users import Usuarios
 from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
 from personavix.src.models.schemas import unique_access_links
@@ -37,6 +42,23 @@ from personavix.src.dependencies.decode_and_verify_token import (
     decode_and_verify_token,
 )
 from personavix.src.dependencies import guard_clauses
+from personavix.src.dependencies.rate_limit import enforce_rate_limit
+from personavix.src.dependencies.token_versions import read_token_version
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.dependencies.sparse_fields import (
+    FIELDS_DESCRIPTION,
+    load_options,
+    narrow_model,
+    parse_fields,
+)
+from personavix.src.events.link_status import link_status_broker, stream_link_status
+from personavix.src.cache.unique_access_links import (
+    MISSING_LINK,
+    cache_link,
+    cache_missing_link,
+    get_cached_link,
+    invalidate_link,
+)
 
 
 router = APIRouter(prefix="/unique-access-links", tags=["Unique Access Links"])
@@ -45,34 +67,51 @@ router = APIRouter(prefix="/unique-access-links", tags=["Unique Access Links"])
 @router.get(
     "/",
     summary="Get all unique access links",
-    description="Retrieves all unique access links from the database.",
+    description="Retrieves all unique access links from the database, the expired "
+    "ones included unless include_expired is false.",
     response_model=list[unique_access_links.UniqueAccessLink],
 )
+@query_budget(1)
 def get_unique_access_links(
-    db: Session = Depends(get_db),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
+    include_expired: bool = Query(True, description="Include the expired links."),
+    db: Session = Depends(get_read_db),
     token_data: TokenData = Depends(decode_and_verify_token),
 ):
     """
     Retrieve a list of unique access links.
 
     Args:
-        db: Database session dependency. Defaults to Depends(get_db).
+        fields: Comma-separated fields to return, like "id_sessao,link,respondido".
+            Defaults to every field.
+        include_expired: Whether the links expired by the sweeper are listed.
+            Defaults to True.
+        db: Database session dependency. Defaults to Depends(get_read_db).
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
-        List[UniqueAccessLink]: A list of unique access links.
+        List[UniqueAccessLink]: A list of unique access links, with only the selected
+        fields.
     """
     guard_clauses.verify_permission_is_admin(
         token_data.permission, token_data.access_flag
     )
+    selection = parse_fields(fields, unique_access_links.UniqueAccessLink)
 
     try:
         setup_logger().info(
             "Getting all unique access links in table LinksAcessoUnico."
         )
-        all_unique_access_links: list[LinksAcessoUnico] = db.query(
-            LinksAcessoUnico
-        ).all()
+        query = db.query(LinksAcessoUnico).options(
+            *load_options(LinksAcessoUnico, selection)
+        )
+        if not include_expired:
+            query = query.filter(LinksAcessoUnico.expirado_em.is_(None))
+        all_unique_access_links: list[LinksAcessoUnico] = query.all()
+        payload = serialize_response(
+            list[narrow_model(unique_access_links.UniqueAccessLink, selection)],
+            all_unique_access_links,
+        )
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
@@ -81,7 +120,54 @@ def get_unique_access_links(
             detail="Error getting unique access links",
         ) from e
 
-    return all_unique_access_links
+    return Response(content=payload, media_type="application/json")
+
+
+@router.get(
+    "/events",
+    summary="Stream the status of the unique access links",
+    description="Pushes the unique access links answered from now on as Server-Sent "
+    "Events.",
+    response_class=StreamingResponse,
+)
+async def stream_unique_access_link_events(
+    request: Request,
+    token_data: TokenData = Depends(decode_and_verify_token),
+):
+    """
+    Stream the status changes of the unique access links.
+
+    Each link_status event carries the id_sessao, respondido, id_resposta and
+    respondido_em of an answered link. A resync event means events were dropped
+    because the client fell behind, and the list should be fetched again.
+
+    Args:
+        request: The request of the stream.
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        StreamingResponse: The text/event-stream of the changes.
+
+    Raises:
+        HTTPException: Raised when too many streams are open (503).
+    """
+    guard_clauses.verify_permission_is_admin(
+        token_data.permission, token_data.access_flag
+    )
+
+    subscription = link_status_broker.subscribe()
+    if subscription is None:
+        setup_logger().error("Code:503 Message: Too many link status streams")
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Too many open streams",
+        )
+
+    return StreamingResponse(
+        stream_link_status(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get(
@@ -90,26 +176,44 @@ def get_unique_access_links(
     description="Retrieves a unique access link by session ID from the database.",
     response_model=unique_access_links.UniqueAccessLinkWithUser,
 )
+@query_budget(1)
 def get_unique_access_link_by_session_link(
-    session_link: str, db: Session = Depends(get_db)
+    session_link: str, request: Request, db: Session = Depends(get_db)
 ):
     """
     This function retrieves a unique access link by session link from the database.
 
+    The serialized link is cached, and so are unknown links for a shorter time.
+
     Args:
         session_link (str): The session link.
+        request: The request, whose client IP is rate limited.
         db: Database session dependency. Defaults to Depends(get_db).
 
     Returns:
         UniqueAccessLink: The unique access link that was retrieved.
     """
+    enforce_rate_limit(request, "link_lookup")
+
+    cached_link = get_cached_link(session_link)
+    if cached_link is MISSING_LINK:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="Unique access link not found"
+        )
+    if cached_link is not None:
+        return Response(content=cached_link, media_type="application/json")
+
     try:
         setup_logger().info(
             "Getting a unique access link by session ID in table LinksAcessoUnico."
         )
         unique_access_link: LinksAcessoUnico = (
             db.query(LinksAcessoUnico)
-            .filter(LinksAcessoUnico.link == session_link)
+            .options(joinedload(LinksAcessoUnico.usuarios_))
+            .filter(
+                LinksAcessoUnico.link == session_link,
+                LinksAcessoUnico.expirado_em.is_(None),
+            )
             .first()
         )
 
@@ -117,6 +221,7 @@ def get_unique_access_link_by_session_link(
             setup_logger().error(
                 "Code:404 Message: Unique access link not found by session ID"
             )
+            cache_missing_link(session_link)
             raise HTTPException(
                 status_code=HTTPStatus.NOT_FOUND, detail="Unique access link not found"
             )
@@ -128,7 +233,16 @@ def get_unique_access_link_by_session_link(
             detail="Error getting unique access link by session ID",
         ) from e
 
-    return unique_access_link
+    payload = serialize_response(
+        unique_access_links.UniqueAccessLinkWithUser, unique_access_link
+    )
+    cache_link(
+        session_link,
+        unique_access_link.id_sessao,
+        unique_access_link.id_usuario,
+        payload,
+    )
+    return Response(content=payload, media_type="application/json")
 
 
 @router.post(
@@ -193,6 +307,7 @@ def create_unique_access_link(
         db.add(new_unique_access_link)
         db.commit()
         db.refresh(new_unique_access_link)
+        invalidate_link(new_unique_access_link.link)
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
@@ -209,9 +324,11 @@ def create_unique_access_link(
     description="Authenticates a user by email and password.",
     response_model=unique_access_links.LoginResponse,
 )
+@query_budget(2)
 def unique_access_link_login(
     id_session: int,
     login_data: unique_access_links.UniqueAccessLinkLogin,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """
@@ -220,16 +337,23 @@ def unique_access_link_login(
     Args:
         id_session (int): The unique identifier of the session.
         login_data (UniqueAccessLink): The login data.
+        request: The request, whose client IP is rate limited.
         db: Database session dependency. Defaults to Depends(get_db).
 
     Returns:
         UniqueAccessLink: The unique access link that was authenticated.
     """
+    enforce_rate_limit(request, "link_login", id_session)
+
     try:
         setup_logger().info("Authenticating user by unique access link")
         unique_access_link = (
             db.query(LinksAcessoUnico)
-            .filter(LinksAcessoUnico.id_sessao == id_session)
+            .options(joinedload(LinksAcessoUnico.usuarios_))
+            .filter(
+                LinksAcessoUnico.id_sessao == id_session,
+                LinksAcessoUnico.expirado_em.is_(None),
+            )
             .first()
         )
 
@@ -244,7 +368,10 @@ def unique_access_link_login(
             )
 
         access_token: str = create_access_token(
-            unique_access_link.usuarios_.email, True, timedelta(hours=24)
+            unique_access_link.usuarios_,
+            True,
+            timedelta(hours=24),
+            read_token_version(db, unique_access_link.id_usuario),
         )
 
         return {"session_datas": unique_access_link, "access_token": access_token}
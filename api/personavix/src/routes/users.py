@@ -5,8 +5,12 @@ This module contains the routes for handling users-related tasks.
 
 Routes:
     /users:
-        GET: Retrieve all users from the database.
+        GET: Retrieve all users, or the users with the given ids, from the database.
         POST: Create a new user in the database.
+    /users/profiles:
+        GET: Retrieve the latest DISC profile of each user.
+    /users/search:
+        GET: Search users by name, email, phone and sector.
     /users/{id_user}:
         GET: Retrieve a specific user from the database.
         PATCH: Update a specific user in the database.
@@ -14,25 +18,56 @@ Routes:
         POST: Authenticate a user using a token.
     /users/login:
         POST: Authenticate a user by email and password.
+    /users/logout:
+        POST: Revoke the token of the request.
+    /users/tokens/revoke:
+        POST: Revoke a compromised token.
 """
 
 # pylint: disable=import-error
 from http import HTTPStatus
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from personavix.src.database.database import get_db
+from personavix.src.database.database import get_db, get_read_db
+from personavix.src.middleware.query_budget import query_budget
 from personavix.src.dependencies.hash_password import hash_password, verify_password
 from personavix.src.models.domain.users import Usuarios
-from personavix.src.models.schemas import users
+from personavix.src.models.domain.current_profiles import PerfilAtual
+from personavix.src.models.schemas import current_profiles, users
 from personavix.logger import setup_logger
 from personavix.src.dependencies.create_access_token import create_access_token
 from personavix.src.dependencies.decode_and_verify_token import (
     TokenData,
     decode_and_verify_token,
+    decode_token,
 )
 from personavix.src.dependencies import guard_clauses
+from personavix.src.dependencies.token_revocations import revoke_token
+from personavix.src.dependencies.token_versions import (
+    claims_change,
+    increment_token_version,
+    read_token_version,
+    token_versions,
+)
+from personavix.src.dependencies.rate_limit import enforce_rate_limit
+from personavix.src.cache.unique_access_links import invalidate_user_links
+from personavix.src.search.user_index import get_user_index, index_user
+from personavix.src.dependencies.multi_get import (
+    IDS_DESCRIPTION,
+    missing_ids_headers,
+    order_by_ids,
+    parse_ids,
+)
+from personavix.src.dependencies.serialize_response import serialize_response
+from personavix.src.dependencies.sparse_fields import (
+    FIELDS_DESCRIPTION,
+    load_options,
+    narrow_model,
+    parse_fields,
+)
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -41,38 +76,171 @@ router = APIRouter(prefix="/users", tags=["Users"])
 @router.get(
     "/",
     summary="Get all users",
-    description="Retrieves all users from the database.",
+    description="Retrieves all users from the database, or with ids= the users with "
+    "these ids, in a single query.",
     response_model=list[users.User],
 )
+@query_budget(1)
 def get_users(
-    db: Session = Depends(get_db),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
+    ids: str = Query(None, description=IDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
     token_data: TokenData = Depends(decode_and_verify_token),
 ):
     """
-    Retrieve a list of persons.
+    Retrieve a list of persons, every one or the ones with the given ids.
+
+    Listing every user is reserved to admins. Fetching users by id needs the
+    permission of GET /users/{id_user}, checked once for the whole batch.
 
     Args:
-        db: Database session dependency. Defaults to Depends(get_db).
+        fields: Comma-separated fields to return, like "id_usuario,nome,setor".
+            Defaults to every field.
+        ids: Comma-separated ids of the users to return. Defaults to every user.
+        db: Database session dependency. Defaults to Depends(get_read_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        List[User]: A list of users, with only the selected fields. With ids, the
+        users in the order of their ids, and the ids of no user in X-Missing-Ids.
+    """
+    if ids is None:
+        guard_clauses.verify_permission_is_admin(
+            token_data.permission, token_data.access_flag
+        )
+    else:
+        guard_clauses.verify_permission_is_user(
+            token_data.permission, token_data.access_flag
+        )
+        id_users = parse_ids(ids)
+    selection = parse_fields(fields, users.User)
+    headers = None
+
+    try:
+        query = db.query(Usuarios).options(*load_options(Usuarios, selection))
+        if ids is None:
+            setup_logger().info("Getting all users in table Usuarios.")
+            found_users: list[Usuarios] = query.all()
+        else:
+            setup_logger().info("Getting %s users in table Usuarios.", len(id_users))
+            found_users, missing = order_by_ids(
+                query.filter(Usuarios.id_usuario.in_(id_users)),
+                id_users,
+                lambda user: user.id_usuario,
+            )
+            headers = missing_ids_headers(missing)
+        payload = serialize_response(
+            list[narrow_model(users.User, selection)], found_users
+        )
+
+    except SQLAlchemyError as e:
+        setup_logger().error("Code:500 Message: %s", e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error retrieving users"
+        ) from e
+
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/profiles",
+    summary="Get the current profile of each user",
+    description="Retrieves the latest DISC result of each user from the perfil_atual "
+    "projection.",
+    response_model=list[current_profiles.CurrentProfile],
+)
+@query_budget(1)
+def get_current_profiles(
+    db: Session = Depends(get_read_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):
+    """
+    Retrieve the latest DISC profile of each user.
+
+    Args:
+        db: Database session dependency. Defaults to Depends(get_read_db).
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
-        List[User]: A list of users.
+        List[CurrentProfile]: The latest answer of each user who answered the test.
+    """
+    guard_clauses.verify_permission_is_manager(
+        token_data.permission, token_data.access_flag
+    )
+
+    try:
+        setup_logger().info("Getting all current profiles in table PerfilAtual.")
+        all_profiles: list[PerfilAtual] = db.query(PerfilAtual).all()
+
+    except SQLAlchemyError as e:
+        setup_logger().error("Code:500 Message: %s", e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Error retrieving current profiles",
+        ) from e
+
+    return all_profiles
+
+
+@router.get(
+    "/search",
+    summary="Search users",
+    description="Searches users by prefix or substring of their name, email, phone "
+    "and sector, ranked and paginated.",
+    response_model=list[users.User],
+)
+@query_budget(2)
+def search_users(
+    q: str = Query(..., min_length=2, max_length=80, description="The searched text."),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    fields: str = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):  # pylint: disable=too-many-arguments
+    """
+    Search users by name, email, phone and sector.
+
+    Users with a field or a word equal to the text come first, then users with one
+    starting with it, then users containing it anywhere. Case and accents are
+    ignored, and phones match by their digits.
+
+    Args:
+        q: The searched text.
+        limit: The maximum number of users returned.
+        offset: The number of ranked users skipped.
+        fields: Comma-separated fields to return. Defaults to every field.
+        db: Database session dependency. Defaults to Depends(get_read_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        List[User]: The users of the page, in rank order.
     """
     guard_clauses.verify_permission_is_admin(
         token_data.permission, token_data.access_flag
     )
+    selection = parse_fields(fields, users.User)
 
     try:
-        setup_logger().info("Getting all users in table Usuarios.")
-        all_users: list[Usuarios] = db.query(Usuarios).all()
+        id_users = get_user_index(db).search(q, limit, offset)
+        found_users = {
+            user.id_usuario: user
+            for user in db.query(Usuarios)
+            .options(*load_options(Usuarios, selection))
+            .filter(Usuarios.id_usuario.in_(id_users))
+        }
+        payload = serialize_response(
+            list[narrow_model(users.User, selection)],
+            [found_users[id_user] for id_user in id_users if id_user in found_users],
+        )
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
         raise HTTPException(
-            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error retrieving users"
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error searching users"
         ) from e
 
-    return all_users
+    return Response(content=payload, media_type="application/json")
 
 
 @router.get(
@@ -81,9 +249,10 @@ def get_users(
     description="Retrieves a specific user from the database.",
     response_model=users.User,
 )
+@query_budget(1)
 def get_user(
     id_user: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     token_data: TokenData = Depends(decode_and_verify_token),
 ):
     """
@@ -91,7 +260,7 @@ def get_user(
 
     Args:
         id_user: ID of the user to retrieve.
-        db: Database session dependency. Defaults to Depends(get_db).
+        db: Database session dependency. Defaults to Depends(get_read_db).
         token_data (TokenData): Defaults to Depends(decode_and_verify_token).
 
     Returns:
@@ -160,6 +329,7 @@ def create_user(
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        index_user(new_user)
         return new_user
 
     except IntegrityError as e:
@@ -181,8 +351,10 @@ def create_user(
     description="Authenticates a user by email and password.",
     response_model=users.LoginResponse,
 )
+@query_budget(2)
 def login_user(
     login_data: users.UserLogin,
+    request: Request,
     db: Session = Depends(get_db),
 ):
     """
@@ -190,14 +362,17 @@ def login_user(
 
     Args:
         login_data: User login data.
+        request: The request, whose client IP is rate limited.
         db: Database session dependency. Defaults to Depends(get_db).
 
     Returns:
         JSONResponse: Response with the authentication cookie.
 
     Raises:
-        HTTPException: If the credentials are invalid.
+        HTTPException: If the credentials are invalid, or too many attempts were made.
     """
+    enforce_rate_limit(request, "users_login", login_data.email)
+
     try:
         user = db.query(Usuarios).filter(Usuarios.email == login_data.email).first()
 
@@ -206,7 +381,9 @@ def login_user(
                 status_code=HTTPStatus.UNAUTHORIZED, detail="Invalid credentials"
             )
 
-        access_token: str = create_access_token(user.email, False, timedelta(hours=24))
+        access_token: str = create_access_token(
+            user, False, timedelta(hours=24), read_token_version(db, user.id_usuario)
+        )
 
         return {"user_datas": user, "access_token": access_token}
 
@@ -253,7 +430,9 @@ def get_user_session(
                 status_code=HTTPStatus.UNAUTHORIZED, detail="User not authorized"
             )
 
-        access_token: str = create_access_token(user.email, False, timedelta(hours=24))
+        access_token: str = create_access_token(
+            user, False, timedelta(hours=24), read_token_version(db, user.id_usuario)
+        )
         return {"user_datas": user, "access_token": access_token}
 
     except SQLAlchemyError as e:
@@ -262,6 +441,103 @@ def get_user_session(
         ) from e
 
 
+@router.post(
+    "/logout",
+    summary="User logout",
+    description="Revokes the token of the request, before it expires.",
+    status_code=HTTPStatus.NO_CONTENT,
+)
+def logout_user(
+    db: Session = Depends(get_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):
+    """
+    Revoke the token of the request.
+
+    Args:
+        db: Database session dependency. Defaults to Depends(get_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        Response: An empty response.
+
+    Raises:
+        HTTPException: If the token has no id, being issued before tokens had one.
+    """
+    _revoke(db, token_data.jti, token_data.expires_at, token_data.id_user)
+    return Response(status_code=HTTPStatus.NO_CONTENT)
+
+
+@router.post(
+    "/tokens/revoke",
+    summary="Revoke a token",
+    description="Revokes a compromised token before it expires. Reserved to admins.",
+    status_code=HTTPStatus.NO_CONTENT,
+)
+def revoke_user_token(
+    revocation: users.TokenRevocation,
+    db: Session = Depends(get_db),
+    token_data: TokenData = Depends(decode_and_verify_token),
+):
+    """
+    Revoke a token of any user.
+
+    Args:
+        revocation: The revoked token.
+        db: Database session dependency. Defaults to Depends(get_db).
+        token_data (TokenData): Defaults to Depends(decode_and_verify_token).
+
+    Returns:
+        Response: An empty response, also for an already expired token.
+
+    Raises:
+        HTTPException: If the token is invalid or has no id.
+    """
+    guard_clauses.verify_permission_is_admin(
+        token_data.permission, token_data.access_flag
+    )
+
+    try:
+        payload = decode_token(revocation.access_token)
+    except jwt.ExpiredSignatureError:
+        return Response(status_code=HTTPStatus.NO_CONTENT)
+    except JWTError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Invalid token."
+        ) from e
+
+    _revoke(db, payload.get("jti"), payload["exp"], payload.get("id_user"))
+    setup_logger().info("Token of user %s revoked.", payload.get("id_user"))
+    return Response(status_code=HTTPStatus.NO_CONTENT)
+
+
+def _revoke(db: Session, jti: str, exp: int, id_user: int) -> None:
+    """
+    Revoke a token.
+
+    Args:
+        db: Database session.
+        jti: The id of the token.
+        exp: The exp claim of the token.
+        id_user: The id of the user of the token.
+
+    Raises:
+        HTTPException: If the token has no id.
+    """
+    if jti is None:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Token issued without an id, revoke the tokens of its user instead.",
+        )
+    try:
+        revoke_token(db, jti, exp, id_user)
+    except SQLAlchemyError as e:
+        setup_logger().error("Code:500 Message: %s", e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail="Error revoking token"
+        ) from e
+
+
 @router.patch(
     "/{id_user}",
     summary="Updates an user",
@@ -306,11 +582,18 @@ def update_user(
             )
 
         updated_fields = user_datas.dict(exclude_unset=True)
+        # The tokens issued before would carry the former claims of the user.
+        revoke_tokens = claims_change(user_to_update, updated_fields)
         for field, value in updated_fields.items():
             setattr(user_to_update, field, value)
 
+        version = increment_token_version(db, id_user) if revoke_tokens else None
         db.commit()
+        if version is not None:
+            token_versions.update([(id_user, version)])
         db.refresh(user_to_update)
+        invalidate_user_links(id_user)
+        index_user(user_to_update)
 
     except SQLAlchemyError as e:
         setup_logger().error("Code:500 Message: %s", e)
@@ -0,0 +1,280 @@
+"""
+Module: user_index.py
+
+This module contains the in-memory search index of the users.
+
+Only the searchable text of each user is kept, normalized: case and accents are
+ignored, and phones are reduced to their digits. Prefixes of whole fields and of the
+words of nome and setor are looked up in a sorted list of terms; other substrings are
+found by scanning one string holding the text of every user, which runs in C.
+
+The index is loaded on the first search. The routes writing users update it in the
+worker that served them, and the other workers catch up by reading the users whose
+atualizado_em moved, at most every USER_SEARCH_REFRESH_INTERVAL seconds.
+
+Classes:
+    UserSearchIndex: Prefix and substring index of the searchable fields of users.
+
+Functions:
+    normalize_text: Normalize text for search.
+    normalize_phone: Reduce a phone to its digits.
+    get_user_index: Get the index of the process, loaded and refreshed.
+    index_user: Update a user in the index, if it is loaded.
+"""
+
+# pylint: disable=import-error
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from sqlalchemy import select
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.settings import settings
+
+PHONE_QUERY = re.compile(r"[\d\s()+.-]+")
+SEARCH_COLUMNS = (
+    Usuarios.id_usuario,
+    Usuarios.nome,
+    Usuarios.email,
+    Usuarios.telefone,
+    Usuarios.setor,
+    Usuarios.atualizado_em,
+)
+
+
+def normalize_text(value: str) -> str:
+    """
+    Normalize text for search.
+
+    Args:
+        value: The text, or None.
+
+    Returns:
+        str: The text without accents, case folded, with single spaces.
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def normalize_phone(value: str) -> str:
+    """
+    Reduce a phone to its digits.
+
+    Args:
+        value: The phone, or None.
+
+    Returns:
+        str: The digits of the phone.
+    """
+    return "".join(char for char in value or "" if char.isdigit())
+
+
+class UserSearchIndex:
+    """
+    Prefix and substring index of the searchable fields of users.
+
+    Results are ranked in two tiers: users with a field or a word starting with the
+    query, in the order of the matched terms, so exact matches come first; then users
+    containing the query anywhere, ordered by id. A page only walks the matches up to
+    its end.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: dict[int, tuple[str, str, str, str]] = {}
+        self._terms: list[tuple[str, int]] = []
+        self._haystack: str = None
+        self._starts: list[int] = []
+        self._ids: list[int] = []
+
+    @staticmethod
+    def _document(nome: str, email: str, telefone: str, setor: str) -> tuple:
+        """
+        Build the normalized document of a user.
+
+        Returns:
+            tuple: The normalized nome, email, telefone digits and setor.
+        """
+        return (
+            normalize_text(nome),
+            normalize_text(email),
+            normalize_phone(telefone),
+            normalize_text(setor),
+        )
+
+    @staticmethod
+    def _document_terms(document: tuple) -> set[str]:
+        """
+        Get the terms looked up by prefix of a document.
+
+        Args:
+            document: The normalized document.
+
+        Returns:
+            set[str]: Every non-empty field, and every word of nome and setor.
+        """
+        nome, _, _, setor = document
+        return {term for term in (*document, *nome.split(), *setor.split()) if term}
+
+    def load(self, rows) -> None:
+        """
+        Replace the whole index.
+
+        Args:
+            rows: The id_usuario, nome, email, telefone and setor of every user.
+        """
+        documents = {row[0]: self._document(*row[1:5]) for row in rows}
+        terms = sorted(
+            (term, id_user)
+            for id_user, document in documents.items()
+            for term in self._document_terms(document)
+        )
+        with self._lock:
+            self._documents, self._terms, self._haystack = documents, terms, None
+
+    def upsert(self, user) -> None:
+        """
+        Add a user to the index, or update it.
+
+        Args:
+            user: The user, or a row of SEARCH_COLUMNS: anything with the id_usuario,
+                nome, email, telefone and setor of the user.
+        """
+        id_user = user.id_usuario
+        document = self._document(user.nome, user.email, user.telefone, user.setor)
+        with self._lock:
+            previous = self._documents.get(id_user)
+            if previous == document:
+                return
+            if previous is not None:
+                for term in self._document_terms(previous):
+                    position = bisect_left(self._terms, (term, id_user))
+                    if self._terms[position : position + 1] == [(term, id_user)]:
+                        del self._terms[position]
+            for term in self._document_terms(document):
+                insort(self._terms, (term, id_user))
+            self._documents[id_user] = document
+            self._haystack = None  # Rebuilt by the next substring search.
+
+    def _build_haystack(self) -> None:
+        """Join the text of every user in one string, with the offset of each one."""
+        self._ids = sorted(self._documents)
+        self._starts, parts, offset = [], [], 0
+        for id_user in self._ids:
+            part = "\t".join(self._documents[id_user])
+            self._starts.append(offset)
+            parts.append(part)
+            offset += len(part) + 1
+        self._haystack = "\n".join(parts)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list[int]:
+        """
+        Search users by prefix and substring of their nome, email, telefone and setor.
+
+        Args:
+            query: The searched text. Phone-like queries also match phones by digits.
+            limit: The maximum number of results.
+            offset: The number of ranked results skipped.
+
+        Returns:
+            list[int]: The ids of the users of the page, in rank order.
+        """
+        needles = [normalize_text(query)]
+        if PHONE_QUERY.fullmatch(query) and normalize_phone(query) not in needles:
+            needles.append(normalize_phone(query))
+        needles = [needle for needle in needles if needle]
+        wanted = offset + limit
+
+        with self._lock:
+            results, seen = [], set()
+            for needle in needles:
+                position = bisect_left(self._terms, (needle,))
+                while len(results) < wanted and position < len(self._terms):
+                    term, id_user = self._terms[position]
+                    if not term.startswith(needle):
+                        break
+                    if id_user not in seen:
+                        seen.add(id_user)
+                        results.append(id_user)
+                    position += 1
+            if len(results) >= wanted:
+                return results[offset:wanted]
+
+            # Substring matches are only scanned for when prefixes do not fill the page.
+            if self._haystack is None:
+                self._build_haystack()
+            for needle in needles:
+                found = self._haystack.find(needle)
+                while found != -1 and len(results) < wanted:
+                    index = bisect_right(self._starts, found) - 1
+                    if self._ids[index] not in seen:
+                        seen.add(self._ids[index])
+                        results.append(self._ids[index])
+                    if index + 1 == len(self._starts):
+                        break
+                    found = self._haystack.find(needle, self._starts[index + 1])
+        return results[offset:wanted]
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+user_search_index = UserSearchIndex()
+_index_state = {"loaded": False, "refreshed_at": 0.0, "watermark": None}
+_refresh_lock = threading.Lock()
+
+
+def get_user_index(db) -> UserSearchIndex:
+    """
+    Get the index of the process, loaded and refreshed.
+
+    The first call loads every user. Later calls read again the users updated since
+    the last refresh, when it is older than USER_SEARCH_REFRESH_INTERVAL seconds.
+
+    Args:
+        db: The database session.
+
+    Returns:
+        UserSearchIndex: The index.
+    """
+    now = time.monotonic()
+    if now - _index_state["refreshed_at"] < settings.USER_SEARCH_REFRESH_INTERVAL:
+        return user_search_index
+
+    with _refresh_lock:
+        if now - _index_state["refreshed_at"] < settings.USER_SEARCH_REFRESH_INTERVAL:
+            return user_search_index
+
+        statement = select(*SEARCH_COLUMNS)
+        if _index_state["loaded"] and _index_state["watermark"] is not None:
+            # Updates within the second of the watermark are read again, not missed.
+            statement = statement.where(Usuarios.atualizado_em >= _index_state["watermark"])
+        rows = db.execute(statement).all()
+
+        if _index_state["loaded"]:
+            for row in rows:
+                user_search_index.upsert(row)
+        else:
+            user_search_index.load(rows)
+            _index_state["loaded"] = True
+        _index_state["watermark"] = max(
+            (row.atualizado_em for row in rows if row.atualizado_em is not None),
+            default=_index_state["watermark"],
+        )
+        _index_state["refreshed_at"] = time.monotonic()
+    return user_search_index
+
+
+def index_user(user: Usuarios) -> None:
+    """
+    Update a user in the index, if it is loaded.
+
+    Args:
+        user: The created or updated user.
+    """
+    if _index_state["loaded"]:
+        user_search_index.upsert(user)
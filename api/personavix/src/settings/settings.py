@@ -0,0 +1,193 @@
+"""
+Module: settings.py
+
+This module contains the settings of the API read from the environment.
+
+Constants:
+    DB_HOST: Host of the MySQL database.
+    DB_PORT: Port of the MySQL database.
+    DB_USER: User of the MySQL database.
+    DB_PASSWORD: Password of the MySQL database.
+    DB_SCHEMA: Schema of the MySQL database.
+    DB_READ_HOST: Host of the read replica, unset to read from the primary.
+    DB_READ_PORT: Port of the read replica. Defaults to DB_PORT.
+    DB_READ_USER: User of the read replica. Defaults to DB_USER.
+    DB_READ_PASSWORD: Password of the read replica. Defaults to DB_PASSWORD.
+    DATABASE_URL: URL of the primary database, replacing the MySQL settings, like
+        "sqlite:///personavix.sqlite3" for local tests.
+    DATABASE_READ_URL: URL of the read replica, replacing the MySQL settings.
+    READ_YOUR_WRITES_WINDOW: Seconds a client reads from the primary after a write.
+    SCHEMA_STARTUP_MODE: "create" creates the missing tables when the API starts,
+        "check" only verifies them and "skip" does neither. Both "create" and "check"
+        refuse to start while a column of the models is missing.
+    DB_STARTUP_RETRIES: Retries of the schema step while the database is unreachable.
+    DB_STARTUP_RETRY_DELAY: Seconds before the first retry, doubled after each one.
+    DB_CONNECT_TIMEOUT: Seconds to wait for a new MySQL connection.
+    DB_ECHO: Whether the engines log every SQL statement, for debugging.
+    DB_STATEMENT_TIMEOUT: Seconds a statement of a request may run, 0 for no limit.
+    DB_BREAKER_FAILURE_THRESHOLD: Consecutive database failures opening the circuit
+        breaker, 0 disables it.
+    DB_BREAKER_RESET_TIMEOUT: Seconds an open circuit breaker rejects requests before
+        letting a probe through.
+    DB_READ_RETRIES: Retries of a read failing with a transient error.
+    DB_RETRY_BASE_DELAY: Maximum seconds before the first retry of a read, doubled
+        after each one.
+    ANSWERS_INGESTION_MODE: "sync" writes each answer when it is submitted, "queue"
+        appends it to the local journal and returns 202 with a receipt.
+    ANSWERS_QUEUE_PATH: Path of the SQLite journal of queued answers.
+    ANSWERS_FLUSH_BATCH_SIZE: Maximum number of answers written per flush.
+    ANSWERS_FLUSH_INTERVAL: Seconds between flushes of the journal.
+    ANSWERS_CLAIM_TIMEOUT: Seconds after which answers claimed by a flusher which
+        died are flushed by another worker.
+    LINK_LOOKUP_CACHE_SIZE: Maximum number of cached public link lookups.
+    LINK_LOOKUP_CACHE_TTL: Seconds a cached public link lookup is kept.
+    LINK_LOOKUP_NEGATIVE_CACHE_TTL: Seconds an unknown link is remembered.
+    ANSWER_CACHE_SIZE: Maximum number of cached answers.
+    ANSWER_CACHE_MAX_BYTES: Maximum total size of the cached answers, in bytes.
+    ANSWER_CACHE_TTL: Seconds a cached answer is kept.
+    ANSWER_MAX_AGE: Seconds browsers may reuse an answer without asking again.
+    REPORTS_CACHE_DIR: Directory of the rendered DISC reports.
+    REPORTS_CACHE_MAX_BYTES: Maximum total size of the rendered DISC reports.
+    REPORTS_WORKERS: Number of processes rendering DISC reports.
+    REPORTS_RENDER_TIMEOUT: Seconds a request waits for a DISC report to render.
+    TIMESERIES_MAX_DAYS: Maximum number of days of an answers time series.
+    MULTI_GET_MAX_IDS: Maximum number of ids fetched at once with an ids= parameter.
+    DASHBOARD_CACHE_TTL: Seconds the dashboard of the admin landing page is cached.
+    DASHBOARD_LATEST_ANSWERS: Number of latest answers shown on the dashboard.
+    TOKEN_VERSION_REFRESH_INTERVAL: Seconds between refreshes of the token versions and
+        revocations, 0 checks every token against the database.
+    TOKEN_REVOCATION_CAPACITY: Revoked tokens the Bloom filter is sized for.
+    TOKEN_REVOCATION_FALSE_POSITIVE_RATE: Target false positive rate of the filter.
+    TOKEN_REVOCATION_PURGE_INTERVAL: Seconds between evictions of expired revocations.
+    LINK_VALIDITY_DAYS: Days an unanswered unique access link stays valid.
+    LINK_SWEEP_MODE: "expire" marks stale links as expired, "delete" removes them.
+    LINK_SWEEP_INTERVAL: Seconds between sweeps of stale links, 0 disables the sweeper.
+    LINK_SWEEP_BATCH_SIZE: Maximum number of links swept per transaction.
+    LINK_SWEEP_BATCH_PAUSE: Seconds between two batches of a sweep.
+    COMPRESSION_MIN_SIZE: Smallest response body compressed, in bytes.
+    COMPRESSION_GZIP_LEVEL: Compression level of gzip responses.
+    COMPRESSION_BROTLI_QUALITY: Quality of brotli responses.
+    RATE_LIMIT_ENABLED: Whether the login and public link routes are rate limited.
+    RATE_LIMIT_LOGIN_PER_IP: Login attempts allowed per client IP, like "20/minute".
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: Login attempts allowed per account or link session.
+    RATE_LIMIT_LINK_LOOKUP_PER_IP: Public link lookups allowed per client IP.
+    RATE_LIMIT_TRUST_FORWARDED_FOR: Whether the client IP is read from X-Forwarded-For,
+        only for an API behind a proxy setting it.
+    RATE_LIMIT_BACKEND: "memory" keeps the buckets per worker, "redis" shares them.
+    RATE_LIMIT_REDIS_URL: URL of the Redis server of the shared buckets.
+    RATE_LIMIT_MAX_KEYS: Maximum number of buckets kept per worker.
+    LINK_EVENTS_BUFFER_SIZE: Maximum number of link status events buffered per stream.
+    LINK_EVENTS_MAX_SUBSCRIBERS: Maximum number of open link status streams per worker.
+    LINK_EVENTS_HEARTBEAT: Seconds between two heartbeats of an idle link status stream.
+    USER_SEARCH_REFRESH_INTERVAL: Seconds between two reads of the users updated by
+        other workers into the search index.
+    DEBUG: Whether the debugging aids are on, like the query statistics headers.
+    N_PLUS_ONE_THRESHOLD: Runs of the same statement by a request logged as a
+        possible N+1.
+    QUESTIONARY_CACHE_TTL: Seconds the serialized questionary is cached.
+    CACHE_BACKEND: "memory" keeps the caches per worker, "redis" adds a tier shared
+        by the workers and fans invalidations out to them.
+    CACHE_REDIS_URL: URL of the Redis server of the shared caches.
+    CACHE_INVALIDATION_CHANNEL: Pub/sub channel of the cache invalidations.
+    WARMUP_ENABLED: Whether the worker warms up before reporting ready.
+    WARMUP_POOL_CONNECTIONS: Database connections opened by the warm-up.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_SCHEMA = os.getenv("DB_SCHEMA")
+DB_READ_HOST = os.getenv("DB_READ_HOST")
+DB_READ_PORT = os.getenv("DB_READ_PORT", DB_PORT)
+DB_READ_USER = os.getenv("DB_READ_USER", DB_USER)
+DB_READ_PASSWORD = os.getenv("DB_READ_PASSWORD", DB_PASSWORD)
+DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+SCHEMA_STARTUP_MODE = os.getenv("SCHEMA_STARTUP_MODE", "create")
+DB_STARTUP_RETRIES = int(os.getenv("DB_STARTUP_RETRIES", "5"))
+DB_STARTUP_RETRY_DELAY = float(os.getenv("DB_STARTUP_RETRY_DELAY", "1.0"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "10"))
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "5"))
+DB_BREAKER_RESET_TIMEOUT = float(os.getenv("DB_BREAKER_RESET_TIMEOUT", "10"))
+DB_READ_RETRIES = int(os.getenv("DB_READ_RETRIES", "2"))
+DB_RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.05"))
+
+ANSWERS_INGESTION_MODE = os.getenv("ANSWERS_INGESTION_MODE", "sync")
+ANSWERS_QUEUE_PATH = os.getenv("ANSWERS_QUEUE_PATH", "answers_queue.sqlite3")
+ANSWERS_FLUSH_BATCH_SIZE = int(os.getenv("ANSWERS_FLUSH_BATCH_SIZE", "500"))
+ANSWERS_FLUSH_INTERVAL = float(os.getenv("ANSWERS_FLUSH_INTERVAL", "1.0"))
+ANSWERS_CLAIM_TIMEOUT = float(os.getenv("ANSWERS_CLAIM_TIMEOUT", "60"))
+
+LINK_LOOKUP_CACHE_SIZE = int(os.getenv("LINK_LOOKUP_CACHE_SIZE", "10000"))
+LINK_LOOKUP_CACHE_TTL = float(os.getenv("LINK_LOOKUP_CACHE_TTL", "300"))
+LINK_LOOKUP_NEGATIVE_CACHE_TTL = float(os.getenv("LINK_LOOKUP_NEGATIVE_CACHE_TTL", "30"))
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "50000"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(32 * 1024**2)))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_MAX_AGE = int(os.getenv("ANSWER_MAX_AGE", "31536000"))
+
+REPORTS_CACHE_DIR = os.getenv("REPORTS_CACHE_DIR", "reports_cache")
+REPORTS_CACHE_MAX_BYTES = int(os.getenv("REPORTS_CACHE_MAX_BYTES", str(256 * 1024**2)))
+REPORTS_WORKERS = int(os.getenv("REPORTS_WORKERS", "2"))
+REPORTS_RENDER_TIMEOUT = float(os.getenv("REPORTS_RENDER_TIMEOUT", "30"))
+
+TIMESERIES_MAX_DAYS = int(os.getenv("TIMESERIES_MAX_DAYS", "3660"))
+MULTI_GET_MAX_IDS = int(os.getenv("MULTI_GET_MAX_IDS", "100"))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+DASHBOARD_LATEST_ANSWERS = int(os.getenv("DASHBOARD_LATEST_ANSWERS", "10"))
+TOKEN_VERSION_REFRESH_INTERVAL = float(os.getenv("TOKEN_VERSION_REFRESH_INTERVAL", "5"))
+TOKEN_REVOCATION_CAPACITY = int(os.getenv("TOKEN_REVOCATION_CAPACITY", "100000"))
+TOKEN_REVOCATION_FALSE_POSITIVE_RATE = float(
+    os.getenv("TOKEN_REVOCATION_FALSE_POSITIVE_RATE", "0.001")
+)
+TOKEN_REVOCATION_PURGE_INTERVAL = float(
+    os.getenv("TOKEN_REVOCATION_PURGE_INTERVAL", "3600")
+)
+
+LINK_VALIDITY_DAYS = int(os.getenv("LINK_VALIDITY_DAYS", "30"))
+LINK_SWEEP_MODE = os.getenv("LINK_SWEEP_MODE", "expire")
+LINK_SWEEP_INTERVAL = float(os.getenv("LINK_SWEEP_INTERVAL", "3600"))
+LINK_SWEEP_BATCH_SIZE = int(os.getenv("LINK_SWEEP_BATCH_SIZE", "500"))
+LINK_SWEEP_BATCH_PAUSE = float(os.getenv("LINK_SWEEP_BATCH_PAUSE", "0.05"))
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_LOGIN_PER_IP = os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20/minute")
+RATE_LIMIT_LOGIN_PER_ACCOUNT = os.getenv("RATE_LIMIT_LOGIN_PER_ACCOUNT", "5/minute")
+RATE_LIMIT_LINK_LOOKUP_PER_IP = os.getenv("RATE_LIMIT_LINK_LOOKUP_PER_IP", "120/minute")
+RATE_LIMIT_TRUST_FORWARDED_FOR = (
+    os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"
+)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+LINK_EVENTS_BUFFER_SIZE = int(os.getenv("LINK_EVENTS_BUFFER_SIZE", "256"))
+LINK_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("LINK_EVENTS_MAX_SUBSCRIBERS", "1000"))
+LINK_EVENTS_HEARTBEAT = float(os.getenv("LINK_EVENTS_HEARTBEAT", "15"))
+
+USER_SEARCH_REFRESH_INTERVAL = float(os.getenv("USER_SEARCH_REFRESH_INTERVAL", "5"))
+
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+QUESTIONARY_CACHE_TTL = float(os.getenv("QUESTIONARY_CACHE_TTL", "3600"))
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_INVALIDATION_CHANNEL = os.getenv(
+    "CACHE_INVALIDATION_CHANNEL", "personavix:cache:invalidations"
+)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "5"))
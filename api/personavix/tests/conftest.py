@@ -0,0 +1,147 @@
+"""
+Module: conftest.py
+
+This module contains the shared setup of the tests.
+
+The tests run from the api directory, like the API, with the packages of
+requirements-test.txt installed:
+    python -m pytest personavix/tests
+
+The API under test uses a SQLite database in a temporary file, seeded once per session
+with a small synthetic dataset, and runs in DEBUG mode so its responses carry the
+statement counts checked by the query_budget fixture.
+
+Fixtures:
+    client: Client of the API, with the lifespan running.
+    auth_headers: Headers authenticating requests as an admin.
+    query_budget: Check that a response stayed within the query budget of its route.
+    open_link: Find an open unique access link of the dataset, never answered.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+import os
+import tempfile
+
+DATABASE_FILE = os.path.join(tempfile.mkdtemp(prefix="personavix-tests-"), "test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DATABASE_FILE}")
+os.environ.setdefault("SECRET_KEY", "personavix-tests-secret-key-0123456789")
+os.environ.setdefault("DEBUG", "true")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LINK_SWEEP_INTERVAL", "0")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+# The logger writes to this directory, relative to the working directory.
+os.makedirs(os.path.join("personavix", "src", "logs"), exist_ok=True)
+
+# pylint: disable=wrong-import-position
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from personavix.main import app
+from personavix.src.database.database import engine
+
+PASSWORD = "benchmark"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Start the API on a seeded database, and stop it once the tests are done."""
+    # Imported here, so collecting the fixtures does not import the benchmarks.
+    # pylint: disable=import-outside-toplevel
+    from personavix.benchmarks.generate_dataset import main as generate_dataset
+
+    with TestClient(app) as test_client:
+        generate_dataset(
+            ["--users", "200", "--answers", "100", "--links", "50"]
+            + ["--password", PASSWORD]
+        )
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """Log in as an admin of the seeded dataset."""
+    with engine.connect() as connection:
+        email = connection.execute(
+            text(
+                "SELECT email FROM usuarios WHERE permissao >= 3 AND flag_acesso = 1 "
+                "AND email IS NOT NULL AND senha_hash IS NOT NULL LIMIT 1"
+            )
+        ).scalar()
+    response = client.post("/users/login", json={"email": email, "senha": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Check that a response stayed within the query budget of its route.
+
+    The fixture is a function taking the response and, optionally, a budget replacing
+    the one declared with @query_budget.
+    """
+
+    def check(response, budget: int = None):
+        assert "x-db-queries" in response.headers, "DEBUG must be on to count queries."
+        declared = response.headers.get("x-db-query-budget")
+        budget = budget if budget is not None else declared
+        assert budget is not None, f"{response.url.path} declares no query budget."
+        count = int(response.headers["x-db-queries"])
+        assert count <= int(budget), (
+            f"{response.request.method} {response.url.path} ran {count} statements, "
+            f"over its budget of {budget}."
+        )
+        return count
+
+    return check
+
+
+@pytest.fixture
+def open_link(client):
+    """
+    Find an open unique access link of the dataset, never answered.
+
+    The fixture is a function taking the rank of the link among the last open links,
+    so tests answering or expiring links do not take the same one.
+    """
+
+    def find(rank: int):
+        with engine.connect() as connection:
+            return connection.execute(
+                text(
+                    "SELECT id_sessao, id_usuario, link FROM links_acesso_unico "
+                    "WHERE expirado_em IS NULL AND respondido = 0 "
+                    "ORDER BY id_sessao DESC LIMIT 1 OFFSET :rank"
+                ),
+                {"rank": rank},
+            ).one()
+
+    return find
+
+
+@pytest.fixture
+def answer_link(client, auth_headers):
+    """
+    Submit an answer with equal scores for a unique access link.
+
+    The fixture is a function taking the link, returning the submitted answer.
+    """
+
+    def submit(link) -> dict:
+        response = client.post(
+            f"/answers/{link.id_usuario}",
+            json={
+                "dominancia": 25,
+                "influencia": 25,
+                "estabilidade": 25,
+                "conformidade": 25,
+                "motivo": "Processo seletivo",
+                "id_sessao": link.id_sessao,
+            },
+            headers=auth_headers,
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return submit
@@ -0,0 +1,170 @@
+"""
+Module: test_answer_rollups.py
+
+This module tests the respostas_diarias rollup: its buckets, its incremental counts
+matching a rebuild, and the time series route reading it.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+from datetime import date, datetime
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from personavix.src.database.database import engine
+from personavix.src.database.schema import prepare_schema
+from personavix.src.models.domain.answer_rollups import RespostasDiarias
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.models.schemas.enums import AgrupamentoEnum, GranularidadeEnum
+from personavix.src.projections.answer_rollups import (
+    add_answers_to_rollups,
+    bucket_start,
+    read_answers_timeseries,
+    rebuild_answer_rollups,
+)
+
+ANSWERS = [
+    (1, "Processo seletivo", datetime(2026, 2, 27, 9)),
+    (1, "Feedback", datetime(2026, 3, 2, 10)),
+    (2, "Processo seletivo", datetime(2026, 3, 2, 23, 59)),
+    (3, "Processo seletivo", datetime(2026, 3, 3, 8)),
+]
+
+
+def _rows() -> list[dict]:
+    """Build the rows of ANSWERS, as counted in the rollup."""
+    return [
+        {"id_usuario": id_user, "motivo": reason, "respondido_em": answered_at}
+        for id_user, reason, answered_at in ANSWERS
+    ]
+
+
+def _rollup(bind) -> set:
+    """Read the rows of the rollup."""
+    with bind.connect() as connection:
+        return set(
+            connection.execute(
+                select(
+                    RespostasDiarias.dia,
+                    RespostasDiarias.setor,
+                    RespostasDiarias.motivo,
+                    RespostasDiarias.total,
+                )
+            ).all()
+        )
+
+
+@pytest.fixture
+def bind(tmp_path):
+    """A fresh database with three users, the last one without a setor."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    prepare_schema(bind, "create")
+    with bind.begin() as connection:
+        connection.execute(
+            insert(Usuarios),
+            [
+                {"id_usuario": 1, "setor": "RH"},
+                {"id_usuario": 2, "setor": "TI"},
+                {"id_usuario": 3, "setor": None},
+            ],
+        )
+    return bind
+
+
+def test_buckets_start_on_mondays_and_first_days():
+    """Weeks start on Monday, months on their first day."""
+    day = date(2026, 3, 5)
+
+    assert bucket_start(day, GranularidadeEnum.DIA) == day
+    assert bucket_start(day, GranularidadeEnum.SEMANA) == date(2026, 3, 2)
+    assert bucket_start(day, GranularidadeEnum.MES) == date(2026, 3, 1)
+
+
+def test_counted_answers_match_a_rebuild(bind):
+    """Answers counted one transaction at a time give the buckets of a rebuild."""
+    rows = _rows()
+    with bind.begin() as connection:
+        add_answers_to_rollups(connection, rows[:1])
+        add_answers_to_rollups(connection, rows[1:])
+        add_answers_to_rollups(connection, [])
+        connection.execute(
+            insert(Respostas),
+            [
+                {
+                    **row,
+                    "dominancia": 25,
+                    "influencia": 25,
+                    "estabilidade": 25,
+                    "conformidade": 25,
+                }
+                for row in rows
+            ],
+        )
+    counted = _rollup(bind)
+
+    assert rebuild_answer_rollups(bind, days=1) == 4
+    assert _rollup(bind) == counted == {
+        (date(2026, 2, 27), "RH", "Processo seletivo", 1),
+        (date(2026, 3, 2), "RH", "Feedback", 1),
+        (date(2026, 3, 2), "TI", "Processo seletivo", 1),
+        (date(2026, 3, 3), "", "Processo seletivo", 1),
+    }
+
+
+def test_time_series_fill_the_empty_buckets(bind):
+    """Every bucket of the range is returned, grouped when asked."""
+    rows = _rows()
+    with bind.begin() as connection:
+        add_answers_to_rollups(connection, rows)
+
+    with bind.connect() as connection:
+        weeks = read_answers_timeseries(
+            connection,
+            date(2026, 2, 20),
+            date(2026, 3, 10),
+            GranularidadeEnum.SEMANA,
+            AgrupamentoEnum.SETOR,
+        )
+        days = read_answers_timeseries(
+            connection, date(2026, 3, 1), date(2026, 3, 3), GranularidadeEnum.DIA
+        )
+
+    assert weeks == [
+        {"inicio": date(2026, 2, 16), "total": 0, "grupos": {}},
+        {"inicio": date(2026, 2, 23), "total": 1, "grupos": {"RH": 1}},
+        {"inicio": date(2026, 3, 2), "total": 3, "grupos": {"RH": 1, "TI": 1, "": 1}},
+        {"inicio": date(2026, 3, 9), "total": 0, "grupos": {}},
+    ]
+    assert [(bucket["inicio"].day, bucket["total"]) for bucket in days] == [
+        (1, 0),
+        (2, 2),
+        (3, 1),
+    ]
+
+
+def test_submitted_answers_are_in_the_time_series(
+    client, auth_headers, query_budget, open_link, answer_link
+):
+    """A submitted answer is counted in its day, read with a single query."""
+    link = open_link(11)
+    answer = answer_link(link)
+    day = datetime.fromisoformat(answer["respondido_em"]).date()
+    with engine.connect() as connection:
+        answered = connection.execute(
+            text("SELECT COUNT(*) FROM respostas WHERE DATE(respondido_em) = :day"),
+            {"day": str(day)},
+        ).scalar()
+
+    timeseries = client.get(
+        "/answers/timeseries",
+        params={"start": str(day), "end": str(day)},
+        headers=auth_headers,
+    )
+
+    assert timeseries.status_code == 200, timeseries.text
+    query_budget(timeseries)
+    assert timeseries.json()["buckets"][0]["total"] == answered
+    assert client.get(
+        "/answers/timeseries",
+        params={"start": "2026-03-02", "end": "2026-03-01"},
+        headers=auth_headers,
+    ).status_code == 400
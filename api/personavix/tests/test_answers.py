@@ -0,0 +1,123 @@
+"""
+Module: test_answers.py
+
+This module tests the registration of answers: a single transaction writing the answer
+and answering its unique access link, and retried submissions of a link. It also tests
+the bound of the cache of the answers, and their conditional requests.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from personavix.src.cache.answers import answer_cache
+from personavix.src.cache.ttl_cache import TTLCache
+from personavix.src.database.database import engine
+from personavix.src.routes import answers
+
+SCORES = {"dominancia": 40, "influencia": 30, "estabilidade": 20, "conformidade": 10}
+
+
+def _state(link) -> tuple:
+    """Read the answers of the user of a link, and the answer of the link."""
+    with engine.connect() as connection:
+        count = connection.execute(
+            text("SELECT COUNT(*) FROM respostas WHERE id_usuario = :id_usuario"),
+            {"id_usuario": link.id_usuario},
+        ).scalar()
+        answered = connection.execute(
+            text(
+                "SELECT respondido, id_resposta, respondido_em FROM links_acesso_unico "
+                "WHERE id_sessao = :id_sessao"
+            ),
+            {"id_sessao": link.id_sessao},
+        ).one()
+    return count, tuple(answered)
+
+
+def test_retried_submissions_return_the_original_answer(
+    client, auth_headers, query_budget, open_link
+):
+    """A second submission for a link writes nothing and returns the first answer."""
+    link = open_link(7)
+    payload = {**SCORES, "motivo": "Processo seletivo", "id_sessao": link.id_sessao}
+    response = client.post(
+        f"/answers/{link.id_usuario}", json=payload, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    state = _state(link)
+    assert state[1][:2] == (1, response.json()["id_resposta"])
+
+    retry = client.post(
+        f"/answers/{link.id_usuario}",
+        json={**payload, "dominancia": 10, "conformidade": 40},
+        headers=auth_headers,
+    )
+
+    assert retry.status_code == 200, retry.text
+    assert retry.json() == response.json()
+    assert _state(link) == state
+    query_budget(retry, 2)
+
+
+def test_failed_submissions_leave_the_link_open(
+    client, auth_headers, monkeypatch, open_link
+):
+    """The answer and its link are written in one transaction, or not at all."""
+    link = open_link(8)
+    state = _state(link)
+
+    def fail(_db, _answers):
+        raise OperationalError("UPDATE", {}, Exception("server has gone away"))
+
+    monkeypatch.setattr(answers, "add_answers_to_rollups", fail)
+    response = client.post(
+        f"/answers/{link.id_usuario}",
+        json={**SCORES, "motivo": "Processo seletivo", "id_sessao": link.id_sessao},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 500
+    assert _state(link) == state
+
+
+def test_cached_answers_are_bounded_by_their_size(client, auth_headers, monkeypatch):
+    """Answers are evicted from the cache to keep their payloads within the bound."""
+    with engine.connect() as connection:
+        id_answers = connection.execute(
+            text("SELECT id_resposta FROM respostas ORDER BY id_resposta LIMIT 3")
+        ).scalars().all()
+    first = client.get(f"/answers/{id_answers[0]}", headers=auth_headers)
+    assert first.status_code == 200, first.text
+    maxbytes = int(2.5 * len(first.content))
+    monkeypatch.setattr(answer_cache, "local", TTLCache(10, 60, maxbytes))
+
+    for id_answer in id_answers:
+        response = client.get(f"/answers/{id_answer}", headers=auth_headers)
+        assert response.status_code == 200, response.text
+
+    assert answer_cache.local.get(str(id_answers[0])) is None
+    assert answer_cache.local.get(str(id_answers[2])) is not None
+    assert answer_cache.local.bytes <= maxbytes
+
+
+def test_unchanged_answers_are_not_sent_again(client, auth_headers):
+    """A request with the current ETag gets a 304 without a body, from the cache."""
+    with engine.connect() as connection:
+        id_answer = connection.execute(text("SELECT MAX(id_resposta) FROM respostas")).scalar()
+    response = client.get(f"/answers/{id_answer}", headers=auth_headers)
+    etag = response.headers["etag"]
+
+    for if_none_match in (etag, f'"other", W/{etag}', "*"):
+        conditional = client.get(
+            f"/answers/{id_answer}",
+            headers={**auth_headers, "If-None-Match": if_none_match},
+        )
+        assert conditional.status_code == 304
+        assert conditional.content == b""
+        assert conditional.headers["etag"] == etag
+        assert int(conditional.headers["x-db-queries"]) == 0
+
+    stale = client.get(
+        f"/answers/{id_answer}", headers={**auth_headers, "If-None-Match": '"other"'}
+    )
+    assert stale.status_code == 200 and stale.content == response.content
@@ -0,0 +1,202 @@
+"""
+Module: test_answers_queue.py
+
+This module tests the write-behind ingestion of answers: the claims of the flushers
+sharing a journal, the answers rejected by the database or undecodable, the errors of
+the journal, and the checks of the submissions before they are queued.
+"""
+
+# pylint: disable=import-error, redefined-outer-name, protected-access
+import sqlite3
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from personavix.src.database.database import engine
+from personavix.src.ingestion import answers_queue
+from personavix.src.ingestion.answers_queue import AnswersFlusher, AnswersQueue
+from personavix.src.models.schemas.answers import AnswersCreate
+from personavix.src.settings import settings
+
+SCORES = {"dominancia": 40, "influencia": 30, "estabilidade": 20, "conformidade": 10}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    """Open an empty journal."""
+    queue = AnswersQueue(str(tmp_path / "answers_queue.sqlite3"))
+    yield queue
+    queue.close()
+
+
+@pytest.fixture
+def id_user(client):
+    """Find a user of the dataset."""
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT MIN(id_usuario) FROM usuarios")).scalar()
+
+
+def _answer(motivo: str, id_session: int = None) -> AnswersCreate:
+    """Build a valid answer."""
+    return AnswersCreate(**SCORES, motivo=motivo, id_sessao=id_session)
+
+
+def _count_answers(motivo: str) -> int:
+    """Count the answers written with a reason."""
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT COUNT(*) FROM respostas WHERE motivo = :motivo"),
+            {"motivo": motivo},
+        ).scalar()
+
+
+def test_appending_a_session_twice_returns_the_first_receipt(journal, id_user):
+    """A retried submission of a session is not queued twice."""
+    first = journal.append(id_user, _answer("Fila", 999_001))
+    second = journal.append(id_user, _answer("Fila", 999_001))
+
+    assert second == first
+    assert journal.stats()[0] == 1
+
+
+def test_flushers_sharing_a_journal_never_claim_the_same_answers(journal, id_user):
+    """Each worker claims answers the others did not, until their claims expire."""
+    for _ in range(5):
+        journal.append(id_user, _answer("Fila compartilhada"))
+    other_worker = AnswersQueue(journal.path)
+    takeover = AnswersQueue(journal.path, claim_timeout=-1)
+
+    claimed = [entry["id"] for entry in journal.claim(3)]
+    claimed_by_other = [entry["id"] for entry in other_worker.claim(10)]
+
+    assert len(claimed) == 3 and len(claimed_by_other) == 2
+    assert not set(claimed) & set(claimed_by_other)
+    assert other_worker.claim(10) == []
+    assert len(takeover.claim(10)) == 5
+    other_worker.close()
+    takeover.close()
+
+
+def test_rejected_answers_do_not_hold_back_the_journal(journal, id_user):
+    """An answer the database rejects is set aside, the others are written."""
+    journal.append(id_user, _answer("Antes da rejeitada"))
+    rejected_answer = AnswersCreate.construct(
+        **{**SCORES, "dominancia": None}, motivo="Rejeitada", id_sessao=None
+    )
+    journal.append(id_user, rejected_answer)
+    journal.append(id_user, _answer("Depois da rejeitada"))
+
+    handled = AnswersFlusher(journal, batch_size=10, interval=1).flush()
+
+    assert handled == 3
+    assert journal.stats()[0] == 0
+    assert _count_answers("Antes da rejeitada") == 1
+    assert _count_answers("Depois da rejeitada") == 1
+    [rejected] = journal.rejected()
+    assert "NOT NULL" in rejected["erro"]
+
+
+def test_a_database_outage_releases_the_claims(journal, id_user, monkeypatch):
+    """Answers claimed while the database is down are flushed later."""
+    journal.append(id_user, _answer("Durante a queda"))
+
+    def fail(_bind, _entries):
+        raise OperationalError("INSERT", {}, Exception("server has gone away"))
+
+    monkeypatch.setattr(answers_queue, "write_answers_batch", fail)
+    assert AnswersFlusher(journal, batch_size=10, interval=1).flush() == 0
+    monkeypatch.undo()
+
+    assert AnswersFlusher(journal, batch_size=10, interval=1).flush() == 1
+    assert _count_answers("Durante a queda") == 1
+
+
+def test_undecodable_payloads_are_set_aside(journal, id_user):
+    """A corrupt payload of the journal is rejected, the other answers are written."""
+    journal.append(id_user, _answer("Antes da corrompida"))
+    corrupt = journal.append(id_user, _answer("Corrompida"))
+    with journal._lock:
+        journal._connection.execute(
+            "UPDATE respostas_pendentes SET payload = '{' WHERE receipt = ?",
+            (corrupt["receipt"],),
+        )
+
+    assert AnswersFlusher(journal, batch_size=10, interval=1).flush() == 2
+
+    assert _count_answers("Antes da corrompida") == 1
+    [rejected] = journal.rejected()
+    assert rejected["receipt"] == corrupt["receipt"]
+    assert journal.stats()[0] == 0
+
+
+def test_the_flusher_survives_errors_of_the_journal(journal, id_user, monkeypatch):
+    """A locked journal fails one flush, the next interval still flushes."""
+    journal.append(id_user, _answer("Diario bloqueado"))
+    claim = journal.claim
+    calls = []
+
+    def locked_once(limit):
+        calls.append(limit)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim(limit)
+
+    monkeypatch.setattr(journal, "claim", locked_once)
+    flusher = AnswersFlusher(journal, batch_size=10, interval=0.01)
+    flusher.start()
+    deadline = time.monotonic() + 5
+    while journal.stats()[0] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    alive = flusher.is_alive()
+    flusher.stop()
+
+    assert alive and len(calls) >= 2
+    assert _count_answers("Diario bloqueado") == 1
+
+
+@pytest.fixture
+def queue_mode(journal, monkeypatch):
+    """Queue the submitted answers in the journal."""
+    monkeypatch.setattr(settings, "ANSWERS_INGESTION_MODE", "queue")
+    monkeypatch.setattr(answers_queue, "_answers_queue", journal)
+    return journal
+
+
+def test_submissions_are_checked_before_being_queued(client, auth_headers, queue_mode):
+    """Unknown users and links are refused instead of being accepted with 202."""
+    payload = {**SCORES, "motivo": "Processo seletivo", "id_sessao": None}
+
+    response = client.post("/answers/999999", json=payload, headers=auth_headers)
+    assert response.status_code == 404
+
+    with engine.connect() as connection:
+        id_user = connection.execute(text("SELECT MIN(id_usuario) FROM usuarios")).scalar()
+    response = client.post(
+        f"/answers/{id_user}", json={**payload, "id_sessao": 999999}, headers=auth_headers
+    )
+    assert response.status_code == 404
+    assert queue_mode.stats()[0] == 0
+
+
+def test_retries_after_a_flush_return_the_original_answer(
+    client, auth_headers, queue_mode, open_link
+):
+    """A retried submission of an answered link gets the answer, not a new receipt."""
+    link = open_link(3)
+    payload = {**SCORES, "motivo": "Processo seletivo", "id_sessao": link.id_sessao}
+    path = f"/answers/{link.id_usuario}"
+
+    response = client.post(path, json=payload, headers=auth_headers)
+    assert response.status_code == 202, response.text
+    assert response.json()["id_sessao"] == link.id_sessao
+    AnswersFlusher(queue_mode, batch_size=10, interval=1).flush()
+
+    response = client.post(path, json=payload, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    with engine.connect() as connection:
+        id_answer = connection.execute(
+            text("SELECT id_resposta FROM links_acesso_unico WHERE id_sessao = :id"),
+            {"id": link.id_sessao},
+        ).scalar()
+    assert response.json()["id_resposta"] == id_answer
+    assert queue_mode.stats()[0] == 0
@@ -0,0 +1,109 @@
+"""
+Module: test_current_profiles.py
+
+This module tests the perfil_atual projection: its rebuild from the answers, upserts
+never replacing a newer answer, and its update by the submitted answers.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, insert, select
+from personavix.src.database.schema import prepare_schema
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.current_profiles import PerfilAtual
+from personavix.src.models.domain.users import Usuarios
+from personavix.src.projections.current_profiles import (
+    rebuild_current_profiles,
+    refresh_current_profiles,
+    upsert_current_profiles,
+)
+
+ANSWERED_AT = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _answer(id_answer: int, id_user: int, dominance: float) -> dict:
+    """Build an answer row of a user, submitted a day after the previous id."""
+    return {
+        "id_resposta": id_answer,
+        "id_usuario": id_user,
+        "dominancia": dominance,
+        "influencia": 100 - dominance,
+        "estabilidade": 0,
+        "conformidade": 0,
+        "motivo": "Processo seletivo",
+        "respondido_em": ANSWERED_AT + timedelta(days=id_answer),
+    }
+
+
+def _profiles(bind) -> dict:
+    """Read the projection, as the id of the answer and dominance of each user."""
+    with bind.connect() as connection:
+        rows = connection.execute(
+            select(PerfilAtual.id_usuario, PerfilAtual.id_resposta, PerfilAtual.dominancia)
+        ).all()
+    return {row.id_usuario: (row.id_resposta, row.dominancia) for row in rows}
+
+
+@pytest.fixture
+def bind(tmp_path):
+    """A fresh database with four users, three of them with answers."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'profiles.db'}")
+    prepare_schema(bind, "create")
+    with bind.begin() as connection:
+        connection.execute(
+            insert(Usuarios), [{"id_usuario": id_user} for id_user in range(1, 5)]
+        )
+        connection.execute(
+            insert(Respostas),
+            [
+                _answer(1, 1, 10),
+                _answer(2, 2, 20),
+                _answer(3, 1, 30),
+                _answer(4, 3, 40),
+                _answer(5, 1, 50),
+            ],
+        )
+    return bind
+
+
+def test_the_rebuild_keeps_the_latest_answer_of_each_user(bind):
+    """Each user with answers gets the one with the highest id, in every batch size."""
+    assert rebuild_current_profiles(bind, batch_size=1) == 3
+    assert _profiles(bind) == {1: (5, 50), 2: (2, 20), 3: (4, 40)}
+
+    assert rebuild_current_profiles(bind) == 3
+    assert _profiles(bind) == {1: (5, 50), 2: (2, 20), 3: (4, 40)}
+
+
+def test_older_answers_never_replace_newer_ones(bind):
+    """An upsert replaces the profile of a user only with a newer answer."""
+    rebuild_current_profiles(bind)
+
+    with bind.begin() as connection:
+        upsert_current_profiles(connection, [_answer(3, 1, 30), _answer(2, 2, 20)])
+    assert _profiles(bind)[1] == (5, 50)
+
+    with bind.begin() as connection:
+        connection.execute(insert(Respostas), [_answer(6, 2, 60), _answer(7, 4, 70)])
+        assert refresh_current_profiles(connection, [2, 4]) == 2
+        assert refresh_current_profiles(connection, []) == 0
+    assert _profiles(bind) == {1: (5, 50), 2: (6, 60), 3: (4, 40), 4: (7, 70)}
+
+
+def test_submitted_answers_update_the_profiles(
+    client, auth_headers, query_budget, open_link, answer_link
+):
+    """A submitted answer is the current profile of its user, in a single query."""
+    link = open_link(10)
+    answer = answer_link(link)
+
+    profiles = client.get("/users/profiles", headers=auth_headers)
+
+    assert profiles.status_code == 200
+    query_budget(profiles)
+    profile = next(
+        profile for profile in profiles.json() if profile["id_usuario"] == link.id_usuario
+    )
+    assert profile["id_resposta"] == answer["id_resposta"]
+    assert profile["dominancia"] == 25
@@ -0,0 +1,56 @@
+"""
+Module: test_dashboard.py
+
+This module tests the dashboard of the admin landing page against the seeded dataset.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy import text
+from personavix.src.cache.dashboard import dashboard_cache
+from personavix.src.database.database import engine
+from personavix.src.settings import settings
+
+
+def test_dashboard_matches_the_database(client, auth_headers, query_budget):
+    """The counts and latest answers are computed with a few aggregate queries."""
+    dashboard_cache.clear_local()
+    with engine.connect() as connection:
+        links = connection.execute(
+            text(
+                "SELECT count(*), sum(respondido = 1), "
+                "sum(respondido = 0 AND expirado_em IS NOT NULL) FROM links_acesso_unico"
+            )
+        ).one()
+        users = connection.execute(
+            text("SELECT permissao, count(*) FROM usuarios GROUP BY permissao")
+        ).all()
+        latest = connection.execute(
+            text("SELECT id_resposta FROM respostas ORDER BY id_resposta DESC LIMIT :n"),
+            {"n": settings.DASHBOARD_LATEST_ANSWERS},
+        ).scalars()
+
+    response = client.get("/dashboard/", headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["links"] == {
+        "total": links[0],
+        "respondidos": links[1],
+        "pendentes": links[0] - links[1] - links[2],
+        "expirados": links[2],
+    }
+    assert {row["permissao"]: row["total"] for row in body["usuarios"]} == dict(users)
+    assert [answer["id_resposta"] for answer in body["ultimas_respostas"]] == list(
+        latest
+    )
+    assert query_budget(response) == 3
+
+
+def test_dashboard_is_served_from_the_cache(client, auth_headers):
+    """A second request within DASHBOARD_CACHE_TTL runs no query at all."""
+    client.get("/dashboard/", headers=auth_headers)
+
+    response = client.get("/dashboard/", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["x-db-queries"] == "0"
@@ -0,0 +1,94 @@
+"""
+Module: test_generate_dataset.py
+
+This module tests the synthetic dataset of the benchmarks: its determinism, the
+consistency of the answers with their links, and its bulk load.
+"""
+
+# pylint: disable=import-error
+import argparse
+import random
+from sqlalchemy import create_engine, func, select
+from personavix.benchmarks.generate_dataset import (
+    QUESTIONS_COUNT,
+    generate_answers_and_links,
+    generate_users,
+    load_dataset,
+)
+from personavix.src.database.schema import prepare_schema
+from personavix.src.models.domain.answers import Respostas
+from personavix.src.models.domain.unique_access_links import LinksAcessoUnico
+
+FACTORS = ("dominancia", "influencia", "estabilidade", "conformidade")
+
+
+def _arguments(**overrides) -> argparse.Namespace:
+    """Build the arguments of a small dataset, with the first ids resolved."""
+    arguments = {
+        "seed": 7,
+        "users": 20,
+        "answers": 60,
+        "links": 30,
+        "answered_ratio": 0.5,
+        "batch_size": 16,
+        "password_hash": "hash",
+        "first_user_id": 1,
+        "first_answer_id": 1,
+        "first_link_id": 1,
+    }
+    return argparse.Namespace(**{**arguments, **overrides})
+
+
+def _generate(args: argparse.Namespace) -> tuple[list, list, list]:
+    """Generate the users, answers and links of a dataset."""
+    rng = random.Random(args.seed)
+    users = list(generate_users(rng, args.first_user_id, args.users, args.password_hash))
+    rows = list(
+        generate_answers_and_links(rng, args, [user["criado_em"] for user in users])
+    )
+    answers = [row for table, row in rows if table == "respostas"]
+    links = [row for table, row in rows if table == "links_acesso_unico"]
+    return users, answers, links
+
+
+def test_the_same_seed_generates_the_same_rows():
+    """A seed always generates the same dataset, another seed a different one."""
+    assert _generate(_arguments()) == _generate(_arguments())
+    assert _generate(_arguments()) != _generate(_arguments(seed=8))
+
+
+def test_answers_are_consistent_with_their_links():
+    """Answered links point to an answer of their user, submitted after creation."""
+    users, answers, links = _generate(_arguments())
+    answers_by_id = {answer["id_resposta"]: answer for answer in answers}
+    answered = [link for link in links if link["respondido"]]
+
+    assert len(users) == 20 and len(answers) == 60 and len(links) == 30
+    assert len(answered) == 15
+    assert [link["id_sessao"] for link in links] == list(range(1, 31))
+    for link in answered:
+        answer = answers_by_id[link["id_resposta"]]
+        assert link["id_usuario"] == answer["id_usuario"]
+        assert link["criado_em"] <= link["respondido_em"] == answer["respondido_em"]
+    for answer in answers:
+        scores = [answer[factor] for factor in FACTORS]
+        assert sum(scores) == 100
+        assert all(score * QUESTIONS_COUNT % 100 == 0 for score in scores)
+
+
+def test_datasets_are_loaded_after_the_existing_rows(tmp_path):
+    """A second load adds its rows after the first one, with the questionary once."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'dataset.db'}")
+    prepare_schema(bind, "create")
+
+    first = load_dataset(bind, _arguments())
+    second = load_dataset(bind, _arguments())
+
+    assert first["usuarios"] == 20 and first["respostas"] == 60
+    assert first["perguntas"] == QUESTIONS_COUNT and "perguntas" not in second
+    with bind.connect() as connection:
+        # pylint: disable=not-callable
+        assert connection.execute(select(func.count(Respostas.id_resposta))).scalar() == 120
+        assert connection.execute(
+            select(func.max(LinksAcessoUnico.id_sessao))
+        ).scalar() == 60
@@ -0,0 +1,124 @@
+"""
+Module: test_link_events.py
+
+This module tests the Server-Sent Events of the status of the unique access links: the
+format of the events, the resync of slow subscribers, and the end of the streams.
+"""
+
+# pylint: disable=import-error
+import asyncio
+import json
+from datetime import datetime
+from personavix.src.events.link_status import (
+    LinkStatusSubscription,
+    link_status_broker,
+    publish_link_status,
+    stream_link_status,
+)
+from personavix.src.settings import settings
+
+
+class FakeRequest:  # pylint: disable=too-few-public-methods
+    """A request whose client disconnects when told to."""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        """Tell whether the client went away."""
+        return self.disconnected
+
+
+def _parse(message: str) -> dict:
+    """Parse a Server-Sent Event into its fields."""
+    assert message.endswith("\n\n")
+    return dict(line.split(": ", 1) for line in message.strip("\n").split("\n"))
+
+
+def test_answered_links_are_streamed_as_events():
+    """Each answered link is an event with an id, a type and JSON data."""
+
+    async def scenario():
+        subscription = link_status_broker.subscribe()
+        stream = stream_link_status(FakeRequest(), subscription)
+        assert await anext(stream) == "retry: 5000\n\n"
+
+        publish_link_status(
+            [
+                {
+                    "id_sessao": 12,
+                    "id_resposta": 34,
+                    "respondido_em": datetime(2026, 3, 4, 5, 6, 7),
+                }
+            ]
+        )
+        event = _parse(await anext(stream))
+        await stream.aclose()
+        return event
+
+    event = asyncio.run(scenario())
+
+    assert int(event["id"]) >= 1
+    assert event["event"] == "link_status"
+    assert json.loads(event["data"]) == {
+        "id_sessao": 12,
+        "respondido": 1,
+        "id_resposta": 34,
+        "respondido_em": "2026-03-04T05:06:07",
+    }
+    assert not link_status_broker.has_subscribers()
+
+
+def test_slow_subscribers_are_told_to_resync():
+    """A subscriber which lost events gets a resync event, then the newest ones."""
+
+    async def scenario():
+        subscription = LinkStatusSubscription(asyncio.get_running_loop(), 1)
+        for event_id in (1, 2):
+            subscription.push((event_id, {"id_sessao": event_id}))
+        stream = stream_link_status(FakeRequest(), subscription)
+        messages = [await anext(stream) for _ in range(3)]
+        await stream.aclose()
+        return messages
+
+    _, resync, event = asyncio.run(scenario())
+
+    assert resync == "event: resync\ndata: {}\n\n"
+    assert _parse(event)["id"] == "2"
+
+
+def test_streams_end_when_the_client_disconnects(monkeypatch):
+    """The stream sends keep-alives, and ends and unsubscribes on disconnect."""
+    monkeypatch.setattr(settings, "LINK_EVENTS_HEARTBEAT", 0.01)
+
+    async def scenario():
+        request = FakeRequest()
+        stream = stream_link_status(request, link_status_broker.subscribe())
+        messages = [await anext(stream), await anext(stream)]
+        request.disconnected = True
+        return messages + [message async for message in stream]
+
+    assert asyncio.run(scenario()) == ["retry: 5000\n\n", ": keep-alive\n\n"]
+    assert not link_status_broker.has_subscribers()
+
+
+def test_streams_end_when_the_broker_closes():
+    """Closing the broker, when the API stops, ends the open streams."""
+
+    async def scenario():
+        stream = stream_link_status(FakeRequest(), link_status_broker.subscribe())
+        await anext(stream)
+        link_status_broker.close()
+        return [message async for message in stream]
+
+    assert asyncio.run(scenario()) == []
+    assert not link_status_broker.has_subscribers()
+
+
+def test_streams_are_refused_over_the_limit(client, auth_headers, monkeypatch):
+    """Streams over LINK_EVENTS_MAX_SUBSCRIBERS are refused with 503."""
+    monkeypatch.setattr(link_status_broker, "max_subscribers", 0)
+
+    response = client.get("/unique-access-links/events", headers=auth_headers)
+
+    assert response.status_code == 503
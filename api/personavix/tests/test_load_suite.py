@@ -0,0 +1,90 @@
+"""
+Module: test_load_suite.py
+
+This module tests the load benchmark suite: its percentiles, the candidate and manager
+flows run against the app, and the comparison of two results.
+"""
+
+# pylint: disable=import-error, protected-access
+import argparse
+import asyncio
+import httpx
+from sqlalchemy import event
+from personavix.benchmarks import load_suite
+from personavix.main import app
+from personavix.src.database.database import engine
+
+PASSWORD = "benchmark"
+
+
+def test_percentiles_use_the_nearest_rank():
+    """A percentile is a measured value, the smallest covering its rank."""
+    values = [float(value) for value in range(1, 11)]
+
+    assert load_suite.percentile(values, 50) == 5.0
+    assert load_suite.percentile(values, 95) == 10.0
+    assert load_suite.percentile(values, 0) == 1.0
+    assert load_suite.percentile([], 99) == 0.0
+
+
+def test_flows_report_each_step(client):
+    """The flows run against the app, and report the queries of each step."""
+    candidates, admin = load_suite.load_actors(2)
+    args = argparse.Namespace(concurrency=2, password=PASSWORD)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=load_suite.QueryCountingApp(app))
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as http:
+            return (
+                await load_suite._run_flow(
+                    load_suite._candidate_flow, http, candidates, args
+                ),
+                await load_suite._run_flow(load_suite._manager_flow, http, [admin], args),
+            )
+
+    event.listen(engine, "before_cursor_execute", load_suite._count_query)
+    try:
+        candidate, manager = asyncio.run(scenario())
+    finally:
+        event.remove(engine, "before_cursor_execute", load_suite._count_query)
+
+    assert list(candidate["steps"]) == [
+        "link_lookup",
+        "link_login",
+        "questionary",
+        "answer_submission",
+    ]
+    assert list(manager["steps"]) == ["login", "answers_listing", "users_listing"]
+    for summary, runs in ((candidate, 2), (manager, 1)):
+        for step in summary["steps"].values():
+            assert (step["requests"], step["errors"]) == (runs, 0)
+            assert step["db_queries_per_request"] is not None
+            assert step["p50_ms"] <= step["p95_ms"] <= step["p99_ms"]
+
+
+def test_results_are_compared_step_by_step(capsys):
+    """The comparison prints the p95 and throughput of the steps of both results."""
+    previous = {
+        "commit": "abc",
+        "flows": {"manager": {"steps": {"login": {"p95_ms": 12.0, "rps": 40.0}}}},
+    }
+    current = {
+        "commit": "def",
+        "flows": {
+            "manager": {
+                "steps": {
+                    "login": {"p95_ms": 9.5, "rps": 52.0},
+                    "users_listing": {"p95_ms": 30.0, "rps": 10.0},
+                }
+            }
+        },
+    }
+
+    load_suite.compare_results(previous, current)
+
+    assert capsys.readouterr().out.splitlines() == [
+        "Comparing abc -> def",
+        "manager.login: p95 12.0 -> 9.5 ms, rps 40.0 -> 52.0",
+    ]
@@ -0,0 +1,63 @@
+"""
+Module: test_micro_benchmarks.py
+
+This module tests the micro-benchmarks: their cases, the calibration of the measures,
+and the regression gate against the baselines.
+"""
+
+# pylint: disable=import-error
+import json
+import pytest
+from personavix.benchmarks import micro_benchmarks
+
+
+def test_every_case_runs():
+    """Each case calls its primitive without failing."""
+    cases = micro_benchmarks.build_cases()
+
+    assert any(name.startswith("serialize_answers_with_user") for name in cases)
+    for case in cases.values():
+        case()
+
+
+def test_rounds_are_calibrated_to_the_minimum_time():
+    """A fast case is called in loops long enough to be timed."""
+    result = micro_benchmarks.measure(lambda: sum(range(100)), rounds=3, min_time=0.01)
+
+    assert result["loops"] > 1
+    assert 0 < result["min_s"] <= result["median_s"] <= result["max_s"]
+
+
+def test_regressions_are_cases_slower_than_their_threshold():
+    """The default threshold applies, unless a baseline sets its own."""
+    results = {
+        "fast": {"median_s": 1.1},
+        "slow": {"median_s": 1.5},
+        "tolerant": {"median_s": 1.5},
+        "new": {"median_s": 9.0},
+    }
+    baselines = {
+        "fast": {"median_s": 1.0},
+        "slow": {"median_s": 1.0},
+        "tolerant": {"median_s": 1.0, "threshold": 2.0},
+    }
+
+    assert micro_benchmarks.check_regressions(results, baselines, 1.25) == ["slow"]
+    assert results["slow"]["ratio"] == 1.5
+    assert "ratio" not in results["new"]
+
+
+def test_the_gate_fails_on_regressions(tmp_path, monkeypatch):
+    """Saved baselines pass the next run, a slower baseline ratio exits with 1."""
+    monkeypatch.setattr(micro_benchmarks, "build_cases", lambda: {"noop": lambda: None})
+    baselines = tmp_path / "baselines.json"
+    arguments = ["--rounds", "2", "--min-time", "0.001", "--baselines", str(baselines)]
+
+    micro_benchmarks.main(arguments + ["--save-baseline"])
+    assert set(json.loads(baselines.read_text(encoding="utf-8"))) == {"noop"}
+    micro_benchmarks.main(arguments + ["--threshold", "1000"])
+
+    baselines.write_text(json.dumps({"noop": {"median_s": 1e-12}}), encoding="utf-8")
+    with pytest.raises(SystemExit) as exit_info:
+        micro_benchmarks.main(arguments)
+    assert exit_info.value.code == 1
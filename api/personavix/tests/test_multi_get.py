@@ -0,0 +1,58 @@
+"""
+Module: test_multi_get.py
+
+This module tests fetching users and answers by id with the ids= parameter.
+"""
+
+# pylint: disable=import-error
+import pytest
+from personavix.src.settings import settings
+
+MISSING_ID = 999_999
+
+
+@pytest.mark.parametrize(
+    "path, key", (("/users/", "id_usuario"), ("/answers/", "id_resposta"))
+)
+def test_ids_are_returned_in_order_with_missing_ids(
+    client, auth_headers, query_budget, path, key
+):
+    """The rows come back in the order asked, once each, in a single query."""
+    response = client.get(
+        path, params={"ids": f"3,{MISSING_ID},1,2,3"}, headers=auth_headers
+    )
+
+    assert response.status_code == 200, response.text
+    assert [item[key] for item in response.json()] == [3, 1, 2]
+    assert response.headers["x-missing-ids"] == str(MISSING_ID)
+    assert query_budget(response) == 1
+
+
+def test_ids_combine_with_fields(client, auth_headers):
+    """The ids parameter narrows the rows, the fields parameter their fields."""
+    response = client.get(
+        "/answers/",
+        params={"ids": "2,1", "fields": "id_resposta,usuarios_.nome"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert [set(item) for item in response.json()] == [{"id_resposta", "usuarios_"}] * 2
+    assert response.headers["x-missing-ids"] == ""
+
+
+@pytest.mark.parametrize("ids", ("1,a", "", "0,1", "-1"))
+def test_invalid_ids_are_rejected(client, auth_headers, ids):
+    """Ids must be positive integers."""
+    response = client.get("/users/", params={"ids": ids}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_too_many_ids_are_rejected(client, auth_headers):
+    """A batch holds at most MULTI_GET_MAX_IDS ids."""
+    ids = ",".join(str(id_) for id_ in range(1, settings.MULTI_GET_MAX_IDS + 2))
+
+    response = client.get("/answers/", params={"ids": ids}, headers=auth_headers)
+
+    assert response.status_code == 400
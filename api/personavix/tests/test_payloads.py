@@ -0,0 +1,96 @@
+"""
+Module: test_payloads.py
+
+This module tests the size of the list responses: the sparse fieldsets narrowing the
+fields and the columns loaded, and the negotiated compression of large bodies.
+"""
+
+# pylint: disable=import-error
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from personavix.src.database.database import read_engine
+from personavix.src.dependencies.sparse_fields import parse_fields
+from personavix.src.middleware import compression
+from personavix.src.middleware.compression import choose_encoding
+from personavix.src.models.schemas.answers import AnswersWithUser
+
+
+def test_fields_are_parsed_against_the_schema():
+    """Nested fields are selected with a dot, a whole nested schema wins."""
+    assert parse_fields(None, AnswersWithUser) is None
+    assert parse_fields("dominancia, id_resposta,,usuarios_.nome", AnswersWithUser) == (
+        ("dominancia", None),
+        ("id_resposta", None),
+        ("usuarios_", (("nome", None),)),
+    )
+    assert parse_fields("usuarios_.nome,usuarios_", AnswersWithUser) == (
+        ("usuarios_", None),
+    )
+    for fields in ("senha_hash", "usuarios_.senha_hash", "dominancia.nome"):
+        with pytest.raises(HTTPException) as error:
+            parse_fields(fields, AnswersWithUser)
+        assert error.value.status_code == 400
+
+
+def test_encodings_are_negotiated(monkeypatch):
+    """Brotli is preferred when installed, and refused codings are never used."""
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("*;q=0.1") == "br"
+
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("gzip;q=0, *") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+
+def test_sparse_listings_load_only_the_selected_columns(
+    client, auth_headers, query_budget
+):
+    """The response and the query only hold the selected fields, in one statement."""
+    statements = []
+
+    def record(_connection, _cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(read_engine, "before_cursor_execute", record)
+    try:
+        response = client.get(
+            "/answers/",
+            params={"fields": "id_resposta,usuarios_.nome"},
+            headers=auth_headers,
+        )
+    finally:
+        event.remove(read_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200, response.text
+    query_budget(response)
+    assert response.json()
+    assert all(set(answer) == {"id_resposta", "usuarios_"} for answer in response.json())
+    assert all(set(answer["usuarios_"]) == {"nome"} for answer in response.json())
+    listing = next(statement for statement in statements if "FROM respostas" in statement)
+    assert "dominancia" not in listing and "email" not in listing
+    assert client.get(
+        "/answers/", params={"fields": "senha"}, headers=auth_headers
+    ).status_code == 400
+
+
+def test_large_responses_are_compressed(client, auth_headers):
+    """Large bodies are gzipped when accepted, small ones are sent as they are."""
+    plain = client.get("/answers/", headers={**auth_headers, "Accept-Encoding": "identity"})
+    compressed = client.get("/answers/", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    small = client.get(
+        "/answers/",
+        params={"ids": "1"},
+        headers={**auth_headers, "Accept-Encoding": "gzip"},
+    )
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["vary"]
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    assert compressed.json() == plain.json()
+    assert small.status_code == 200 and "content-encoding" not in small.headers
@@ -0,0 +1,66 @@
+"""
+Module: test_query_budget.py
+
+This module checks that the read routes of the API stay within their query budgets,
+so a lazily loaded relationship or a query added in a loop fails the tests instead of
+slowing production down.
+"""
+
+# pylint: disable=import-error
+import pytest
+from sqlalchemy import text
+from personavix.src.database.database import engine
+
+BUDGETED_ROUTES = (
+    "/answers/",
+    "/answers/?fields=id_resposta,usuarios_.nome",
+    "/answers/timeseries",
+    "/answers/1",
+    "/users/",
+    "/users/profiles",
+    "/users/search?q=ana",
+    "/unique-access-links/",
+    "/questionary/",
+)
+
+
+@pytest.mark.parametrize("path", BUDGETED_ROUTES)
+def test_read_routes_stay_within_their_budget(client, auth_headers, query_budget, path):
+    """Each read route runs no more statements than it declares."""
+    response = client.get(path, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    query_budget(response)
+
+
+def test_link_lookup_runs_a_single_statement(client, query_budget):
+    """The lookup of a link, hit by every respondent, is a single joined query."""
+    with engine.connect() as connection:
+        link = connection.execute(
+            text("SELECT link FROM links_acesso_unico WHERE expirado_em IS NULL LIMIT 1")
+        ).scalar()
+
+    response = client.get(f"/unique-access-links/{link}")
+
+    assert response.status_code == 200, response.text
+    assert query_budget(response, budget=1) == 1
+
+
+def test_failed_login_stays_within_budget(client, query_budget):
+    """A failed login reads the user once and writes nothing."""
+    response = client.post(
+        "/users/login", json={"email": "nobody@example.com", "senha": "wrong-password"}
+    )
+
+    assert response.status_code == 401
+    query_budget(response)
+
+
+def test_queries_are_not_counted_outside_debug(client, auth_headers, monkeypatch):
+    """The statement counts are only sent back in DEBUG mode."""
+    monkeypatch.setattr("personavix.src.settings.settings.DEBUG", False)
+
+    response = client.get("/users/", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert "x-db-queries" not in response.headers
@@ -0,0 +1,99 @@
+"""
+Module: test_rate_limit.py
+
+This module tests the rate limiter of the login and public link routes: the 429 with
+Retry-After of an empty bucket, and the refill of the buckets.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+import time
+import uuid
+import pytest
+from personavix.src.dependencies import rate_limit
+from personavix.src.rate_limit import token_bucket
+from personavix.src.rate_limit.token_bucket import (
+    LocalTokenBuckets,
+    Rate,
+    RedisTokenBuckets,
+    parse_rate,
+)
+from personavix.src.settings import settings
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """
+    Rate limit the routes with empty buckets.
+
+    The fixture is a function setting the rates of the client IP and of the target of
+    an endpoint.
+    """
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(token_bucket, "_token_buckets", LocalTokenBuckets(1000))
+
+    def limit(endpoint: str, ip_rate: Rate, target_rate: Rate = None):
+        monkeypatch.setitem(rate_limit.ENDPOINT_RATES, endpoint, (ip_rate, target_rate))
+
+    return limit
+
+
+def _login(client, email: str):
+    """Attempt a login with a wrong password."""
+    return client.post("/users/login", json={"email": email, "senha": "wrong-password"})
+
+
+def test_rates_are_parsed():
+    """A rate holds its count of tokens, refilled over its period."""
+    assert parse_rate("20/minute") == Rate(20, 20 / 60)
+    with pytest.raises(ValueError):
+        parse_rate("20/fortnight")
+
+
+def test_exceeding_the_limit_of_an_account_returns_429(client, limited):
+    """Once the bucket of an account is empty, its logins get 429 and Retry-After."""
+    limited("users_login", Rate(100, 100), Rate(2, 1 / 60))
+    email = f"{uuid.uuid4().hex}@example.com"
+
+    assert all(_login(client, email).status_code != 429 for _ in range(2))
+    response = _login(client, email)
+
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    assert _login(client, f"{uuid.uuid4().hex}@example.com").status_code != 429
+
+
+def test_the_limit_resets_once_the_bucket_refills(client, limited):
+    """A client rejected by the limit is let through after Retry-After."""
+    limited("link_lookup", Rate(1, 10))
+
+    assert client.get("/unique-access-links/unknown-link").status_code == 404
+    response = client.get("/unique-access-links/unknown-link")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    time.sleep(0.15)
+    assert client.get("/unique-access-links/unknown-link").status_code == 404
+
+
+def test_buckets_refill_at_their_rate():
+    """A bucket refills one token per period of its rate, up to its capacity."""
+    buckets = LocalTokenBuckets(10)
+    rate = Rate(2, 20)
+
+    assert buckets.take("key", rate) == (True, 0.0)
+    assert buckets.take("key", rate) == (True, 0.0)
+    allowed, retry_after = buckets.take("key", rate)
+    assert not allowed and 0 < retry_after <= 0.05
+
+    time.sleep(0.06)
+    assert buckets.take("key", rate)[0]
+    assert not buckets.take("key", rate)[0]
+
+
+def test_an_outage_of_redis_falls_back_to_local_buckets():
+    """Logins are still limited, per worker, while Redis is unreachable."""
+    buckets = RedisTokenBuckets("redis://127.0.0.1:1/0", LocalTokenBuckets(10))
+    rate = Rate(1, 1 / 60)
+
+    assert buckets.take("key", rate) == (True, 0.0)
+    assert not buckets.take("key", rate)[0]
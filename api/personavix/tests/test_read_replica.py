@@ -0,0 +1,85 @@
+"""
+Module: test_read_replica.py
+
+This module tests the routing of reads to the read replica, and the reads of a client
+going to the primary right after it wrote.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+import time
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from personavix.src.database import database
+from personavix.src.middleware.read_your_writes import LAST_WRITE_HEADER
+
+PASSWORD = "benchmark"
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """
+    Route reads as if a replica was configured.
+
+    The sessions of the replica stay bound to the test database, only the engine
+    deciding the routing is replaced.
+    """
+    monkeypatch.setattr(database, "read_engine", create_engine("sqlite://"))
+
+
+def _read_sessions(target: str) -> float:
+    """Count the read sessions opened on a database."""
+    return REGISTRY.get_sample_value(
+        "personavix_read_sessions_total", {"target": target}
+    ) or 0
+
+
+def test_reads_go_to_the_replica(client, auth_headers, replica):
+    """A client which did not write recently reads from the replica."""
+    before = _read_sessions("replica")
+
+    response = client.get(
+        "/users/profiles", headers={**auth_headers, LAST_WRITE_HEADER: "0"}
+    )
+
+    assert response.status_code == 200, response.text
+    assert _read_sessions("replica") == before + 1
+
+
+def test_reads_after_a_write_go_to_the_primary(client, auth_headers, replica):
+    """A client which just wrote reads its own writes from the primary."""
+    before = _read_sessions("replica"), _read_sessions("primary")
+
+    response = client.get(
+        "/users/profiles",
+        headers={**auth_headers, LAST_WRITE_HEADER: f"{time.time():.3f}"},
+    )
+
+    assert response.status_code == 200, response.text
+    assert (_read_sessions("replica"), _read_sessions("primary")) == (
+        before[0],
+        before[1] + 1,
+    )
+
+
+def test_writes_are_stamped(client, auth_headers):
+    """Successful writes carry their time, failed ones and reads do not."""
+    response = client.get("/users/profiles", headers=auth_headers)
+    assert LAST_WRITE_HEADER not in response.headers
+
+    response = client.post(
+        "/users/login", json={"email": "nobody@example.com", "senha": PASSWORD}
+    )
+    assert response.status_code >= 400
+    assert LAST_WRITE_HEADER not in response.headers
+
+    with database.engine.connect() as connection:
+        email = connection.execute(
+            text(
+                "SELECT email FROM usuarios WHERE flag_acesso = 1 "
+                "AND email IS NOT NULL AND senha_hash IS NOT NULL LIMIT 1"
+            )
+        ).scalar()
+    response = client.post("/users/login", json={"email": email, "senha": PASSWORD})
+    assert response.status_code == 200, response.text
+    assert abs(float(response.headers[LAST_WRITE_HEADER]) - time.time()) < 5
@@ -0,0 +1,177 @@
+"""
+Module: test_reports.py
+
+This module tests the DISC reports: their rendering, the disk cache of the rendered
+reports, the deduplicated renderings, and the report route.
+"""
+
+# pylint: disable=import-error, redefined-outer-name, protected-access
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from personavix.src.cache.disk_cache import DiskCache
+from personavix.src.database.database import engine
+from personavix.src.reports import renderer
+from personavix.src.reports.disc_report import render_disc_report
+from personavix.src.reports.renderer import ReportRenderer
+
+ANSWER = {
+    "id_resposta": 12,
+    "id_usuario": 3,
+    "dominancia": 20,
+    "influencia": 45,
+    "estabilidade": 20,
+    "conformidade": 15,
+    "motivo": "Processo seletivo",
+    "respondido_em": datetime(2026, 3, 4, 5, 6, 7),
+    "nome": "Ana <script>",
+}
+
+
+@pytest.fixture
+def report_renderer(tmp_path, monkeypatch):
+    """A renderer of the process caching its reports in a temporary directory."""
+    report_renderer = ReportRenderer(DiskCache(tmp_path, 1024**2), 1, 60)
+    monkeypatch.setattr(renderer, "_report_renderer", report_renderer)
+    yield report_renderer
+    report_renderer.shutdown()
+
+
+def _wait_for_renderings(report_renderer: ReportRenderer) -> None:
+    """Wait for the callbacks caching the renderings, run after their results."""
+    deadline = time.monotonic() + 5
+    while report_renderer._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _cached_reports(report_renderer: ReportRenderer) -> list[bytes]:
+    """Read the reports of the disk cache."""
+    return [path.read_bytes() for path in report_renderer.cache._files()]
+
+
+def test_reports_render_the_answer():
+    """The report holds the chart, the main factor and the escaped user input."""
+    report = render_disc_report(ANSWER, {"Influência": ["Comunicativo"]}).decode("utf-8")
+
+    assert "<svg" in report
+    assert 'Fator predominante: <strong style="color:#f0ad4e">Influência' in report
+    assert "<li>Comunicativo</li>" in report
+    assert "Ana &lt;script&gt;" in report and "<script>" not in report
+
+
+def test_the_disk_cache_evicts_the_least_recently_used_files(tmp_path):
+    """Files over max_bytes are evicted by last use, and values too large not stored."""
+    cache = DiskCache(tmp_path, 10)
+    cache.set("a", b"1234")
+    cache.set("b", b"5678")
+    os.utime(tmp_path / "b", (0, 0))
+    assert cache.get("a") == b"1234"
+
+    cache.set("c", b"9012")
+    cache.set("huge", b"x" * 11)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (b"1234", None, b"9012")
+    assert cache.get("huge") is None
+    assert DiskCache(tmp_path, 10)._size == 8
+
+
+def test_concurrent_renderings_of_a_report_are_shared(report_renderer, monkeypatch):
+    """Requests for a report being rendered wait for it, and it is then cached."""
+    started, release = threading.Event(), threading.Event()
+    renderings = []
+
+    def render(answer, _characteristics):
+        renderings.append(answer["id_resposta"])
+        started.set()
+        release.wait(5)
+        return b"report"
+
+    monkeypatch.setattr(renderer, "render_disc_report", render)
+    report_renderer._executor = ThreadPoolExecutor(2)
+
+    with ThreadPoolExecutor(3) as requests:
+        first = requests.submit(report_renderer.render, ANSWER, {})
+        started.wait(5)
+        others = [requests.submit(report_renderer.render, ANSWER, {}) for _ in "ab"]
+        release.set()
+        reports = [first.result(5)] + [other.result(5) for other in others]
+
+    assert reports == [b"report"] * 3
+    assert renderings == [12]
+    _wait_for_renderings(report_renderer)
+    assert report_renderer.get_cached(ANSWER) == b"report"
+
+
+def test_reports_are_downloaded_and_cached(client, auth_headers, report_renderer):
+    """The first download renders the report, the next ones read the cache only."""
+    with engine.connect() as connection:
+        id_answer = connection.execute(text("SELECT MIN(id_resposta) FROM respostas")).scalar()
+
+    response = client.get(f"/answers/{id_answer}/report", headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert f"relatorio-disc-{id_answer}.html" in response.headers["content-disposition"]
+    assert f"resposta {id_answer}," in response.text
+    _wait_for_renderings(report_renderer)
+    assert _cached_reports(report_renderer) == [response.content]
+
+    cached = client.get(f"/answers/{id_answer}/report", headers=auth_headers)
+    assert cached.content == response.content
+    assert int(cached.headers["x-db-queries"]) < int(response.headers["x-db-queries"])
+
+
+def test_reports_show_the_current_name_of_the_user(
+    client, auth_headers, report_renderer
+):
+    """A user renamed after a report was cached gets a report with the new name."""
+    with engine.connect() as connection:
+        answer = connection.execute(
+            text(
+                "SELECT id_resposta, usuarios.id_usuario, email, telefone "
+                "FROM respostas JOIN usuarios USING (id_usuario) "
+                "ORDER BY id_resposta LIMIT 1 OFFSET 1"
+            )
+        ).one()
+    id_answer = answer.id_resposta
+    first = client.get(f"/answers/{id_answer}/report", headers=auth_headers)
+    assert first.status_code == 200, first.text
+    _wait_for_renderings(report_renderer)
+
+    name = f"Renomeado {uuid.uuid4().hex[:8]}"
+    response = client.patch(
+        f"/users/{answer.id_usuario}",
+        json={"nome": name, "email": answer.email, "telefone": answer.telefone},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    renamed = client.get(f"/answers/{id_answer}/report", headers=auth_headers)
+
+    assert renamed.status_code == 200, renamed.text
+    assert name in renamed.text and name not in first.text
+    assert ReportRenderer.key(ANSWER) != ReportRenderer.key({**ANSWER, "nome": name})
+
+
+def test_reports_of_unknown_or_slow_answers_fail(client, auth_headers, report_renderer):
+    """An unknown answer is a 404, a rendering over the timeout a 503."""
+    response = client.get("/answers/999999999/report", headers=auth_headers)
+    assert response.status_code == 404
+
+    release = threading.Event()
+    report_renderer._executor = ThreadPoolExecutor(1)
+    report_renderer.timeout = 0.01
+    with engine.connect() as connection:
+        id_answer = connection.execute(text("SELECT MAX(id_resposta) FROM respostas")).scalar()
+    report_renderer._executor.submit(release.wait, 5)
+
+    try:
+        response = client.get(f"/answers/{id_answer}/report", headers=auth_headers)
+    finally:
+        release.set()
+
+    assert response.status_code == 503
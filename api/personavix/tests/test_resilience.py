@@ -0,0 +1,199 @@
+"""
+Module: test_resilience.py
+
+This module tests the circuit breaker, the retries of reads and the statement timeouts
+against an in-memory SQLite engine into which failures and latency are injected.
+"""
+
+# pylint: disable=import-error, redefined-outer-name, too-few-public-methods
+import sqlite3
+import time
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+from personavix.src.database.resilience import (
+    CircuitBreaker,
+    ReadSession,
+    install_resilience,
+    is_timeout,
+    set_statement_timeout,
+)
+from personavix.src.settings import settings
+
+SPIN = (
+    "WITH RECURSIVE spin(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM spin "
+    "WHERE monotonic() < ?) SELECT count(*) FROM spin"
+)
+
+
+class Faults:
+    """
+    Failures and latency injected before the statements of an engine.
+
+    Attributes:
+        failures: The number of next statements failing.
+        latency: The seconds each statement spins in SQLite before running.
+        executed: The number of statements reaching the database.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.latency = 0.0
+        self.executed = 0
+
+    def do_execute(self, cursor, statement, parameters, _context):
+        """Fail or slow down a statement, then let SQLAlchemy run it."""
+        self.executed += 1
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("disk I/O error")
+        if self.latency:
+            # Spinning in SQL, unlike sleeping, can be interrupted by the timeout.
+            cursor.execute(SPIN, (time.monotonic() + self.latency,))
+        cursor.execute(statement, parameters)
+        return True
+
+
+@pytest.fixture
+def database():
+    """Build a SQLite engine with a breaker and injected faults."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    event.listen(
+        engine,
+        "connect",
+        lambda connection, _: connection.create_function("monotonic", 0, time.monotonic),
+    )
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.2)
+    install_resilience(engine, breaker)
+    faults = Faults()
+    event.listen(engine, "do_execute", faults.do_execute)
+    yield engine, breaker, faults
+    engine.dispose()
+
+
+def read_session(engine, breaker) -> ReadSession:
+    """Open a read session of the engine."""
+    return ReadSession(bind=engine, info={"breaker": breaker})
+
+
+def test_breaker_opens_after_consecutive_failures(database):
+    """Consecutive failures open the breaker, which then rejects requests."""
+    engine, breaker, faults = database
+    faults.failures = 3
+    for _ in range(3):
+        with pytest.raises(OperationalError), engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_after() >= 1
+
+
+def test_breaker_probe_closes_or_opens_again(database):
+    """After the reset timeout a single probe decides the next state."""
+    engine, breaker, faults = database
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.25)
+
+    assert breaker.allow()
+    assert breaker.state == "half-open"
+    assert not breaker.allow()  # A single probe at a time.
+
+    faults.failures = 1
+    with pytest.raises(OperationalError), engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert breaker.state == "open"
+
+    time.sleep(0.25)
+    assert breaker.allow()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert breaker.state == "closed"
+
+
+def test_success_resets_the_failure_count(database):
+    """Only consecutive failures open the breaker."""
+    engine, breaker, faults = database
+    faults.failures = 2
+    for _ in range(2):
+        with pytest.raises(OperationalError), engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    faults.failures = 2
+    for _ in range(2):
+        with pytest.raises(OperationalError), engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    assert breaker.state == "closed"
+
+
+def test_reads_retry_transient_errors(database, monkeypatch):
+    """Reads succeed after transient errors within the retries."""
+    engine, breaker, faults = database
+    monkeypatch.setattr(settings, "DB_READ_RETRIES", 2)
+    monkeypatch.setattr(settings, "DB_RETRY_BASE_DELAY", 0.001)
+    faults.failures = 2
+
+    with read_session(engine, breaker) as db:
+        assert db.execute(text("SELECT 1")).scalar() == 1
+    assert faults.executed == 3
+
+
+def test_reads_give_up_after_the_retries(database, monkeypatch):
+    """Reads fail once the retries are exhausted."""
+    engine, breaker, faults = database
+    monkeypatch.setattr(settings, "DB_READ_RETRIES", 1)
+    monkeypatch.setattr(settings, "DB_RETRY_BASE_DELAY", 0.001)
+    faults.failures = 5
+
+    with pytest.raises(OperationalError), read_session(engine, breaker) as db:
+        db.execute(text("SELECT 1"))
+    assert faults.executed == 2
+
+
+def test_reads_are_not_retried_once_the_breaker_opens(database, monkeypatch):
+    """Reads stop retrying as soon as the breaker opens."""
+    engine, breaker, faults = database
+    monkeypatch.setattr(settings, "DB_READ_RETRIES", 5)
+    monkeypatch.setattr(settings, "DB_RETRY_BASE_DELAY", 0.001)
+    faults.failures = 10
+
+    with pytest.raises(OperationalError), read_session(engine, breaker) as db:
+        db.execute(text("SELECT 1"))
+    assert breaker.state == "open"
+    assert faults.executed == 3
+
+
+def test_statement_timeout_interrupts_slow_statements(database, monkeypatch):
+    """A slow statement is interrupted by its timeout and not retried."""
+    engine, breaker, faults = database
+    monkeypatch.setattr(settings, "DB_READ_RETRIES", 2)
+    faults.latency = 5.0
+
+    started_at = time.monotonic()
+    with read_session(engine, breaker) as db:
+        set_statement_timeout(db, 0.1)
+        with pytest.raises(OperationalError) as error:
+            db.execute(text("SELECT 1"))
+
+    assert time.monotonic() - started_at < 1.0
+    assert is_timeout(error.value)
+    assert faults.executed == 1  # A timeout is not retried.
+
+
+def test_statement_timeout_lets_fast_statements_run(database):
+    """Fast statements run, and the timeout does not outlive the session."""
+    engine, breaker, faults = database
+    faults.latency = 0.02
+
+    with read_session(engine, breaker) as db:
+        set_statement_timeout(db, 1.0)
+        assert db.execute(text("SELECT 1")).scalar() == 1
+    with engine.connect() as connection:  # Outside of sessions, no timeout is left.
+        assert connection.execute(text("SELECT 2")).scalar() == 2
+    assert breaker.state == "closed"
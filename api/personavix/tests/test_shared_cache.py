@@ -0,0 +1,140 @@
+"""
+Module: test_shared_cache.py
+
+This module tests the caches shared by the workers, against fakeredis: clients of the
+same FakeServer behave as workers sharing a Redis server.
+"""
+
+# pylint: disable=import-error, redefined-outer-name, protected-access
+import time
+import uuid
+import fakeredis
+import pytest
+from personavix.src.cache.shared_cache import CacheBus, SharedCache
+
+
+@pytest.fixture
+def server():
+    """Start an empty Redis server."""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def workers(server):
+    """Create the caches of two workers sharing the server, listening to each other."""
+    channel = f"cache-invalidation-{uuid.uuid4().hex}"
+    buses = [
+        CacheBus(fakeredis.FakeRedis(server=server), channel=channel) for _ in range(2)
+    ]
+    caches = [SharedCache("answers", 10, 60, bus=bus) for bus in buses]
+    yield caches
+    for bus in buses:
+        bus.stop()
+
+
+def _eventually(condition, timeout: float = 5.0) -> bool:
+    """Wait for a condition set by a listener thread."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_workers_share_their_entries(workers):
+    """An entry stored by a worker is found by the others."""
+    first, second = workers
+
+    first.set(1, {"id_resposta": 1}, tags=["user:7"])
+
+    assert second.get(1) == {"id_resposta": 1}
+    assert second.local.get("1") == (frozenset({"user:7"}), {"id_resposta": 1})
+    assert second.get(2, "missing") == "missing"
+
+
+def test_shared_entries_expire_locally_with_the_shared_tier(workers):
+    """A worker does not keep a shared entry longer than the shared tier does."""
+    first, second = workers
+
+    first.set("negative", "none", ttl=0.2)
+    assert second.get("negative") == "none"
+    time.sleep(0.3)
+
+    assert second.get("negative", "expired") == "expired"
+
+
+def _listen(workers) -> None:
+    """Start the invalidation listeners of the workers, and wait for them."""
+    for worker in workers:
+        worker.bus.start()
+    bus = workers[0].bus
+    assert _eventually(
+        lambda: dict(bus.client.pubsub_numsub(bus.channel)).get(bus.channel.encode())
+        == len(workers)
+    )
+
+
+def test_invalidations_reach_the_other_workers(workers):
+    """An invalidation by tag removes the entry from the tier of every worker."""
+    first, second = workers
+    _listen(workers)
+    first.set(1, "answer", tags=["user:7"])
+    first.set(2, "other answer", tags=["user:8"])
+    assert second.get(1) == "answer" and second.get(2) == "other answer"
+
+    first.invalidate(tags=["user:7"])
+
+    assert _eventually(lambda: second.local.get("1") is None)
+    assert second.get(1, "missing") == "missing"
+    assert second.get(2) == "other answer"
+
+
+def test_caches_stay_local_while_redis_is_down(server):
+    """An outage of Redis falls back to the local tier without failing the callers."""
+    server.connected = False
+    cache = SharedCache("answers", 10, 60, bus=CacheBus(fakeredis.FakeRedis(server=server)))
+
+    cache.set(1, "answer")
+    cache.invalidate(keys=[2])
+
+    assert cache.get(1) == "answer"
+    assert cache.get(2, "missing") == "missing"
+    assert not cache.bus._available()
+
+
+def test_invalidations_are_shared_while_cooling_down(server, workers):
+    """A worker cooling down from a failure still invalidates the other workers."""
+    first, second = workers
+    _listen(workers)
+    first.set(1, "answer")
+    assert second.get(1) == "answer"
+
+    server.connected = False
+    first.set(2, "other answer")
+    server.connected = True
+    assert not first.bus._available()
+
+    first.invalidate(keys=[1])
+
+    assert _eventually(lambda: second.local.get("1") is None)
+    assert second.get(1, "missing") == "missing"
+
+
+def test_failed_invalidations_are_replayed(server, workers):
+    """An invalidation missed during an outage is applied once Redis is back."""
+    first, second = workers
+    _listen(workers)
+    first.set(1, "answer")
+    assert second.get(1) == "answer"
+
+    server.connected = False
+    first.invalidate(keys=[1])
+    server.connected = True
+    assert second.get(1) == "answer"
+
+    first.bus._down_until = 0  # The cooldown is over.
+    assert first.get(2, "missing") == "missing"
+
+    assert _eventually(lambda: second.local.get("1") is None)
+    assert second.get(1, "missing") == "missing"
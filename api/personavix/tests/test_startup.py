@@ -0,0 +1,79 @@
+"""
+Module: test_startup.py
+
+This module tests that importing the application does no I/O, and the preparation of
+the schema by the lifespan, with the columns its tables miss.
+"""
+
+# pylint: disable=import-error
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from personavix.src.database.database import engine
+from personavix.src.database.schema import (
+    missing_columns,
+    prepare_schema,
+    prepare_schema_with_retries,
+)
+
+API_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+
+def test_importing_the_app_does_not_touch_the_database(tmp_path):
+    """A fresh interpreter imports the app without opening the database."""
+    database_file = tmp_path / "untouched.db"
+    environment = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database_file}",
+        "DATABASE_READ_URL": "",
+    }
+
+    subprocess.run(
+        [sys.executable, "-c", "import personavix.main"],
+        cwd=API_DIRECTORY,
+        env=environment,
+        check=True,
+        timeout=60,
+    )
+
+    assert not database_file.exists()
+
+
+def test_statements_are_not_logged_by_default():
+    """The engines only echo their statements when DB_ECHO is set."""
+    assert engine.echo is False
+
+
+def test_schema_is_created_or_checked(tmp_path):
+    """The check mode reports the missing tables, the create mode creates them."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+
+    with pytest.raises(RuntimeError, match="Missing tables"):
+        prepare_schema(bind, "check")
+    prepare_schema(bind, "create")
+    prepare_schema(bind, "check")
+
+
+def test_tables_missing_new_columns_are_reported(tmp_path):
+    """Tables created before a column of the models stop the startup in both modes."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    prepare_schema(bind, "create")
+    with bind.begin() as connection:
+        connection.execute(text("ALTER TABLE links_acesso_unico DROP COLUMN expirado_em"))
+
+    assert missing_columns(bind) == ["links_acesso_unico.expirado_em"]
+    for mode in ("check", "create"):
+        with pytest.raises(RuntimeError, match="links_acesso_unico.expirado_em"):
+            prepare_schema(bind, mode)
+    prepare_schema(bind, "skip")
+
+
+def test_schema_retries_stop_after_the_last_attempt(tmp_path):
+    """An unreachable database fails the startup once the retries are spent."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'missing' / 'schema.db'}")
+
+    with pytest.raises(OperationalError):
+        prepare_schema_with_retries(bind, "create", retries=1, delay=0.01)
@@ -0,0 +1,127 @@
+"""
+Module: test_token_revocations.py
+
+This module tests the revocation of single tokens: the Bloom filter and revocation
+list kept in memory, logging out, revoking a compromised token, and reloading the
+revocations after a restart.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from personavix.src.database.database import SessionLocal, engine
+from personavix.src.dependencies import decode_and_verify_token, token_revocations
+from personavix.src.dependencies.token_revocations import (
+    BloomFilter,
+    RevocationList,
+    refresh_token_revocations,
+)
+
+PASSWORD = "benchmark"
+
+
+@pytest.fixture
+def login(client):
+    """Log in as a manager of the seeded dataset, returning new headers each call."""
+    with engine.connect() as connection:
+        email = connection.execute(
+            text(
+                "SELECT email FROM usuarios WHERE permissao = 2 AND flag_acesso = 1 "
+                "AND email IS NOT NULL AND senha_hash IS NOT NULL "
+                "ORDER BY id_usuario DESC LIMIT 1"
+            )
+        ).scalar()
+
+    def _login():
+        response = client.post("/users/login", json={"email": email, "senha": PASSWORD})
+        assert response.status_code == 200, response.text
+        return response.json()["access_token"]
+
+    return _login
+
+
+def _headers(token: str) -> dict:
+    """Build the headers authenticating with a token."""
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    """Every added id matches, and unknown ids rarely do."""
+    bloom_filter = BloomFilter(10_000, 0.01)
+    added = [uuid.uuid4().hex for _ in range(10_000)]
+    for jti in added:
+        bloom_filter.add(jti)
+
+    assert all(jti in bloom_filter for jti in added)
+    false_positives = sum(uuid.uuid4().hex in bloom_filter for _ in range(10_000))
+    assert false_positives < 300
+
+
+def test_expired_revocations_are_evicted():
+    """Evicting rebuilds the filter from the unexpired ids only."""
+    revocations = RevocationList()
+    now = datetime.utcnow()
+    revocations.add(
+        [("expired", now - timedelta(seconds=1)), ("valid", now + timedelta(hours=1))]
+    )
+
+    assert revocations.evict_expired(now) == 1
+    assert not revocations.is_revoked("expired")
+    assert revocations.is_revoked("valid")
+    assert len(revocations) == 1
+
+
+def test_logout_revokes_only_the_token_of_the_request(client, login):
+    """Other tokens of the same user stay valid."""
+    token, other_token = login(), login()
+
+    response = client.post("/users/logout", headers=_headers(token))
+    assert response.status_code == 204, response.text
+
+    response = client.get("/users/profiles", headers=_headers(token))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Revoked token."
+    response = client.get("/users/profiles", headers=_headers(other_token))
+    assert response.status_code == 200
+    assert response.headers["x-db-queries"] == "1"
+
+
+def test_admins_revoke_compromised_tokens(client, auth_headers, login):
+    """An admin revokes a token of another user, and only admins may."""
+    token = login()
+
+    response = client.post(
+        "/users/tokens/revoke", json={"access_token": token}, headers=_headers(token)
+    )
+    assert response.status_code == 403
+
+    response = client.post(
+        "/users/tokens/revoke", json={"access_token": token}, headers=auth_headers
+    )
+    assert response.status_code == 204, response.text
+    assert client.get("/users/profiles", headers=_headers(token)).status_code == 401
+
+    response = client.post(
+        "/users/tokens/revoke",
+        json={"access_token": "not-a-token"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+
+def test_revocations_survive_a_restart(client, login, monkeypatch):
+    """A worker starting afresh reads the revocations from the database."""
+    token = login()
+    client.post("/users/logout", headers=_headers(token))
+
+    restarted = RevocationList()
+    monkeypatch.setattr(token_revocations, "revocation_list", restarted)
+    monkeypatch.setattr(decode_and_verify_token, "revocation_list", restarted)
+    with SessionLocal() as db:
+        assert refresh_token_revocations(db) >= 1
+
+    response = client.get("/users/profiles", headers=_headers(token))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Revoked token."
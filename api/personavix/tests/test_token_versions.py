@@ -0,0 +1,226 @@
+"""
+Module: test_token_versions.py
+
+This module tests the claims carried by the tokens, and their revocation by
+incrementing the token version of their user.
+"""
+
+# pylint: disable=import-error, redefined-outer-name
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from jose import jwt
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from personavix.src.database import database
+from personavix.src.database.database import SessionLocal, engine
+from personavix.src.database.resilience import ReadSession
+from personavix.src.dependencies.token_versions import (
+    increment_token_version,
+    token_versions,
+)
+from personavix.src.middleware.read_your_writes import LAST_WRITE_HEADER
+
+PASSWORD = "benchmark"
+
+
+@pytest.fixture
+def manager(client):
+    """Log in as a manager of the seeded dataset, never the admin of auth_headers."""
+    with engine.connect() as connection:
+        user = connection.execute(
+            text(
+                "SELECT id_usuario, nome, email, telefone FROM usuarios "
+                "WHERE permissao = 2 AND flag_acesso = 1 AND email IS NOT NULL "
+                "AND telefone IS NOT NULL AND senha_hash IS NOT NULL LIMIT 1"
+            )
+        ).one()
+    response = client.post("/users/login", json={"email": user.email, "senha": PASSWORD})
+    assert response.status_code == 200, response.text
+    return user, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_authentication_runs_no_query(client, manager):
+    """The permission and access flag are read from the token."""
+    _, headers = manager
+
+    response = client.get("/users/profiles", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.headers["x-db-queries"] == "1"
+
+
+def _revoke_tokens(id_user: int) -> None:
+    """Revoke every token of a user, as an update of their claims does."""
+    with SessionLocal() as db:
+        version = increment_token_version(db, id_user)
+        db.commit()
+    token_versions.update([(id_user, version)])
+
+
+def _new_email(user) -> str:
+    """Build an email the user never had."""
+    return f"renamed-{uuid.uuid4().hex[:8]}-{user.id_usuario}@example.com"
+
+
+def test_updating_a_claim_revokes_the_tokens(client, auth_headers, manager):
+    """Tokens issued before their email changed are rejected, new logins are not."""
+    user, headers = manager
+    email = _new_email(user)
+    response = client.patch(
+        f"/users/{user.id_usuario}",
+        json={"nome": user.nome, "email": email, "telefone": user.telefone},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get("/users/profiles", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Revoked token."
+
+    login = client.post("/users/login", json={"email": email, "senha": PASSWORD})
+    assert login.status_code == 200, login.text
+    token = login.json()["access_token"]
+    response = client.get(
+        "/users/profiles", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+
+
+def test_revocation_is_checked_against_the_database_until_loaded(
+    client, manager, monkeypatch
+):
+    """Without the versions in memory, tokens are checked with a query."""
+    user, headers = manager
+    _revoke_tokens(user.id_usuario)
+    monkeypatch.setattr(token_versions, "loaded", False)
+
+    response = client.get("/users/profiles", headers=headers)
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Revoked token."
+
+
+def test_a_lagging_replica_does_not_revive_revoked_tokens(
+    client, manager, monkeypatch, tmp_path
+):
+    """Versions are read from the primary, never from a replica behind it."""
+    user, headers = manager
+    replica_file = tmp_path / "replica.db"
+    shutil.copy(engine.url.database, replica_file)
+    _revoke_tokens(user.id_usuario)
+    replica = create_engine(f"sqlite:///{replica_file}")
+    monkeypatch.setattr(database, "read_engine", replica)
+    monkeypatch.setattr(
+        database, "ReadSessionLocal", sessionmaker(class_=ReadSession, bind=replica)
+    )
+    monkeypatch.setattr(token_versions, "loaded", False)
+
+    response = client.get("/users/profiles", headers={**headers, LAST_WRITE_HEADER: "0"})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Revoked token."
+
+
+def test_updating_other_fields_keeps_the_tokens(client, manager):
+    """A user editing their name and phone is not logged out."""
+    user, headers = manager
+    response = client.patch(
+        f"/users/{user.id_usuario}",
+        json={"nome": f"{user.nome} Silva", "email": user.email, "telefone": "11999990000"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get("/users/profiles", headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def test_tokens_without_claims_are_checked_against_the_database(client, manager):
+    """Tokens issued before the claims were added stay valid until they expire."""
+    user, _ = manager
+    token = jwt.encode(
+        {
+            "email": user.email,
+            "is_unique_access_link": False,
+            "exp": datetime.utcnow() + timedelta(hours=1),
+        },
+        os.environ["SECRET_KEY"],
+        algorithm="HS256",
+    )
+
+    response = client.get(
+        "/users/profiles", headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.headers["x-db-queries"] == "2"
+
+
+def test_link_tokens_carry_the_claims_of_their_user(client, query_budget):
+    """A link login reads the link, its user and the token version."""
+    with engine.connect() as connection:
+        id_session = connection.execute(
+            text(
+                "SELECT id_sessao FROM links_acesso_unico "
+                "WHERE expirado_em IS NULL AND respondido = 0 LIMIT 1"
+            )
+        ).scalar()
+
+    login = client.post(
+        f"/unique-access-links/login/{id_session}", json={"senha": PASSWORD}
+    )
+    assert login.status_code == 200, login.text
+    query_budget(login)
+    claims = jwt.get_unverified_claims(login.json()["access_token"])
+    assert claims["is_unique_access_link"] is True
+    assert {"id_user", "permission", "access_flag", "version"} <= set(claims)
+
+    response = client.get(
+        "/questionary/",
+        headers={"Authorization": f"Bearer {login.json()['access_token']}"},
+    )
+    assert response.status_code == 200, response.text
+
+
+def test_candidates_fill_in_their_data_then_answer(client):
+    """The link token stays valid after the candidate updates their own data."""
+    with engine.connect() as connection:
+        link = connection.execute(
+            text(
+                "SELECT l.id_sessao, u.id_usuario, u.email FROM links_acesso_unico l "
+                "JOIN usuarios u ON u.id_usuario = l.id_usuario "
+                "WHERE l.expirado_em IS NULL AND l.respondido = 0 AND u.flag_acesso = 1 "
+                "AND u.email IS NOT NULL ORDER BY l.id_sessao DESC LIMIT 1"
+            )
+        ).one()
+    login = client.post(
+        f"/unique-access-links/login/{link.id_sessao}", json={"senha": PASSWORD}
+    )
+    assert login.status_code == 200, login.text
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    response = client.patch(
+        f"/users/{link.id_usuario}",
+        json={"nome": "Candidata Teste", "email": link.email, "telefone": "11988887777"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    assert client.get("/questionary/", headers=headers).status_code == 200
+    response = client.post(
+        f"/answers/{link.id_usuario}",
+        json={
+            "dominancia": 40,
+            "influencia": 30,
+            "estabilidade": 20,
+            "conformidade": 10,
+            "motivo": "Processo seletivo",
+            "id_sessao": link.id_sessao,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["id_usuario"] == link.id_usuario
@@ -0,0 +1,55 @@
+"""
+Module: test_ttl_cache.py
+
+This module tests the LRU cache of the processes, and its index of the tags.
+"""
+
+# pylint: disable=import-error, protected-access
+import time
+from personavix.src.cache.ttl_cache import TTLCache
+
+
+def test_tags_remove_only_their_entries():
+    """Removing a tag removes the entries carrying it, and nothing else."""
+    cache = TTLCache(10, 60)
+    cache.set("a", 1, tags=["user:1", "session:1"])
+    cache.set("b", 2, tags=["user:1"])
+    cache.set("c", 3, tags=["user:2"])
+
+    assert cache.delete_tags(["session:1", "user:3"]) == 1
+    assert cache.get("a") is None and cache.get("b") == 2
+
+    assert cache.delete_tags(["user:1"]) == 1
+    assert cache.get("c") == 3
+    assert cache._tags == {"user:2": {"c"}}
+
+
+def test_the_index_follows_replaced_evicted_and_expired_entries():
+    """Entries leaving the cache leave the index of the tags too."""
+    cache = TTLCache(2, 60)
+    cache.set("a", 1, tags=["user:1"])
+    cache.set("a", 1, tags=["user:2"])
+    cache.set("b", 2, ttl=0.01, tags=["user:3"])
+    cache.set("c", 3, tags=["user:4"])
+    time.sleep(0.02)
+
+    assert cache.get("b") is None
+    assert cache._tags == {"user:4": {"c"}}
+    assert cache.delete_tags(["user:1"]) == 0
+    assert cache.get("c") == 3
+
+
+def test_the_total_size_of_the_entries_is_bounded():
+    """The least recently used entries are evicted to stay within maxbytes."""
+    cache = TTLCache(10, 60, maxbytes=100)
+    cache.set("a", ('"etag"', b"a" * 40))
+    cache.set("b", ('"etag"', b"b" * 40))
+    assert cache.get("a") is not None
+    cache.set("c", ('"etag"', b"c" * 40))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.bytes == 2 * (6 + 40)
+
+    cache.set("d", b"d" * 101)
+    assert cache.get("d") is None and cache.bytes == 2 * (6 + 40)
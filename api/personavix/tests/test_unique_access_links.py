@@ -0,0 +1,100 @@
+"""
+Module: test_unique_access_links.py
+
+This module tests the routes of the unique access links, the cache of their public
+lookup, and their sweeper.
+"""
+
+# pylint: disable=import-error
+from datetime import datetime
+from sqlalchemy import text
+from personavix.src.database.database import engine
+from personavix.src.maintenance import link_expiry
+from personavix.src.maintenance.link_expiry import sweep_expired_links
+
+SCORES = {"dominancia": 40, "influencia": 30, "estabilidade": 20, "conformidade": 10}
+
+
+def test_cached_lookups_are_invalidated_when_the_link_is_answered(
+    client, auth_headers, query_budget, open_link
+):
+    """The lookup cached before the answer is not served after it."""
+    link = open_link(5)
+    response = client.get(f"/unique-access-links/{link.link}")
+    assert response.status_code == 200, response.text
+    assert response.json()["respondido"] == 0
+    query_budget(response)
+    query_budget(client.get(f"/unique-access-links/{link.link}"), 0)
+
+    answer = client.post(
+        f"/answers/{link.id_usuario}",
+        json={**SCORES, "motivo": "Processo seletivo", "id_sessao": link.id_sessao},
+        headers=auth_headers,
+    )
+    assert answer.status_code == 200, answer.text
+
+    response = client.get(f"/unique-access-links/{link.link}")
+    assert response.status_code == 200, response.text
+    assert response.json()["respondido"] == 1
+    assert response.json()["id_resposta"] == answer.json()["id_resposta"]
+
+
+def test_cached_lookups_are_invalidated_when_the_link_expires(client, open_link):
+    """The lookup cached before the sweep of a stale link is not served after it."""
+    link = open_link(6)
+    assert client.get(f"/unique-access-links/{link.link}").status_code == 200
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "UPDATE links_acesso_unico SET criado_em = '2000-01-01 00:00:00' "
+                "WHERE id_sessao = :id_sessao"
+            ),
+            {"id_sessao": link.id_sessao},
+        )
+
+    assert sweep_expired_links(engine, datetime(2001, 1, 1), 10) == 1
+
+    assert client.get(f"/unique-access-links/{link.link}").status_code == 404
+
+
+def test_admins_list_the_expired_links_unless_excluded(client, auth_headers, open_link):
+    """Expired links stay in the listing, with their expiry, unless excluded."""
+    link = open_link(9)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "UPDATE links_acesso_unico SET expirado_em = CURRENT_TIMESTAMP "
+                "WHERE id_sessao = :id_sessao"
+            ),
+            {"id_sessao": link.id_sessao},
+        )
+
+    response = client.get("/unique-access-links/", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    [listed] = [item for item in response.json() if item["id_sessao"] == link.id_sessao]
+    assert listed["expirado_em"] is not None
+
+    response = client.get(
+        "/unique-access-links/",
+        params={"include_expired": "false", "fields": "id_sessao,expirado_em"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert all(item["expirado_em"] is None for item in response.json())
+    assert link.id_sessao not in {item["id_sessao"] for item in response.json()}
+
+
+def test_one_process_sweeps_at_a_time(monkeypatch):
+    """A sweep is skipped while another one holds the sweep lock."""
+    sweeps = []
+    monkeypatch.setattr(
+        link_expiry, "sweep_expired_links", lambda *args: sweeps.append(args) or 0
+    )
+
+    with link_expiry.sweep_lock(engine) as acquired:
+        assert acquired
+        assert link_expiry.run_sweep(30, 10, "expire") == (0, 0.0)
+    assert not sweeps
+
+    link_expiry.run_sweep(30, 10, "expire")
+    assert len(sweeps) == 1
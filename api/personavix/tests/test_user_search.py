@@ -0,0 +1,87 @@
+"""
+Module: test_user_search.py
+
+This module tests the search index of the users: its ranking, the normalization of
+accents and phones, its updates, and the search route.
+"""
+
+# pylint: disable=import-error
+from types import SimpleNamespace
+from sqlalchemy import text
+from personavix.src.database.database import engine
+from personavix.src.search.user_index import UserSearchIndex
+
+
+def _user(id_user, nome, email=None, telefone=None, setor=None):
+    """Build a user as the index reads it."""
+    return SimpleNamespace(
+        id_usuario=id_user, nome=nome, email=email, telefone=telefone, setor=setor
+    )
+
+
+def _index(*users) -> UserSearchIndex:
+    """Build an index of users."""
+    index = UserSearchIndex()
+    index.load(
+        (user.id_usuario, user.nome, user.email, user.telefone, user.setor)
+        for user in users
+    )
+    return index
+
+
+def test_prefixes_rank_before_substrings():
+    """Exact words come first, then prefixes, then substrings anywhere."""
+    index = _index(
+        _user(1, "Mariana Souza"),
+        _user(2, "Ana Lima"),
+        _user(3, "Anabela Costa"),
+        _user(4, "Joana Dias"),
+    )
+
+    assert index.search("ana", 10) == [2, 3, 1, 4]
+    assert index.search("ana", 2, offset=1) == [3, 1]
+
+
+def test_accents_case_and_phones_are_normalized():
+    """Case and accents are ignored, and phones match by their digits."""
+    index = _index(
+        _user(1, "João Conceição", "Joao@Example.com", "(11) 98765-4321", "Finanças"),
+        _user(2, "Maria", telefone="+55 21 1234-5678"),
+    )
+
+    assert index.search("JOAO", 10) == [1]
+    assert index.search("conceicao", 10) == [1]
+    assert index.search("financas", 10) == [1]
+    assert index.search("joao@example", 10) == [1]
+    assert index.search("98765 4321", 10) == [1]
+    assert index.search("(21) 1234", 10) == [2]
+
+
+def test_upserts_replace_the_terms_of_a_user():
+    """An updated user is found by its new text only."""
+    index = _index(_user(1, "Carlos Pereira"))
+
+    index.upsert(_user(1, "Carla Pereira"))
+    index.upsert(_user(2, "Bruno Carlos"))
+
+    assert index.search("carla", 10) == [1]
+    assert index.search("carlos", 10) == [2]
+    assert len(index) == 2
+
+
+def test_search_route_returns_the_ranked_users(client, auth_headers, query_budget):
+    """The route returns the users of the index in rank order, for admins only."""
+    with engine.connect() as connection:
+        user = connection.execute(
+            text("SELECT id_usuario, email FROM usuarios WHERE email IS NOT NULL LIMIT 1")
+        ).one()
+
+    response = client.get(
+        "/users/search",
+        params={"q": user.email, "fields": "id_usuario"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()[0] == {"id_usuario": user.id_usuario}
+    query_budget(response)
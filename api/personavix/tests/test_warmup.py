@@ -0,0 +1,59 @@
+"""
+Module: test_warmup.py
+
+This module tests the warm-up of the workers: the connections it opens, its steps
+failing without blocking the readiness, and the probes.
+"""
+
+# pylint: disable=import-error
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from personavix.src.cache.questionary import (
+    QUESTIONARY_KEY,
+    invalidate_questionary,
+    questionary_cache,
+)
+from personavix.src.maintenance import warmup
+
+
+def test_pool_connections_are_opened_together(tmp_path):
+    """The warm-up opens as many connections as asked, at most the size of the pool."""
+    bind = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2)
+
+    assert warmup.open_pool_connections(bind, 1) == 1
+    assert warmup.open_pool_connections(bind, 5) == 2
+    assert (bind.pool.checkedin(), bind.pool.checkedout()) == (2, 0)
+
+
+def test_failing_steps_still_report_ready(client, monkeypatch):
+    """A failing step is skipped, the other steps run and the worker reports ready."""
+
+    def fail(_db):
+        raise OperationalError("SELECT", {}, Exception("server has gone away"))
+
+    monkeypatch.setattr(warmup, "run_hot_queries", fail)
+    invalidate_questionary()
+    warmup.mark_not_ready()
+    try:
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health/live").status_code == 200
+
+        assert warmup.run_warmup() > 0
+        assert warmup.is_ready()
+        assert warmup.READY.collect()[0].samples[0].value == 1
+    finally:
+        warmup.mark_ready()
+
+    assert questionary_cache.get(QUESTIONARY_KEY) is not None
+    assert client.get("/health/ready").json() == {"status": "ready"}
+
+
+def test_the_questionary_is_served_from_the_cache(client, auth_headers, query_budget):
+    """Once cached, the questionary is served without a query."""
+    first = client.get("/questionary/", headers=auth_headers)
+    cached = client.get("/questionary/", headers=auth_headers)
+
+    assert first.status_code == cached.status_code == 200
+    query_budget(first)
+    assert cached.json() == first.json() and cached.json()["questions"]
+    assert int(cached.headers["x-db-queries"]) == 0